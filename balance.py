@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Leitura das massas direto da balança, pela porta serial (ou USB-serial).
+
+São reconhecidos os dois formatos mais comuns de saída:
+
+    MT-SICS (Mettler Toledo):   "S S      100.0012 g"  estável
+                                "S D      100.0010 g"  instável
+    SBI (Sartorius):            "N     +  100.0012 g "  estável
+                                "N     +  100.0010   "  instável (sem unidade)
+
+A porta é lida numa thread própria, para não travar a interface enquanto a
+balança não manda nada. Só as leituras estáveis são repassadas, e uma única
+vez por pesagem: depois de aceitar uma leitura, é preciso que chegue uma
+leitura instável, ou que a massa mude mais que a variação mínima (por
+padrão, DIGITOS vezes a resolução da balança), para que a próxima seja
+aceita. O último dígito oscilando não conta como outra pesagem, e a balança
+vazia ou tarada (massa dentro da variação mínima) não é uma pesagem.
+"""
+
+import re
+
+from typing import NamedTuple
+
+from PySide6.QtCore import QObject, QThread, Signal, Slot
+from PySide6.QtSerialPort import QSerialPort
+
+
+# velocidades usuais das balanças; 9600 é o padrão de fábrica da maioria
+BAUDS = (1200, 2400, 4800, 9600, 19200, 38400)
+
+# fator para converter cada unidade em gramas
+UNIDADES = {"g": 1, "mg": 1e-3, "kg": 1e3}
+
+# variação mínima padrão, em dígitos da balança
+DIGITOS = 10
+
+_SICS = re.compile(r"^S\s+([SD])\s+([+-]?\s*\d+(?:\.\d*)?)\s+(\w+)\s*$")
+_SBI = re.compile(r"^(?:[A-Za-z]{1,6}\s+)?([+-]?)\s*(\d+(?:[.,]\d*)?)\s*([A-Za-z]+)?\s*$")
+
+
+class Reading(NamedTuple):
+    mass: float  # massa, em g
+    text: str  # a massa como a balança mandou, com a resolução dela, em g
+    stable: bool
+    resolution: float  # último dígito da leitura, em g
+
+
+def _reading(sinal, numero, unidade, stable):
+    fator = UNIDADES.get(unidade)
+    if fator is None:
+        return None
+    numero = numero.replace(",", ".")
+    casas = len(numero) - numero.index(".") - 1 if "." in numero else 0
+    resolution = fator * 10.0 ** -casas
+    mass = float(sinal + numero)
+    if fator == 1:
+        return Reading(mass, sinal.replace("+", "") + numero, stable, resolution)
+    mass *= fator
+    return Reading(mass, repr(mass), stable, resolution)
+
+
+def parse_line(line):
+    # interpreta uma linha da balança; devolve None para o que não é uma
+    # pesagem (respostas de comando, erros, sobrecarga, etc.)
+    line = line.strip()
+    m = _SICS.match(line)
+    if m:
+        valor = m.group(2).replace(" ", "")
+        sinal = "-" if valor.startswith("-") else ""
+        return _reading(sinal, valor.lstrip("+-"), m.group(3), m.group(1) == "S")
+    if line.startswith(("S ", "E")):
+        # respostas do MT-SICS que não são pesagens ("S I", "S +", "ES", ...)
+        return None
+    m = _SBI.match(line)
+    if m:
+        # no SBI, a leitura instável vem sem a unidade
+        unidade = m.group(3)
+        return _reading(m.group(1).replace("+", ""), m.group(2), unidade or "g",
+                        unidade is not None)
+    return None
+
+
+class StableFilter:
+    # deixa passar uma única leitura estável por pesagem
+
+    def __init__(self, delta=0.0):
+        # variação mínima, em g, para que a massa seja considerada outra;
+        # com 0, DIGITOS vezes a resolução de cada leitura
+        self.delta = delta
+        self.last = None
+        self.armed = True
+
+    def feed(self, reading):
+        # devolve a leitura aceita, ou None
+        if reading is None:
+            return None
+        if not reading.stable:
+            self.armed = True
+            return None
+        delta = self.delta or DIGITOS * reading.resolution
+        if self.last is not None and abs(reading.mass - self.last) > delta:
+            self.armed = True
+        # a última leitura estável, aceita ou não: uma deriva lenta (a
+        # evaporação, p. ex.) não vira outra pesagem
+        self.last = reading.mass
+        if not self.armed or abs(reading.mass) <= delta:
+            return None
+        self.armed = False
+        return reading
+
+
+class BalanceReader(QObject):
+    # Lê a balança numa QThread. Os sinais são emitidos da thread da porta e
+    # o Qt os entrega na thread de quem conectou, ou seja, na interface
+    massa = Signal(str)
+    erro = Signal(str)
+
+    def __init__(self, port, baud=9600, comando=None, delta=0.0):
+        super().__init__()
+        self.port_name = port
+        self.baud = baud
+        # comando enviado ao conectar, p. ex. b"SIR\r\n" (MT-SICS) para a
+        # balança mandar as leituras continuamente
+        self.comando = comando
+        self.filtro = StableFilter(delta)
+        self.port = None
+        self._buffer = b""
+        self._thread = QThread()
+        self.moveToThread(self._thread)
+        self._thread.started.connect(self._abre)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._thread.quit()
+        self._thread.wait()
+        # a thread já parou, a porta pode ser fechada daqui
+        if self.port is not None:
+            self.port.close()
+            self.port = None
+
+    @Slot()
+    def _abre(self):
+        # roda na thread da porta: a QSerialPort tem de ser criada nela
+        self.port = QSerialPort(self.port_name, self)
+        self.port.setBaudRate(self.baud)
+        if not self.port.open(QSerialPort.OpenModeFlag.ReadWrite):
+            self.erro.emit("Não foi possível abrir a porta " + self.port_name
+                           + ": " + self.port.errorString())
+            self.port = None
+            return
+        self.port.readyRead.connect(self._le)
+        if self.comando:
+            self.port.write(self.comando)
+
+    @Slot()
+    def _le(self):
+        self._buffer += bytes(self.port.readAll())
+        *linhas, self._buffer = self._buffer.split(b"\n")
+        for linha in linhas:
+            r = self.filtro.feed(parse_line(linha.decode("ascii", "replace")))
+            if r is not None:
+                self.massa.emit(r.text)
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modo em lote do V.A.Ca.: calcula, sem abrir a interface, todos os ensaios
+de uma pasta, distribuindo os arquivos entre os núcleos da máquina.
+
+Cada ensaio é um arquivo .json com os mesmos campos do formulário:
+
+    {
+        "instId": "Pipeta 01",
+        "instKind": "msa",
+        "instMat": "Polipropileno (PP)",
+        "dateEdit": "2024-01-31",
+        "balId": "...", "termId": "...", "term2Id": "...",
+        "barId": "...", "higId": "...",
+        "tempAmb": 20.0, "presAtm": 1013.25, "umidRel": 45.0,
+        "mEvap": 0.0, "densPesos": 8.0,
+        "checkTara": false,
+        "tableData": [[v_nom, v_s, t_água, m_recipiente, m_1, ..., m_n], ...]
+    }
+
+Os ensaios salvos pela interface (.vaca, veja session.py) também são
+calculados, com os mesmos campos.
+
+Nas pipetas multicanal, "canais" informa o número de canais e as colunas
+vêm agrupadas por volume ensaiado (canais 1..n do primeiro volume, depois
+do segundo, etc.); o resultado traz então a conformidade de cada canal e do
+instrumento.
+
+"instMat" aceita o nome do material ou o próprio coeficiente de expansão.
+Para cada ensaio é gravado um .json com os resultados e, ao final, um
+resumo.csv com uma linha por volume ensaiado.
+
+Com --pdf, também é gravado o relatório de cada ensaio (<ensaio>.pdf), ou,
+com --pdf-unico, um único PDF com todos os relatórios. A incerteza expandida
+do relatório usa as incertezas-padrão do campo opcional "incertezas", com os
+nomes de uncertainty.Uncertainties (u_bal, u_tw, ...; u_coef em 1/°C).
+
+Com --historico, os ensaios também são gravados no histórico de calibrações
+(history.py), no banco da interface ou no informado; calcular a mesma pasta
+de novo substitui os ensaios, que são identificados pelo caminho do arquivo.
+
+Com --monte-carlo, o .json de resultados de cada ensaio traz também, em
+cada coluna, a incerteza do volume médio pelo método de Monte Carlo do GUM
+S1 (uncertainty.monte_carlo), com as mesmas incertezas-padrão: a estimativa,
+a incerteza-padrão, o intervalo de abrangência de 95 %, o número de ensaios
+e a semente, que pode ser fixada pelo campo opcional "semente" para
+reproduzir o resultado. Cada coluna leva de décimos de segundo a alguns
+segundos.
+
+Uso: vaca batch <pasta> [-o <saída>] [-j <processos>] [--pdf | --pdf-unico <arquivo>]
+                [--historico [<banco>]] [--monte-carlo]
+"""
+
+import os
+import sys
+import csv
+import json
+import argparse
+import multiprocessing
+
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import INSTRUMENTOS, MULT, calibrate, device_verdict, parse_run
+from report import Report, linhas_dados, linhas_res, rotulos_multicanal, texto_veredito
+from session import EXTENSAO, abre
+from tolerances import NORMAS
+from uncertainty import Uncertainties, gum_budget, mc_column
+
+
+RESUMO = ("arquivo", "instId", "instKind", "dateEdit", "coluna", "v_nom", "v_s",
+          "media", "erro_sis", "erro_ale", "conf_sis", "conf_ale", "erro")
+
+# erros de um ensaio mal preenchido, que não interrompem o lote
+ERROS = (OSError, ValueError, KeyError, TypeError, ZeroDivisionError)
+
+
+def load_run(path):
+    if path.endswith(EXTENSAO):
+        return abre(path).run
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def list_runs(indir):
+    # os .json e os .vaca de ensaios da pasta, sem os resultados de um lote
+    # anterior
+    return sorted(os.path.join(indir, f) for f in os.listdir(indir)
+                  if f.endswith(EXTENSAO)
+                  or (f.endswith(".json") and not f.endswith(".res.json")))
+
+
+def compute_run(run):
+    # calcula um ensaio já carregado (engine.CalibrationRun)
+    kind, coef_term, env = parse_run(run)
+    table = [[float(x) for x in column] for column in run["tableData"]]
+    return calibrate(table, kind, coef_term, env, run.get("checkTara", False),
+                     run.get("canais") or 0)
+
+
+def expanded_uncertainties(run, calib):
+    # incerteza expandida de cada coluna, ou None nas colunas sem resultado
+    unc = Uncertainties(**run.get("incertezas", {}))
+    return [None if r is None else
+            gum_budget(calib.column(c), r.volumes, calib.kind, calib.coef_term, calib.env, unc).U
+            for c, r in enumerate(calib.results)]
+
+
+def mc_uncertainties(run, calib, seed=None):
+    # incerteza de cada coluna pelo método de Monte Carlo, com as mesmas
+    # incertezas-padrão, ou None nas colunas sem resultado. O lote já divide
+    # os arquivos entre os núcleos, então cada coluna roda num processo só
+    unc = Uncertainties(**run.get("incertezas", {}))
+    return [None if r is None else
+            mc_column(calib.column(c), calib.kind, calib.coef_term, calib.env, unc,
+                      calib.tara, seed=seed, processos=1)
+            for c, r in enumerate(calib.results)]
+
+
+def make_report(run, calib=None, incertezas=None):
+    # relatório de um ensaio já carregado, com a incerteza expandida de cada
+    # coluna, para export.write_pdf
+    if calib is None:
+        calib = compute_run(run)
+    if incertezas is None:
+        incertezas = expanded_uncertainties(run, calib)
+    kind = calib.kind
+    env = calib.env
+    table = calib.columns()
+    results = calib.results
+    unid = "mL" if MULT[kind] == 1 else "µL"
+    mat = run["instMat"]
+    veredito = ""
+    rotulos = ()
+    if calib.canais:
+        vereditos = calib.verdicts()
+        veredito = texto_veredito(vereditos, device_verdict(vereditos), NORMAS[kind][1])
+        rotulos = tuple(rotulos_multicanal(len(table), calib.canais))
+    data = run.get("dateEdit", "")
+    if data:
+        data = datetime.strptime(data, "%Y-%m-%d").strftime("%d/%m/%Y")
+    return Report(
+        run.get("instId", ""), INSTRUMENTOS[kind], mat if isinstance(mat, str) else str(mat),
+        data, run.get("balId", ""), run.get("termId", ""), run.get("term2Id", ""),
+        run.get("barId", ""), run.get("higId", ""),
+        str(float(env.ta)), str(float(env.pa)), str(float(env.ua)), str(float(env.m_evap)),
+        str(float(env.ro_b)), unid, len(table),
+        tuple(linhas_dados(max((len(c) - 4 for c in table), default=0), unid)),
+        tuple(linhas_res(unid)),
+        tuple(tuple(c) for c in table),
+        tuple(() if r is None else tuple(r.volumes) for r in results),
+        tuple(() if r is None else (*r.results, u) for r, u in zip(results, incertezas)),
+        veredito, datetime.now().strftime("%d/%m/%Y %H:%M:%S"), rotulos)
+
+
+def process_run(path, outdir, pdf=False, historico=False, monte_carlo=False):
+    # roda num processo do pool: calcula um arquivo e grava o resultado.
+    # Devolve as linhas do resumo, em que um erro vira uma linha com a
+    # mensagem, o relatório do ensaio, se pdf, e o registro para o
+    # histórico (history.Historico.grava), se historico; senão, None
+    name = os.path.basename(path)
+    try:
+        run = load_run(path)
+        calib = compute_run(run)
+        incertezas = expanded_uncertainties(run, calib) if pdf or historico else None
+        report = make_report(run, calib, incertezas) if pdf else None
+        mc = mc_uncertainties(run, calib, run.get("semente")) if monte_carlo else None
+    except ERROS as e:
+        return [{"arquivo": name, "erro": str(e) or type(e).__name__}], None, None
+    columns = []
+    rows = []
+    for c, r in enumerate(calib.results):
+        if r is None:
+            columns.append(None)
+            continue
+        columns.append({"volumes": r.volumes.tolist(), "results": r.results,
+                        "ok_sis": r.ok_sis, "ok_ale": r.ok_ale})
+        if mc:
+            columns[-1]["monte_carlo"] = mc[c]._asdict()
+        rows.append({"arquivo": name, "instId": run.get("instId", ""),
+                     "instKind": run["instKind"], "dateEdit": run.get("dateEdit", ""),
+                     "coluna": c + 1, "v_nom": r.volumes[0], "v_s": r.volumes[1],
+                     "media": r.results[0], "erro_sis": r.results[1],
+                     "erro_ale": r.results[2], "conf_sis": r.ok_sis,
+                     "conf_ale": r.ok_ale, "erro": ""})
+    out = {"instId": run.get("instId", ""), "instKind": run["instKind"],
+           "dateEdit": run.get("dateEdit", ""), "columns": columns}
+    if calib.canais:
+        out["canais"] = calib.verdicts()
+        out["instrumento"] = device_verdict(out["canais"])
+    try:
+        with open(os.path.join(outdir, os.path.splitext(name)[0] + ".res.json"),
+                  "w", encoding="utf-8") as f:
+            json.dump(out, f, ensure_ascii=False)
+    except OSError as e:
+        # uma pasta sem permissão ou um nome inválido também é um erro do
+        # ensaio, e não do lote inteiro
+        return [{"arquivo": name, "erro": str(e) or type(e).__name__}], None, None
+    # a origem é o caminho do arquivo: calcular a pasta de novo substitui o
+    # ensaio no histórico, em vez de repeti-lo
+    registro = (run, calib, incertezas, os.path.abspath(path)) if historico else None
+    return rows, report, registro
+
+
+def _process_chunk(paths, outdir, pdf=False, historico=False, monte_carlo=False):
+    rows = []
+    reports = []
+    registros = []
+    for path in paths:
+        r, report, registro = process_run(path, outdir, pdf, historico, monte_carlo)
+        rows.extend(r)
+        if report is not None:
+            reports.append((os.path.splitext(os.path.basename(path))[0], report))
+        if registro is not None:
+            registros.append(registro)
+    return rows, reports, registros
+
+
+def run_batch(indir, outdir, jobs=None, chunk=32, pdf=None, historico=None,
+              monte_carlo=False):
+    # Calcula todos os .json da pasta; devolve o número de ensaios e de
+    # erros. Com pdf=True, grava o relatório de cada ensaio em outdir; um
+    # nome de arquivo grava um PDF único com todos os relatórios. historico
+    # é o banco (history.Historico) em que os ensaios calculados são gravados.
+    # Com monte_carlo, a incerteza de Monte Carlo de cada coluna vai para o
+    # .res.json
+    paths = list_runs(indir)
+    os.makedirs(outdir, exist_ok=True)
+    # os arquivos vão em blocos, pra não pagar a comunicação entre processos
+    # a cada ensaio
+    chunks = [paths[i:i + chunk] for i in range(0, len(paths), chunk)]
+    erros = 0
+    reports = []
+    with open(os.path.join(outdir, "resumo.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=RESUMO, restval="")
+        writer.writeheader()
+        # os processos só são criados quando o pool recebe trabalho
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            mapper = map if jobs == 1 else pool.map
+            for rows, novos, registros in mapper(_process_chunk, chunks, [outdir] * len(chunks),
+                                                 [pdf is not None] * len(chunks),
+                                                 [historico is not None] * len(chunks),
+                                                 [monte_carlo] * len(chunks)):
+                erros += sum(1 for r in rows if r["erro"])
+                writer.writerows(rows)
+                reports.extend(novos)
+                # um bloco de ensaios por transação
+                if registros:
+                    historico.grava(registros)
+    if reports:
+        # o Qt só é carregado se houver relatórios
+        from export import export_pdfs
+        if pdf is True:
+            arquivos = [((report,), os.path.join(outdir, nome + ".pdf"))
+                        for nome, report in reports]
+        else:
+            arquivos = [(tuple(report for _, report in reports), pdf)]
+        _, falhas = export_pdfs(arquivos, jobs, _mostra_andamento)
+        print(file=sys.stderr)
+        for msg in falhas:
+            print(msg, file=sys.stderr)
+        erros += len(falhas)
+    return len(paths), erros
+
+
+def _mostra_andamento(feitos, total):
+    print("\rRelatórios: %d de %d" % (feitos, total), end="", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="vaca batch",
+                                     description="Calcula em lote os ensaios de uma pasta.")
+    parser.add_argument("pasta", help="pasta com os arquivos .json dos ensaios")
+    parser.add_argument("-o", "--saida", help="pasta dos resultados (padrão: <pasta>/resultados)")
+    parser.add_argument("-j", "--processos", type=int, default=None,
+                        help="número de processos (padrão: todos os núcleos)")
+    relatorios = parser.add_mutually_exclusive_group()
+    relatorios.add_argument("--pdf", action="store_const", const=True, dest="relatorios",
+                            help="grava também o relatório em PDF de cada ensaio")
+    relatorios.add_argument("--pdf-unico", metavar="ARQUIVO", dest="relatorios",
+                            help="grava os relatórios de todos os ensaios num único PDF")
+    parser.add_argument("--historico", nargs="?", const="", metavar="BANCO",
+                        help="grava os ensaios no histórico de calibrações (padrão: o "
+                             "mesmo banco da interface)")
+    parser.add_argument("--monte-carlo", action="store_true",
+                        help="calcula também a incerteza de cada coluna pelo método de "
+                             "Monte Carlo (GUM S1); demorado")
+    args = parser.parse_args(argv)
+    outdir = args.saida or os.path.join(args.pasta, "resultados")
+    historico = None
+    if args.historico is not None:
+        from history import Historico
+        historico = Historico(args.historico or None)
+    try:
+        n, erros = run_batch(args.pasta, outdir, args.processos, pdf=args.relatorios,
+                             historico=historico, monte_carlo=args.monte_carlo)
+    finally:
+        if historico is not None:
+            historico.close()
+    print("%d ensaios calculados, %d com erro. Resultados em %s" % (n, erros, outdir))
+    return 1 if erros else 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Medição de desempenho do V.A.Ca.: python bench.py [-t 1 100 10000 1000000]
+
+Os ensaios são sintéticos e sempre os mesmos (semente fixa): todos os tipos
+de instrumento, em sequência, com três volumes ensaiados (vezes os canais,
+nas multicanal) de dez medidas cada, com e sem tara. Para cada quantidade de
+ensaios são medidas, uma de cada vez, as etapas do cálculo:
+
+    massa → volume      engine.convert_batch, coluna a coluna de cada ensaio
+    estatísticas        stats.column_stats dos volumes
+    tolerâncias <tipo>  tolerances.evaluate dos resultados dos ensaios do tipo
+    ensaio completo     batch.compute_run, como no cálculo em lote
+    cálculo original    original.calcular, o MainWindow.calcular de antes
+    relatório HTML      batch.make_report e report.render
+    relatório original  original.relatorio, o MainWindow.makeTableDocument
+    relatório PDF       export.write_pdf, um PDF por ensaio
+
+e, uma vez só, a abertura da interface (até a primeira pintura da janela),
+num processo novo. Os relatórios são medidos só nos primeiros ensaios
+(LIMITES), senão o milhão de ensaios levaria dias. Os ensaios são gerados
+em blocos, fora da medição, para o milhão caber na memória; em cada etapa
+vale o melhor de algumas repetições (-r) no primeiro bloco e a soma dos
+blocos seguintes, medidos uma vez só. O milhão de ensaios leva uns vinte
+minutos.
+
+Cada quantidade termina com quantas vezes o ensaio completo e o relatório
+HTML são mais rápidos que os originais (original.py), medidos nos mesmos
+ensaios. O relatório atual faz mais que o original: calcula a incerteza
+expandida de cada coluna e monta o Report antes do HTML.
+
+Além do tempo, os resultados também são conferidos. Nos ensaios em que o
+cálculo original é medido, os volumes e os vereditos têm de ser os mesmos
+dele, e a média e os erros, a menos do último bit (statistics trocado por
+math.fsum); nos primeiros CONFERIDOS, todo número do relatório original tem
+de aparecer no atual, que só acrescenta a incerteza. E a referência guarda
+um hash dos volumes, resultados e vereditos de todos os ensaios e outro do
+HTML do relatório dos primeiros CONFERIDOS (sem a data de impressão), que
+mudam com qualquer mudança no que o cálculo e o relatório entregam.
+
+Com --grava, os tempos por ensaio e os hashes ficam como referência
+(bench.json, ou o arquivo de --referencia). Nas medições seguintes, a etapa
+que ficar mais lenta que a referência além da tolerância (--tolerancia) é
+apontada como regressão, assim como um resultado diferente, e o código de
+saída é 1. Os tempos da referência do repositório são os da máquina em que
+ela foi gravada; noutra máquina, grave uma referência própria antes de
+comparar.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+from array import array
+from collections import Counter
+from typing import NamedTuple
+
+import original
+
+from batch import compute_run, make_report
+from engine import INSTRUMENTOS, MULT, convert_batch, parse_run
+from report import render
+from stats import column_stats
+from tolerances import evaluate
+
+
+basedir = os.path.dirname(os.path.abspath(__file__))
+
+REFERENCIA = os.path.join(basedir, "bench.json")
+
+TAMANHOS = (1, 100, 10_000, 1_000_000)
+
+# ensaios gerados (e medidos) de cada vez
+BLOCO = 10_000
+
+# máximo de ensaios medidos nas etapas mais lentas
+LIMITES = {"cálculo original": 10_000, "relatório HTML": 10_000,
+           "relatório original": 10_000, "relatório PDF": 50}
+
+# ensaios cujo relatório em HTML entra no hash dos resultados e é conferido
+# com o original
+CONFERIDOS = 100
+
+# cada etapa e a mesma etapa no código original
+ORIGINAIS = {"ensaio completo": "cálculo original", "relatório HTML": "relatório original"}
+
+SEMENTE = 4787
+
+# volume nominal de cada tipo, previsto nas tabelas de tolerância; os outros
+# volumes ensaiados são frações dele
+VOLUMES = {"bv": 100, "bvl": 50, "b": 25, "bdm": 10, "bda": 20, "d": 5, "msa": 1000,
+           "msd2": 200, "mm": 100, "pg": 10, "pv": 20}
+FRACOES = (1, 0.5, 0.1)
+MEDIDAS = 10
+CANAIS = 8
+
+# a mesma abertura do vaca.py, até a primeira volta do loop de eventos
+_ABERTURA = """
+import os, sys
+sys.argv = ["vaca.py"]
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import QApplication
+import vaca
+QApplication.setOrganizationName("vaca")
+QApplication.setApplicationName("vaca")
+app = QApplication(sys.argv)
+app.setStyleSheet(vaca.folha_de_estilo())
+window = vaca.MainWindow()
+window.show()
+QTimer.singleShot(0, app.quit)
+app.exec()
+"""
+
+
+def ensaio(i, rng):
+    # o i-ésimo ensaio sintético, no formato dos .json do lote
+    kind = list(INSTRUMENTOS)[i % len(INSTRUMENTOS)]
+    vidro = MULT[kind] == 1 and kind not in ("bda", "d")
+    tara = i % 2 == 0
+    table = []
+    for fracao in FRACOES:
+        v_nom = VOLUMES[kind]
+        v_s = v_nom * fracao
+        for _ in range(CANAIS if kind == "mm" else 1):
+            recipiente = round(rng.uniform(10, 60), 4)
+            massas = [round(v_s / MULT[kind] * rng.gauss(0.997, 0.001), 5)
+                      for _ in range(MEDIDAS)]
+            # sem tara, a balança lê o recipiente junto; nos balões, cada
+            # medida é uma pesagem, nos outros as medidas se acumulam
+            if not tara:
+                if kind in ("bv", "bvl"):
+                    massas = [recipiente + m for m in massas]
+                else:
+                    for k in range(MEDIDAS):
+                        massas[k] += massas[k - 1] if k else recipiente
+            table.append([v_nom, v_s, round(rng.uniform(18, 25), 1), recipiente, *massas])
+    run = {"instId": "Bench %07d" % i, "instKind": kind,
+           "instMat": "Vidro borossilicato 3.3" if vidro else "Polipropileno (PP)",
+           "dateEdit": "2024-01-31", "balId": "", "termId": "", "term2Id": "",
+           "barId": "", "higId": "", "tempAmb": round(rng.uniform(18, 25), 1),
+           "presAtm": round(rng.uniform(900, 1020), 1), "umidRel": round(rng.uniform(30, 70)),
+           "mEvap": 0.0, "densPesos": 8.0, "checkTara": tara, "tableData": table}
+    if kind == "mm":
+        run["canais"] = CANAIS
+    return run
+
+
+def ensaios(n):
+    # os n ensaios, em blocos de até BLOCO; o mesmo i dá sempre o mesmo ensaio
+    for inicio in range(0, n, BLOCO):
+        rng = random.Random(SEMENTE + inicio)
+        yield [ensaio(i, rng) for i in range(inicio, min(n, inicio + BLOCO))]
+
+
+def mede(funcao, repeticoes):
+    # melhor tempo de uma chamada, repetindo as muito rápidas como o timeit;
+    # a primeira rodada do autorange já conta como uma repetição
+    timer = timeit.Timer(funcao)
+    vezes, tempo = timer.autorange()
+    return min([tempo, *timer.repeat(repeticoes - 1, vezes)]) / vezes
+
+
+class Bloco(NamedTuple):
+    # as entradas de cada etapa, uma por ensaio, preparadas fora da medição
+    runs: list
+    params: list  # (kind, coef_term, env)
+    massas: list  # (massas, temperaturas da água, recipientes, tara)
+    calibs: list  # engine.CalibrationRun
+    volumes: list  # volumes de cada coluna
+    erros: list  # (v_nom, v_s, erro sistemático, erro aleatório) das colunas
+
+
+def prepara(runs):
+    calibs = [compute_run(run) for run in runs]
+    return Bloco(
+        runs, [parse_run(run) for run in runs],
+        [([c[4:] for c in run["tableData"]], [c[2] for c in run["tableData"]],
+          [c[3] for c in run["tableData"]], run["checkTara"]) for run in runs],
+        calibs, [[r.volumes[2:] for r in calib.results] for calib in calibs],
+        [tuple(zip(*((r.volumes[0], r.volumes[1], r.results[1], r.results[2])
+                     for r in calib.results))) for calib in calibs])
+
+
+def _do_tipo(bloco, kind):
+    # só os ensaios de um tipo de instrumento
+    indices = [i for i, (k, _, _) in enumerate(bloco.params) if k == kind]
+    return Bloco(*([campo[i] for i in indices] for campo in bloco))
+
+
+def _conversao(bloco):
+    for (kind, coef_term, env), (massas, tw, recipientes, tara) in zip(bloco.params,
+                                                                       bloco.massas):
+        convert_batch(massas, tw, kind, coef_term, env, recipientes, tara)
+
+
+def _estatisticas(bloco):
+    for volumes in bloco.volumes:
+        column_stats(volumes)
+
+
+def _tolerancias(bloco):
+    for (kind, _, _), erros in zip(bloco.params, bloco.erros):
+        evaluate(kind, *erros)
+
+
+def _completo(bloco):
+    for run in bloco.runs:
+        compute_run(run)
+
+
+def _calculo_original(bloco):
+    for run, (kind, coef_term, env) in zip(bloco.runs, bloco.params):
+        original.calcular(run["tableData"], kind, coef_term, env, run["checkTara"])
+
+
+def _html(bloco):
+    for run, calib in zip(bloco.runs, bloco.calibs):
+        render(make_report(run, calib))
+
+
+def _relatorio_original(run, calib):
+    return original.relatorio(
+        run, INSTRUMENTOS[calib.kind], calib.columns(),
+        [() if r is None else r.volumes for r in calib.results],
+        [() if r is None else r.results for r in calib.results], "")
+
+
+def _html_original(bloco):
+    for run, calib in zip(bloco.runs, bloco.calibs):
+        _relatorio_original(run, calib)
+
+
+def _pdf(bloco):
+    from export import write_pdf
+    with tempfile.TemporaryDirectory() as pasta:
+        arquivo = os.path.join(pasta, "bench.pdf")
+        for run, calib in zip(bloco.runs, bloco.calibs):
+            write_pdf([make_report(run, calib)], arquivo)
+
+
+# nome, função e o tipo de instrumento dos ensaios medidos (None: todos)
+ETAPAS = (("massa → volume", _conversao, None), ("estatísticas", _estatisticas, None),
+          *(("tolerâncias " + kind, _tolerancias, kind) for kind in INSTRUMENTOS),
+          ("ensaio completo", _completo, None), ("cálculo original", _calculo_original, None),
+          ("relatório HTML", _html, None), ("relatório original", _html_original, None),
+          ("relatório PDF", _pdf, None))
+
+
+def _resultados(h, calib):
+    for r in calib.results:
+        h.update(r.volumes.tobytes())
+        h.update(array("d", r.results).tobytes())
+        h.update(repr((r.ok_sis, r.ok_ale)).encode())
+    h.update(repr(calib.verdicts()).encode())
+
+
+def _relatorio(h, run, calib):
+    h.update(render(make_report(run, calib)._replace(impresso="")).encode("utf-8"))
+
+
+def _igual_ao_original(run, params, calib):
+    # o cálculo atual contra o original.calcular
+    kind, coef_term, env = params
+    for r, antigo in zip(calib.results, original.calcular(run["tableData"], kind, coef_term,
+                                                          env, run["checkTara"])):
+        if r is None or antigo is None:
+            if r is not antigo:
+                return False
+            continue
+        vol, res, ok_sis, ok_ale = antigo
+        if (list(r.volumes) != vol or (r.ok_sis, r.ok_ale) != (ok_sis, ok_ale)
+                or any(abs(a - b) > 1e-12 * max(1.0, abs(b)) for a, b in zip(r.results, res))):
+            return False
+    return True
+
+
+_CELULA = re.compile(r'<td align="right">([^<]*)</td>')
+
+
+def _numeros(html):
+    return Counter(c for c in _CELULA.findall(html) if c != "-")
+
+
+def _relatorio_igual_ao_original(run, calib):
+    # todo número do relatório original aparece, as mesmas vezes, no atual
+    atual = render(make_report(run, calib))
+    return not _numeros(_relatorio_original(run, calib)) - _numeros(atual)
+
+
+def _aplicacao():
+    # os PDFs precisam de um QGuiApplication, sem tela
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtGui import QGuiApplication
+    from fonts import carrega_fontes
+    app = QGuiApplication.instance() or QGuiApplication(["bench"])
+    carrega_fontes()
+    return app
+
+
+def mede_etapas(n, repeticoes):
+    # {etapa: (ensaios medidos, segundos)} para n ensaios, sem as etapas que
+    # não tiveram ensaios (tipos que não aparecem nos primeiros ensaios), os
+    # hashes dos resultados e as etapas cujos resultados diferem dos originais
+    tempos = {nome: [0, 0.0] for nome, _, _ in ETAPAS}
+    calculo = hashlib.sha1()
+    relatorios = hashlib.sha1()
+    diferentes = set()
+    for k, runs in enumerate(ensaios(n)):
+        bloco = prepara(runs)
+        for calib in bloco.calibs:
+            _resultados(calculo, calib)
+        for run, calib in zip(bloco.runs[:max(0, CONFERIDOS - k * BLOCO)], bloco.calibs):
+            _relatorio(relatorios, run, calib)
+            if not _relatorio_igual_ao_original(run, calib):
+                diferentes.add("relatório HTML")
+        conferidos = max(0, LIMITES["cálculo original"] - k * BLOCO)
+        if not all(map(_igual_ao_original, bloco.runs[:conferidos], bloco.params,
+                       bloco.calibs)):
+            diferentes.add("ensaio completo")
+        # depois do primeiro bloco, o tamanho já dilui o ruído
+        vezes = repeticoes if k == 0 else 1
+        for nome, etapa, kind in ETAPAS:
+            parte = bloco if kind is None else _do_tipo(bloco, kind)
+            falta = LIMITES.get(nome, n) - tempos[nome][0]
+            if falta < len(parte.runs):
+                parte = Bloco(*(campo[:falta] for campo in parte))
+            if not parte.runs:
+                continue
+            tempos[nome][0] += len(parte.runs)
+            tempos[nome][1] += mede(lambda: etapa(parte), vezes)
+    return ({nome: tuple(t) for nome, t in tempos.items() if t[0]},
+            {"ensaio completo": calculo.hexdigest(), "relatório HTML": relatorios.hexdigest()},
+            sorted(diferentes))
+
+
+def mede_abertura(repeticoes):
+    # processo novo a cada vez: importações, QApplication, folha de estilo,
+    # janela e primeira pintura
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    melhor = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        subprocess.run([sys.executable, "-c", _ABERTURA], cwd=basedir, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        t = time.perf_counter() - inicio
+        melhor = t if melhor is None else min(melhor, t)
+    return melhor
+
+
+def _cpu():
+    # o modelo do processador, que explica os tempos da referência
+    if os.path.exists("/proc/cpuinfo"):
+        with open("/proc/cpuinfo", encoding="utf-8", errors="replace") as f:
+            for linha in f:
+                if linha.startswith("model name"):
+                    return linha.split(":", 1)[1].strip()
+    return platform.processor() or platform.machine()
+
+
+def _chave(nome, n):
+    return "%s|%d" % (nome, n)
+
+
+CABECALHO = "%-22s %9s %9s %11s %16s %16s %9s" % (
+    "etapa", "ensaios", "medidos", "total (s)", "por ensaio (µs)", "referência (µs)", "variação")
+
+
+def confere(hashes, referencia):
+    # imprime e devolve os resultados diferentes dos da referência (chaves)
+    diferentes = [chave for chave, h in hashes.items()
+                  if chave in referencia and referencia[chave] != h]
+    for chave in diferentes:
+        nome, n = chave.rsplit("|", 1)
+        print("%-22s %9s  RESULTADO DIFERENTE DA REFERÊNCIA" % (nome, n), flush=True)
+    return diferentes
+
+
+def ganhos(tempos, n):
+    # quantas vezes cada etapa é mais rápida que a original, por ensaio
+    for nome, antigo in ORIGINAIS.items():
+        if nome in tempos and antigo in tempos:
+            (feitos, segundos), (feitos_antigo, segundos_antigo) = tempos[nome], tempos[antigo]
+            print("%-22s %9d  %.1f vezes mais rápido que o original"
+                  % (nome, n, segundos_antigo / feitos_antigo / (segundos / feitos)), flush=True)
+
+
+def compara(medidas, referencia, tolerancia):
+    # imprime uma linha por etapa e devolve as regressões (chaves)
+    regressoes = []
+    for chave, (feitos, segundos) in medidas.items():
+        nome, n = chave.rsplit("|", 1)
+        por_ensaio = segundos / feitos
+        ref = referencia.get(chave)
+        linha = "%-22s %9s %9d %11.4f %16.2f" % (nome, n if n != "0" else "-", feitos,
+                                                 segundos, 1e6 * por_ensaio)
+        if ref:
+            variacao = por_ensaio / ref - 1
+            linha += " %16.2f %+8.1f%%" % (1e6 * ref, 100 * variacao)
+            if variacao > tolerancia:
+                linha += "  REGRESSÃO"
+                regressoes.append(chave)
+        print(linha, flush=True)
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="bench",
+                                     description="Mede o desempenho do cálculo, das "
+                                                 "tolerâncias, dos relatórios e da abertura.")
+    parser.add_argument("-t", "--tamanhos", type=int, nargs="+", default=TAMANHOS,
+                        metavar="N", help="quantidades de ensaios (padrão: %s)"
+                        % " ".join(map(str, TAMANHOS)))
+    parser.add_argument("-r", "--repeticoes", type=int, default=3,
+                        help="repetições de cada etapa; vale a mais rápida (padrão: 3)")
+    parser.add_argument("--sem-abertura", action="store_true",
+                        help="não mede a abertura da interface")
+    parser.add_argument("--referencia", default=REFERENCIA, metavar="ARQUIVO",
+                        help="arquivo da referência (padrão: bench.json)")
+    parser.add_argument("--grava", action="store_true",
+                        help="grava as medidas como a nova referência")
+    parser.add_argument("--tolerancia", type=float, default=0.25,
+                        help="aumento, por ensaio, apontado como regressão (padrão: 0.25)")
+    args = parser.parse_args(argv)
+    # o QGuiApplication dos PDFs fica vivo até o fim
+    app = _aplicacao()
+    referencia = {}
+    conferencia = {}
+    if os.path.exists(args.referencia):
+        with open(args.referencia, encoding="utf-8") as f:
+            gravada = json.load(f)
+        referencia = gravada["etapas"]
+        conferencia = gravada.get("resultados", {})
+    # cada quantidade é mostrada assim que termina
+    print(CABECALHO)
+    medidas = {}
+    hashes = {}
+    regressoes = []
+    for n in args.tamanhos:
+        tempos, resultados, diferentes = mede_etapas(n, args.repeticoes)
+        feitas = {_chave(nome, n): t for nome, t in tempos.items()}
+        regressoes += compara(feitas, referencia, args.tolerancia)
+        medidas.update(feitas)
+        ganhos(tempos, n)
+        for nome in diferentes:
+            print("%-22s %9d  RESULTADO DIFERENTE DO ORIGINAL" % (nome, n), flush=True)
+            regressoes.append(_chave(nome, n))
+        feitos = {_chave(nome, n): h for nome, h in resultados.items()}
+        regressoes += confere(feitos, conferencia)
+        hashes.update(feitos)
+    if not args.sem_abertura:
+        feitas = {_chave("abertura", 0): (1, mede_abertura(args.repeticoes))}
+        regressoes += compara(feitas, referencia, args.tolerancia)
+        medidas.update(feitas)
+    if args.grava:
+        # as etapas que não foram medidas agora continuam na referência
+        referencia.update({chave: segundos / feitos
+                           for chave, (feitos, segundos) in medidas.items()})
+        conferencia.update(hashes)
+        with open(args.referencia, "w", encoding="utf-8") as f:
+            json.dump({"cpu": _cpu(), "nucleos": os.cpu_count(),
+                       "python": platform.python_version(),
+                       "gravada": time.strftime("%Y-%m-%d %H:%M:%S"), "etapas": referencia,
+                       "resultados": conferencia},
+                      f, ensure_ascii=False, indent=1, sort_keys=True)
+            f.write("\n")
+        print("Referência gravada em", args.referencia)
+    elif regressoes:
+        print("%d etapas mais lentas ou com resultados diferentes dos da referência."
+              % len(regressoes))
+    return 1 if regressoes and not args.grava else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Densidades da água e do ar usadas na conversão de massa em volume.
+
+As funções calc_ro_* são as fórmulas fechadas. ro_water e ro_air guardam
+os valores já calculados num cache LRU limitado, pois num lote as mesmas
+temperaturas e condições ambientais se repetem em milhares de colunas.
+interp_ro_water usa uma tabela pré-calculada de 0 °C a 40 °C, em passos de
+0,01 °C, para quem precisa de muitas temperaturas diferentes (Monte Carlo).
+"""
+
+import math
+
+from array import array
+from functools import lru_cache
+
+
+# tabela da água: de 0 °C a 40 °C em passos de 0,01 °C. A interpolação linear
+# difere da fórmula de Tanaka em no máximo 3e-10 g/mL (3e-10 relativo),
+# muito abaixo da incerteza da própria fórmula (da ordem de 1e-6 g/mL).
+WATER_T_MIN = 0.0
+WATER_T_MAX = 40.0
+WATER_STEP = 0.01
+WATER_MAX_INTERP_ERROR = 3e-10
+
+_water_table = None
+
+
+def calc_ro_water(tw):
+    # densidade da água segundo "Tanaka M. et al., Recommended table
+    # for the density of water between 0 °C and 40 °C based on
+    # recent experimental reports,  Metrologia,  2001, 38, 301-309
+    ro_w = 0.99997495 * (1 - (tw - 3.983035)**2 * (tw + 301.797)/(522528.9 * (tw + 69.34881)))
+    return ro_w
+
+
+def calc_ro_air(ta, ua, pa):
+    # Densidade do ar de acordo com a ISO 8655-6:2022
+    ro_a = (1 / 1000) * (0.34848 * pa - 0.009 * ua * math.e**(0.061 * ta))/(ta + 273.15)
+    return ro_a
+
+
+@lru_cache(maxsize=4096)
+def ro_water(tw):
+    # valor exato da fórmula, guardado por temperatura
+    return calc_ro_water(tw)
+
+
+@lru_cache(maxsize=1024)
+def ro_air(ta, ua, pa):
+    # valor exato da fórmula, guardado por condição ambiental
+    return calc_ro_air(ta, ua, pa)
+
+
+def _build_water_table():
+    global _water_table
+    n = round((WATER_T_MAX - WATER_T_MIN) / WATER_STEP)
+    _water_table = array("d", (calc_ro_water(WATER_T_MIN + i * WATER_STEP)
+                               for i in range(n + 1)))
+    return _water_table
+
+
+def interp_ro_water(tw):
+    # densidade da água interpolada na tabela; fora dela, usa a fórmula
+    table = _water_table or _build_water_table()
+    x = (tw - WATER_T_MIN) / WATER_STEP
+    i = int(x)
+    if x < 0 or i >= len(table) - 1:
+        return calc_ro_water(tw)
+    a = table[i]
+    return a + (table[i + 1] - a) * (x - i)
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Motor de cálculo do V.A.Ca., independente do Qt.
+
+Converte as massas medidas em volume, calcula a média e os erros
+sistemático e aleatório e avalia a conformidade de acordo com as normas
+ISO 4787:2021 (vidraria) e ISO 8655:2022 (instrumentos de pistão).
+"""
+
+from array import array
+from typing import NamedTuple
+
+from density import ro_air, ro_water
+from stats import RunningStats, column_stats
+from tolerances import evaluate
+
+
+# instrumentos calculados pela ISO 4787; os demais seguem a ISO 8655
+ISO_4787 = ("bv", "bvl", "b", "pv", "pg")
+
+# tipos de instrumento, na ordem em que aparecem na interface
+INSTRUMENTOS = {
+    "bv": "Balão volumétrico Classe A",
+    "bvl": "Bal. vol. Cl. A, boca larga",
+    "b": "Bureta Classe A|AS",
+    "bdm": 'Bureta "digital" manual',
+    "bda": 'Bureta "digital" motorizada',
+    "d": "Dispensador",
+    "msa": "Micropipeta tipo A|D1",
+    "msd2": "Micropipeta tipo D2",
+    "mm": "Micropipeta multicanal",
+    "pg": "Pipeta graduada Classe A|AS",
+    "pv": "Pipeta volumétrica Classe A|AS",
+}
+
+# multiplicador pra apresentar o resultado em mL (1) ou µL (1000)
+MULT = {
+    "bv": 1,
+    "bvl": 1,
+    "b": 1,
+    "bdm": 1,
+    "bda": 1,
+    "d": 1,
+    "msa": 1000,
+    "msd2": 1000,
+    "mm": 1000,
+    "pg": 1,
+    "pv": 1,
+}
+
+# coeficiente de expansão térmica de acordo com o material
+# valores da ISO 1042:1998
+MATERIAIS = {
+    "Vidro borossilicato 3.3": 9.9e-6,
+    "Vidro borossilicato 5.0": 1.5e-5,
+    "Vidro soda-lime": 2.7e-5,
+    "Polipropileno (PP)": 2.4e-4,
+    "Poliestireno (PS)": 4.5e-4,
+    "Policarbonato (PC)": 2.1e-4,
+    "Perfluoroalcoxi alcano (PFA)": 3.9e-4,
+    "Polimetilpenteno (PMP)": 3.6e-4,
+}
+
+
+# medidas por volume ensaiado: o desvio-padrão precisa de pelo menos duas
+MIN_MEDIDAS = 2
+
+
+class Environment(NamedTuple):
+    # condições ambientais do ensaio
+    ta: float  # temperatura ambiente, em °C
+    pa: float  # pressão atmosférica, em hPa
+    ua: float  # umidade relativa, em %
+    m_evap: float = 0.0  # perda por evaporação, em g
+    ro_b: float = 8.0  # densidade dos pesos de referência, em g/mL
+
+
+class ColumnResult(NamedTuple):
+    # resultado de uma coluna (um volume ensaiado) da tabela de dados; os
+    # volumes ficam num array, sem um objeto por medida, e não são alterados
+    # depois de calculados
+    volumes: array  # array("d") [v_nom, v_s, v_1, ..., v_n], como no relatório
+    results: tuple  # (média, erro sistemático, erro aleatório)
+    ok_sis: bool | None  # None quando a conformidade não é avaliada
+    ok_ale: bool | None
+
+
+class CalibrationRun(NamedTuple):
+    # Um ensaio calculado: as entradas do cálculo e o resultado de cada
+    # coluna. As colunas da tabela de dados ficam uma após a outra num único
+    # array; inicio[c]:inicio[c + 1] é a coluna c. É o que a interface, o
+    # relatório, o histórico, os arquivos de ensaio e o lote recebem, e pode
+    # ir para outra thread ou outro processo como está
+    kind: str
+    coef_term: float
+    env: Environment
+    tara: bool
+    canais: int  # 0 fora do modo multicanal
+    dados: array  # array("d") com as colunas [v_nom, v_s, t_água, m_recipiente, m_1, ...]
+    inicio: array  # array("L"), uma posição a mais que o número de colunas
+    results: tuple  # ColumnResult de cada coluna, ou None
+
+    def column(self, c):
+        return self.dados[self.inicio[c]:self.inicio[c + 1]]
+
+    def columns(self):
+        return [self.column(c) for c in range(len(self.inicio) - 1)]
+
+    def verdicts(self):
+        # conformidade de cada canal, nas multicanal; senão, ()
+        return tuple(channel_verdicts(self.results, self.canais)) if self.canais else ()
+
+
+def parse_run(run):
+    # tipo, coeficiente de expansão e ambiente de um ensaio no formato dos
+    # .json do lote (batch.py); "instMat" é o nome do material ou o próprio
+    # coeficiente
+    kind = run["instKind"]
+    if kind not in INSTRUMENTOS:
+        raise ValueError("Tipo de instrumento desconhecido: %s" % kind)
+    mat = run["instMat"]
+    coef_term = MATERIAIS[mat] if isinstance(mat, str) else float(mat)
+    env = Environment(run["tempAmb"], run["presAtm"], run["umidRel"],
+                      run.get("mEvap", 0.0), run.get("densPesos", 8.0))
+    return kind, coef_term, env
+
+
+def pack_columns(table):
+    # as colunas num array só, mais o início de cada uma (CalibrationRun)
+    dados = array("d")
+    inicio = array("L", [0])
+    for column in table:
+        dados.extend(column)
+        inicio.append(len(dados))
+    return dados, inicio
+
+
+def net_masses(row, container, kind):
+    # massa de água de cada medida. Com a balança tarada (container None) é a
+    # própria leitura; sem tara, cada leitura é subtraída do recipiente
+    # (balões) ou da leitura anterior, começando pelo recipiente (acumuladas)
+    if container is None:
+        return list(row)
+    if kind in ("bv", "bvl"):
+        return [ml - container for ml in row]
+    prev = [container]
+    prev.extend(row[:-1])
+    return [ml - p for ml, p in zip(row, prev)]
+
+
+def convert_batch(masses, tw, kind, coef_term, env, container=None, tara=False):
+    # converte em volume uma matriz de massas (colunas × medidas) de uma só vez.
+    # As densidades e as correções de empuxo e de dilatação dependem apenas da
+    # temperatura da água da coluna e do ambiente, então são calculadas uma
+    # única vez por temperatura, e não a cada medida.
+    mult = MULT[kind]
+    # a ISO 4787 não considera a evaporação
+    m_evap = 0 if kind in ISO_4787 else env.m_evap
+    ro_a = ro_air(env.ta, env.ua, env.pa)
+    empuxo = 1 - ro_a / env.ro_b
+    fatores = {}
+    out = []
+    for k, row in enumerate(masses):
+        t = tw[k]
+        if t not in fatores:
+            fatores[t] = (ro_water(t) + ro_a,
+                          1 - coef_term * (t - 20))
+        dens, dilat = fatores[t]
+        net = net_masses(row, None if tara else container[k], kind)
+        out.append(array("d", [(m + m_evap) * 1/dens * empuxo * dilat * mult for m in net]))
+    return out
+
+
+def check_column(column):
+    # a coluna é [v_nom, v_s, t_água, m_recipiente, m_1, ..., m_n]
+    if len(column) < 4 + MIN_MEDIDAS:
+        raise ValueError("São necessárias ao menos duas medidas por volume ensaiado.")
+    if column[1] == 0:
+        raise ValueError("O volume ensaiado não pode ser zero.")
+
+
+def _systematic(v_s, mean, kind):
+    if kind in ISO_4787:
+        # a 4787 expressa o erro sistemático em mL
+        return mean - v_s
+    # a 8655 como um percentual do volume ensaiado
+    return 100 * (mean - v_s)/v_s
+
+
+def _errors(v_s, mean, s, kind):
+    # média, erro sistemático e erro aleatório (um CV, em %) das medidas
+    e_ale = 100 * s / v_s
+    return [mean, _systematic(v_s, mean, kind), e_ale]
+
+
+def calculate(table, kind, coef_term, env, tara=False):
+    # calcula todas as colunas da tabela de dados; colunas vazias dão None
+    cols = [column for column in table if len(column) != 0]
+    for column in cols:
+        check_column(column)
+    vols = convert_batch([c[4:] for c in cols], [c[2] for c in cols], kind,
+                         coef_term, env, [c[3] for c in cols], tara)
+    means, stdevs = column_stats(vols)
+    res = [_errors(c[1], m, s, kind) for c, m, s in zip(cols, means, stdevs)]
+    # avaliando a conformidade de todas as colunas de uma vez
+    oks = evaluate(kind, [c[0] for c in cols], [c[1] for c in cols],
+                   [r[1] for r in res], [r[2] for r in res])
+    done = iter(zip(cols, vols, res, oks))
+    out = []
+    for column in table:
+        if len(column) == 0:
+            out.append(None)
+            continue
+        c, v, r, (ok_sis, ok_ale) = next(done)
+        volumes = array("d", (c[0], c[1]))
+        volumes.extend(v)
+        out.append(ColumnResult(volumes, tuple(r), ok_sis, ok_ale))
+    return out
+
+
+def calibrate(table, kind, coef_term, env, tara=False, canais=0, results=None):
+    # o ensaio completo; results reaproveita colunas já calculadas (como as
+    # de recalculate), senão a tabela inteira é calculada
+    if results is None:
+        results = calculate(table, kind, coef_term, env, tara)
+    dados, inicio = pack_columns(table)
+    return CalibrationRun(kind, coef_term, env, bool(tara), canais, dados, inicio, tuple(results))
+
+
+class LiveColumn:
+    # Acompanha uma coluna durante a aquisição: cada massa que chega é
+    # convertida em volume e entra nas estatísticas em O(1), sem recalcular a
+    # coluna inteira. O resultado final continua vindo de calculate
+    __slots__ = ("v_s", "kind", "fator", "m_evap", "container", "prev", "stats")
+
+    def __init__(self, column, kind, coef_term, env, tara=False):
+        # column é o cabeçalho [v_nom, v_s, t_água, m_recipiente] mais as
+        # massas já medidas, se houver
+        self.v_s = column[1]
+        self.kind = kind
+        ro_a = ro_air(env.ta, env.ua, env.pa)
+        tw = column[2]
+        self.fator = (1 / (ro_water(tw) + ro_a) * (1 - ro_a / env.ro_b)
+                      * (1 - coef_term * (tw - 20)) * MULT[kind])
+        self.m_evap = 0 if kind in ISO_4787 else env.m_evap
+        self.container = None if tara else column[3]
+        self.prev = self.container
+        self.stats = RunningStats()
+        for m in column[4:]:
+            self.add(m)
+
+    def add(self, mass):
+        # devolve o volume da nova medida
+        if self.container is None:
+            net = mass
+        elif self.kind in ("bv", "bvl"):
+            net = mass - self.container
+        else:
+            net = mass - self.prev
+        self.prev = mass
+        v = (net + self.m_evap) * self.fator
+        self.stats.add(v)
+        return v
+
+    def results(self):
+        # [média, erro sistemático, erro aleatório], como calculate; o erro
+        # aleatório é o CV do acumulador em relação ao volume ensaiado
+        mean = self.stats.mean
+        return [mean, _systematic(self.v_s, mean, self.kind), self.stats.cv(self.v_s)]
+
+
+def recalculate(table, previous, dirty, kind, coef_term, env, tara=False):
+    # recalcula só as colunas em dirty e reaproveita os resultados anteriores
+    # das demais; a lista devolvida segue as colunas da tabela
+    idx = sorted(c for c in dirty if c < len(table))
+    out = list(previous[:len(table)])
+    out.extend([None] * (len(table) - len(out)))
+    for c, r in zip(idx, calculate([table[c] for c in idx], kind, coef_term, env, tara)):
+        out[c] = r
+    return out
+
+
+def channel_verdicts(results, canais):
+    # Conformidade de cada canal de uma pipeta multicanal. As colunas vêm
+    # agrupadas por volume ensaiado: canais 1..n do primeiro volume, depois
+    # canais 1..n do segundo, etc. Um canal é conforme se os erros de todos
+    # os seus volumes são; None se falta o resultado de algum volume
+    out = []
+    for c in range(canais):
+        ok = True
+        for r in results[c::canais]:
+            if r is None or r.ok_sis is None or r.ok_ale is None:
+                ok = None if ok is not False else False
+            elif not (r.ok_sis and r.ok_ale):
+                ok = False
+        out.append(ok)
+    return out
+
+
+def device_verdict(verdicts):
+    # o instrumento é conforme só se todos os canais são
+    if False in verdicts:
+        return False
+    if None in verdicts or not verdicts:
+        return None
+    return True
+
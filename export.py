@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gravação dos relatórios de ensaio em PDF, um a um ou em lote.
+
+No lote, cada arquivo é uma lista de relatórios (Report) e o nome do PDF: um
+relatório por arquivo gera um PDF por instrumento; todos num só arquivo
+geram um único PDF, com os relatórios em sequência. Os PDFs são gravados em
+processos separados, cada um com seu próprio QGuiApplication na plataforma
+"offscreen", sem passar pela interface. Os processos avisam cada relatório
+gravado por uma fila e verificam, antes de cada um, se o lote foi cancelado;
+o PDF interrompido no meio é apagado.
+"""
+
+import os
+import queue
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from PySide6 import QtPrintSupport
+from PySide6.QtCore import QMargins, QObject, QRectF, QSizeF, QThread, Qt, Signal, Slot
+from PySide6.QtGui import (QFont, QFontInfo, QGuiApplication, QPageLayout, QPageSize,
+                           QPainter, QTextDocument)
+
+from fonts import carrega_fontes
+from report import render
+
+# relatórios por tarefa do pool, pra não pagar a comunicação entre processos
+# a cada PDF
+BLOCO = 8
+
+
+def make_document(report):
+    # as fontes já estão registradas, a não ser que o relatório venha antes
+    # da carga adiada da interface
+    carrega_fontes()
+    document = QTextDocument()
+    document.setPageSize(QSizeF(842, 595))
+    document.setDocumentMargin(43)
+    document.setDefaultFont(QFont("Cantarell", 7))
+    document.setHtml(render(report))
+    return document
+
+
+def new_printer(filename):
+    printer = QtPrintSupport.QPrinter(QtPrintSupport.QPrinter.HighResolution)
+    printer.setOutputFormat(QtPrintSupport.QPrinter.PdfFormat)
+    printer.setPageSize(QPageSize.A4)
+    printer.setPageOrientation(QPageLayout.Landscape)
+    printer.setPageMargins(QMargins(0, 0, 0, 0))
+    printer.setCreator("V.A.Ca. v. Angus")
+    printer.setOutputFileName(filename)
+    return printer
+
+
+def _pinta(document, printer, painter):
+    # Desenha as páginas do documento como o QTextDocument.print_, mas num
+    # painter já aberto, pra vários documentos irem para o mesmo PDF. O
+    # número de páginas vem do layout do documento, e a numeração é escrita
+    # na margem de cima de cada página
+    size = document.pageSize()
+    margem = document.documentMargin()
+    total = document.pageCount()
+    # as medidas do documento são as do layout, em pixels da tela: a fonte
+    # da numeração também tem de ser dada em pixels
+    fonte = QFont(document.defaultFont())
+    fonte.setPixelSize(max(1, round(QFontInfo(fonte).pixelSize() * 0.8)))
+    painter.save()
+    painter.scale(printer.width() / size.width(), printer.height() / size.height())
+    painter.setFont(fonte)
+    for page in range(total):
+        if page:
+            printer.newPage()
+        painter.save()
+        painter.translate(0, -page * size.height())
+        document.drawContents(painter, QRectF(0, page * size.height(), size.width(), size.height()))
+        painter.restore()
+        painter.drawText(QRectF(margem, 0, size.width() - 2 * margem, margem),
+                         Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter,
+                         "Página %d de %d" % (page + 1, total))
+    painter.restore()
+
+
+def write_pdf(reports, filename, parar=None, feito=None):
+    # grava os relatórios, em sequência, num único PDF. Devolve False se o
+    # lote foi cancelado; o arquivo incompleto é apagado
+    if not reports:
+        return True
+    printer = new_printer(filename)
+    painter = QPainter()
+    for i, report in enumerate(reports):
+        if parar is not None and parar.is_set():
+            if painter.isActive():
+                painter.end()
+                os.remove(filename)
+            return False
+        document = make_document(report)
+        if i == 0:
+            if not painter.begin(printer):
+                raise OSError("Não foi possível gravar o arquivo " + filename + ".")
+        else:
+            printer.newPage()
+        _pinta(document, printer, painter)
+        if feito is not None:
+            feito()
+    painter.end()
+    return True
+
+
+# aplicação, fila de andamento e aviso de cancelamento de cada processo do pool
+_app = None
+_fila = None
+_parar = None
+
+
+def _inicia(fila, parar):
+    # roda uma vez em cada processo do pool
+    global _fila, _parar, _app
+    os.environ["QT_QPA_PLATFORM"] = "offscreen"
+    _app = QGuiApplication.instance() or QGuiApplication([])
+    carrega_fontes()
+    _fila = fila
+    _parar = parar
+
+
+def _avisa():
+    _fila.put(1)
+
+
+def _grava(arquivos):
+    # roda num processo do pool: grava um bloco de arquivos e devolve os erros
+    erros = []
+    for reports, filename in arquivos:
+        try:
+            write_pdf(reports, filename, _parar, _avisa)
+        except OSError as e:
+            erros.append(str(e))
+    return erros
+
+
+def export_pdfs(arquivos, processos=None, andamento=None, parar=None):
+    # Grava os arquivos [(relatórios, nome do PDF), ...] no pool. andamento
+    # recebe (gravados, total) a cada relatório; parar é um Event do contexto
+    # "spawn" que cancela o lote. Devolve o número de relatórios gravados e
+    # as mensagens de erro
+    # os processos são criados do zero ("spawn"), e não copiados de um
+    # processo que já tem o Qt rodando
+    ctx = multiprocessing.get_context("spawn")
+    fila = ctx.Queue()
+    if parar is None:
+        parar = ctx.Event()
+    total = sum(len(reports) for reports, _ in arquivos)
+    blocos = [arquivos[i:i + BLOCO] for i in range(0, len(arquivos), BLOCO)]
+    feitos = 0
+    erros = []
+    with ProcessPoolExecutor(max_workers=processos, mp_context=ctx,
+                             initializer=_inicia, initargs=(fila, parar)) as pool:
+        futuros = [pool.submit(_grava, bloco) for bloco in blocos]
+        pendentes = set(futuros)
+        while pendentes or not fila.empty():
+            try:
+                feitos += fila.get(timeout=0.1)
+            except queue.Empty:
+                pass
+            else:
+                if andamento is not None:
+                    andamento(feitos, total)
+            if parar.is_set():
+                # os blocos que ainda não começaram nem chegam aos processos
+                for f in pendentes:
+                    f.cancel()
+            pendentes = {f for f in pendentes if not f.done()}
+        for f in futuros:
+            if not f.cancelled():
+                erros.extend(f.result())
+    return feitos, erros
+
+
+class PdfExport(QObject):
+    # Roda o export_pdfs numa QThread, como a leitura da balança: a interface
+    # só recebe o andamento e o resultado, pelos sinais
+    andamento = Signal(int)
+    concluido = Signal(int, list)
+
+    def __init__(self, arquivos, processos=None):
+        super().__init__()
+        self.arquivos = arquivos
+        self.processos = processos
+        self.total = sum(len(reports) for reports, _ in arquivos)
+        self._parar = multiprocessing.get_context("spawn").Event()
+        self._thread = QThread()
+        self.moveToThread(self._thread)
+        self._thread.started.connect(self._roda)
+
+    def start(self):
+        self._thread.start()
+
+    def cancelar(self):
+        self._parar.set()
+
+    def stop(self):
+        self.cancelar()
+        self._thread.quit()
+        self._thread.wait()
+
+    @Slot()
+    def _roda(self):
+        try:
+            feitos, erros = export_pdfs(self.arquivos, self.processos,
+                                        lambda n, total: self.andamento.emit(n), self._parar)
+        except BrokenProcessPool as e:
+            feitos, erros = 0, ["Um dos processos foi interrompido: " + str(e)]
+        except Exception as e:
+            # sem o concluido, a janela de andamento ficaria aberta para sempre
+            feitos, erros = 0, ["Não foi possível gravar os relatórios: " + str(e)]
+        self.concluido.emit(feitos, erros)
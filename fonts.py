@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fontes Cantarell, registradas no Qt uma única vez, quando são necessárias.
+
+A interface só usa a regular e o negrito; as itálicas só aparecem no
+relatório e são registradas depois que a janela já está na tela (ou pelo
+próprio relatório, se ele vier antes).
+"""
+
+import os
+
+from PySide6.QtGui import QFontDatabase
+
+
+basedir = os.path.dirname(__file__)
+
+FONTES_INTERFACE = ("Cantarell-Regular.ttf", "Cantarell-Bold.ttf")
+FONTES_RELATORIO = ("Cantarell-Italic.ttf", "Cantarell-BoldItalic.ttf")
+
+_carregadas = set()
+
+
+def carrega_fontes(fontes=FONTES_INTERFACE + FONTES_RELATORIO):
+    for fonte in fontes:
+        if fonte not in _carregadas:
+            QFontDatabase.addApplicationFont(os.path.join(basedir, fonte))
+            _carregadas.add(fonte)
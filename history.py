@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Histórico das calibrações, num banco SQLite local.
+
+Cada ensaio calculado (na interface ou no lote) é uma linha da tabela
+ensaios, com a identificação do instrumento, a data, o tipo, o material, os
+instrumentos de medida e as condições ambientais em colunas indexadas: "todas
+as calibrações da pipeta X" é uma busca no índice, e não uma pasta de PDFs.
+Cada volume ensaiado é uma linha da tabela colunas, com as massas e os
+volumes de cada medida num blob de doubles (array("d"), little-endian).
+
+Os ensaios entram em lotes, numa transação só. Um ensaio gravado de novo com
+a mesma origem (o arquivo .json do lote, ou a sessão da interface)
+substitui o anterior. O banco fica em modo WAL: a interface pode consultar
+o histórico enquanto um lote grava.
+
+A tabela tendencias guarda, para cada ponto de calibração de cada
+instrumento (volume nominal, volume ensaiado e canal), as somas da regressão
+dos erros sistemático e aleatório contra a data. As somas são atualizadas na
+mesma transação em que os ensaios entram ou saem, sem voltar às medidas: a
+deriva de toda a frota é lida direto dessa tabela (veja trends.py).
+"""
+
+import os
+import sys
+import sqlite3
+
+from array import array
+from datetime import datetime
+
+
+VERSAO = 2
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS ensaios (
+    id INTEGER PRIMARY KEY,
+    origem TEXT UNIQUE,
+    inst_id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    material TEXT NOT NULL,
+    coef_term REAL NOT NULL,
+    bal_id TEXT NOT NULL,
+    term_id TEXT NOT NULL,
+    term2_id TEXT NOT NULL,
+    bar_id TEXT NOT NULL,
+    hig_id TEXT NOT NULL,
+    ta REAL NOT NULL,
+    pa REAL NOT NULL,
+    ua REAL NOT NULL,
+    m_evap REAL NOT NULL,
+    ro_b REAL NOT NULL,
+    tara INTEGER NOT NULL,
+    canais INTEGER NOT NULL,
+    calculado TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ensaios_inst ON ensaios (inst_id, data);
+CREATE INDEX IF NOT EXISTS ensaios_data ON ensaios (data);
+CREATE INDEX IF NOT EXISTS ensaios_tipo ON ensaios (tipo, material);
+CREATE INDEX IF NOT EXISTS ensaios_bal ON ensaios (bal_id);
+CREATE INDEX IF NOT EXISTS ensaios_term ON ensaios (term_id);
+CREATE INDEX IF NOT EXISTS ensaios_term2 ON ensaios (term2_id);
+CREATE INDEX IF NOT EXISTS ensaios_bar ON ensaios (bar_id);
+CREATE INDEX IF NOT EXISTS ensaios_hig ON ensaios (hig_id);
+CREATE INDEX IF NOT EXISTS ensaios_ambiente ON ensaios (ta, pa, ua);
+CREATE TABLE IF NOT EXISTS colunas (
+    ensaio INTEGER NOT NULL REFERENCES ensaios (id) ON DELETE CASCADE,
+    coluna INTEGER NOT NULL,
+    v_nom REAL NOT NULL,
+    v_s REAL NOT NULL,
+    t_agua REAL NOT NULL,
+    m_recipiente REAL NOT NULL,
+    massas BLOB NOT NULL,
+    volumes BLOB,
+    media REAL,
+    erro_sis REAL,
+    erro_ale REAL,
+    incerteza REAL,
+    ok_sis INTEGER,
+    ok_ale INTEGER,
+    PRIMARY KEY (ensaio, coluna)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS tendencias (
+    inst_id TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    v_nom REAL NOT NULL,
+    v_s REAL NOT NULL,
+    canal INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    st REAL NOT NULL,
+    stt REAL NOT NULL,
+    ss REAL NOT NULL,
+    sts REAL NOT NULL,
+    sss REAL NOT NULL,
+    sa REAL NOT NULL,
+    sta REAL NOT NULL,
+    saa REAL NOT NULL,
+    PRIMARY KEY (inst_id, tipo, v_nom, v_s, canal)
+) WITHOUT ROWID;
+"""
+
+# Soma (peso 1) ou subtrai (peso -1) das tendências as colunas calculadas dos
+# ensaios escolhidos pelo filtro. t é a data do ensaio em dias desde
+# 01/01/2000, pra os quadrados não perderem dígitos; ensaios sem data ficam
+# de fora. Nas multicanal, cada canal é um ponto separado
+_TENDENCIAS = """
+INSERT INTO tendencias
+SELECT inst_id, tipo, v_nom, v_s, canal, sum(:peso), sum(:peso * t), sum(:peso * t * t),
+       sum(:peso * erro_sis), sum(:peso * t * erro_sis), sum(:peso * erro_sis * erro_sis),
+       sum(:peso * erro_ale), sum(:peso * t * erro_ale), sum(:peso * erro_ale * erro_ale)
+FROM (SELECT e.inst_id, e.tipo, c.v_nom, c.v_s, c.erro_sis, c.erro_ale,
+             CASE WHEN e.canais > 0 THEN c.coluna % e.canais + 1 ELSE 0 END AS canal,
+             julianday(e.data) - 2451544.5 AS t
+      FROM ensaios e JOIN colunas c ON c.ensaio = e.id
+      WHERE {} AND c.media IS NOT NULL AND julianday(e.data) IS NOT NULL)
+GROUP BY inst_id, tipo, v_nom, v_s, canal
+ON CONFLICT DO UPDATE SET
+    n = n + excluded.n, st = st + excluded.st, stt = stt + excluded.stt,
+    ss = ss + excluded.ss, sts = sts + excluded.sts, sss = sss + excluded.sss,
+    sa = sa + excluded.sa, sta = sta + excluded.sta, saa = saa + excluded.saa
+"""
+
+CAMPOS = ("origem", "inst_id", "data", "tipo", "material", "coef_term", "bal_id", "term_id",
+          "term2_id", "bar_id", "hig_id", "ta", "pa", "ua", "m_evap", "ro_b", "tara",
+          "canais", "calculado")
+
+COLUNAS = ("ensaio", "coluna", "v_nom", "v_s", "t_agua", "m_recipiente", "massas", "volumes",
+           "media", "erro_sis", "erro_ale", "incerteza", "ok_sis", "ok_ale")
+
+
+def caminho_padrao():
+    # na pasta de dados do usuário, como os demais programas
+    if sys.platform == "win32":
+        pasta = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        pasta = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    return os.path.join(pasta, "vaca", "historico.sqlite3")
+
+
+def empacota(valores):
+    a = array("d", valores)
+    if sys.byteorder == "big":
+        a.byteswap()
+    return a.tobytes()
+
+
+def _ensaio(run, calib, origem):
+    # linha da tabela ensaios: a identificação vem do formulário (no formato
+    # do lote), e o cálculo, do engine.CalibrationRun
+    mat = run["instMat"]
+    env = calib.env
+    return (origem, run.get("instId", ""), run.get("dateEdit", ""), calib.kind,
+            mat if isinstance(mat, str) else str(mat), calib.coef_term,
+            run.get("balId", ""), run.get("termId", ""), run.get("term2Id", ""),
+            run.get("barId", ""), run.get("higId", ""),
+            float(env.ta), float(env.pa), float(env.ua), float(env.m_evap), float(env.ro_b),
+            int(calib.tara), calib.canais, datetime.now().isoformat(timespec="seconds"))
+
+
+def _colunas(ensaio, calib, incertezas):
+    for c, r in enumerate(calib.results):
+        coluna = calib.column(c)
+        if len(coluna) < 4:
+            continue
+        linha = [ensaio, c, *coluna[:4], empacota(coluna[4:])]
+        if r is None:
+            linha += [None] * 7
+        else:
+            linha += [empacota(r.volumes[2:]), *r.results,
+                      incertezas[c] if incertezas else None, r.ok_sis, r.ok_ale]
+        yield linha
+
+
+class Historico:
+    def __init__(self, caminho=None):
+        self.caminho = caminho or caminho_padrao()
+        os.makedirs(os.path.dirname(os.path.abspath(self.caminho)), exist_ok=True)
+        self.db = sqlite3.connect(self.caminho)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode = WAL")
+        # com WAL, o NORMAL só arrisca a última transação numa queda de energia
+        self.db.execute("PRAGMA synchronous = NORMAL")
+        self.db.execute("PRAGMA foreign_keys = ON")
+        versao = self.db.execute("PRAGMA user_version").fetchone()[0]
+        if versao > VERSAO:
+            raise sqlite3.DatabaseError("Histórico gravado por uma versão mais nova do V.A.Ca.")
+        with self.db:
+            self.db.executescript(ESQUEMA)
+            if 0 < versao < 2:
+                # banco anterior às tendências: as somas são feitas uma vez
+                self.db.execute(_TENDENCIAS.format("1"), {"peso": 1})
+            self.db.execute("PRAGMA user_version = %d" % VERSAO)
+
+    def grava(self, ensaios):
+        # ensaios: [(run, calib, incertezas, origem), ...], com o run no
+        # formato dos .json do lote, o engine.CalibrationRun e as incertezas
+        # expandidas de cada coluna (ou None). Devolve os ids
+        insere = "INSERT INTO ensaios (%s) VALUES (%s)" % (", ".join(CAMPOS),
+                                                           ", ".join("?" * len(CAMPOS)))
+        colunas = "INSERT INTO colunas VALUES (%s)" % ", ".join("?" * len(COLUNAS))
+        ids = []
+        with self.db:
+            origens = [{"origem": origem, "peso": -1}
+                       for _, _, _, origem in ensaios if origem is not None]
+            # os ensaios substituídos saem das tendências, e as colunas saem
+            # junto com eles, pelo ON DELETE CASCADE
+            self.db.executemany(_TENDENCIAS.format("e.origem = :origem"), origens)
+            self.db.executemany("DELETE FROM ensaios WHERE origem = :origem", origens)
+            for run, calib, incertezas, origem in ensaios:
+                ensaio = self.db.execute(insere, _ensaio(run, calib, origem)).lastrowid
+                self.db.executemany(colunas, _colunas(ensaio, calib, incertezas))
+                ids.append(ensaio)
+            if ids:
+                self.db.execute(_TENDENCIAS.format("e.id >= :id"), {"id": ids[0], "peso": 1})
+            if origens:
+                # os pontos que ficaram sem nenhum ensaio são descartados
+                self.db.execute("DELETE FROM tendencias WHERE n <= 0")
+        return ids
+
+    def tendencias(self, inst_id=None):
+        # somas das tendências de um instrumento, ou de todos
+        if inst_id is None:
+            return self.db.execute("SELECT * FROM tendencias ORDER BY inst_id, tipo, v_nom, "
+                                   "v_s, canal").fetchall()
+        return self.db.execute("SELECT * FROM tendencias WHERE inst_id = ? ORDER BY tipo, "
+                               "v_nom, v_s, canal", (inst_id,)).fetchall()
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ícones das marcas das tabelas (conforme, alerta e erro).
+
+Cada SVG é lido e rasterizado uma única vez, no primeiro uso, nos tamanhos
+em que as células mostram os ícones e nas escalas das telas (e em 2x, para
+monitores de alta resolução). O mesmo QIcon, feito só de pixmaps, é
+reaproveitado por todas as células: marcar milhares de células não passa
+mais pelo SVG.
+"""
+
+import os
+
+from functools import lru_cache
+
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QGuiApplication, QIcon, QPainter, QPixmap
+
+
+basedir = os.path.dirname(__file__)
+
+# tamanhos, em pixels lógicos, dos ícones nas células das tabelas
+TAMANHOS = (16, 24)
+
+
+@lru_cache(maxsize=None)
+def icone(nome):
+    # o QtSvg só é carregado quando a primeira marca é feita
+    from PySide6.QtSvg import QSvgRenderer
+    renderer = QSvgRenderer(os.path.join(basedir, nome))
+    escalas = {1.0, 2.0}
+    escalas.update(tela.devicePixelRatio() for tela in QGuiApplication.screens())
+    icon = QIcon()
+    for tamanho in TAMANHOS:
+        for escala in sorted(escalas):
+            lado = round(tamanho * escala)
+            pixmap = QPixmap(lado, lado)
+            pixmap.fill(Qt.GlobalColor.transparent)
+            painter = QPainter(pixmap)
+            renderer.render(painter)
+            painter.end()
+            pixmap.setDevicePixelRatio(escala)
+            icon.addPixmap(pixmap)
+    return icon
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+O cálculo e o relatório do V.A.Ca. como eram no MainWindow original, antes
+do engine, sem o Qt: calcular refaz, coluna a coluna, a conversão, as
+estatísticas (com o statistics) e as escadas de if/elif das tolerâncias do
+MainWindow.calcular, e relatorio monta o HTML do
+MainWindow.makeTableDocument, concatenando as células.
+
+O programa não usa este módulo. Ele é a referência com que o bench.py mede
+e confere o cálculo e o relatório atuais, e com que os testes (tests/)
+conferem o engine e a tabela de tolerâncias.
+"""
+
+import statistics
+
+from density import calc_ro_air, calc_ro_water
+from engine import ISO_4787, MULT
+from report import linhas_dados, linhas_res
+
+
+# erro sistemático máximo da vidraria, em mL, por volume nominal (None fora
+# da norma)...
+VIDRARIA = {
+    "bv": lambda v: {5000: 1.2, 2000: 0.6, 1000: 0.4, 500: 0.25, 250: 0.15, 200: 0.15,
+                     100: 0.1, 50: 0.06, 25: 0.04, 20: 0.04, 10: 0.025, 5: 0.025,
+                     2: 0.025, 1: 0.025}.get(v),
+    "bvl": lambda v: {1000: 0.6, 50: 0.1, 25: 0.06, 20: 0.06, 10: 0.04, 5: 0.04}.get(v),
+    "b": lambda v: {100: 0.1, 50: 0.05, 25: 0.05, 10: 0.03, 5: 0.01, 2: 0.01,
+                    1: 0.006}.get(v),
+    "pg": lambda v: {25: 0.1, 20: 0.1, 10: 0.05, 5: 0.03, 2: 0.01, 1: 0.007, 0.5: 0.006,
+                     0.2: 0.006, 0.1: 0.006}.get(v),
+    "pv": lambda v: {100: 0.08, 50: 0.05, 25: 0.03, 20: 0.03, 10: 0.02, 5: 0.015,
+                     2: 0.010, 1: 0.008, 0.5: 0.005}.get(v),
+}
+
+
+def _escada(v, degraus, ultimo):
+    for piso, limite in degraus:
+        if v > piso:
+            return limite
+    return ultimo
+
+
+# ... e erros sistemático e aleatório máximos, em %, dos instrumentos de pistão
+PISTAO = {
+    "msa": (lambda v: _escada(v, ((5000, 0.6), (50, 0.8), (10, 1.0), (5, 1.2)), 2.5),
+            lambda v: _escada(v, ((50, 0.3), (10, 0.5), (5, 0.8), (3, 1.5)), 2.0)),
+    "msd2": (lambda v: _escada(v, ((100, 1.2), (20, 1.4), (5, 2.0)), 2.5),
+             lambda v: _escada(v, ((100, 0.4), (20, 0.6), (10, 0.8), (5, 1.0)), 1.5)),
+    "mm": (lambda v: _escada(v, ((50, 1.6), (10, 2.0), (5, 2.4), (2, 5.0)), 8.0),
+           lambda v: _escada(v, ((50, 0.6), (20, 0.8), (10, 1.0), (5, 1.6), (2, 3.0)), 8.0)),
+    "bda": (lambda v: _escada(v, ((5, 0.2), (2, 0.3), (1, 0.5)), 0.6),
+            lambda v: _escada(v, ((50, 0.03), (25, 0.05), (5, 0.07)), 0.1)),
+    "bdm": (lambda v: _escada(v, ((10, 0.2), (2, 0.3), (1, 0.5)), 0.6),
+            lambda v: 0.1),
+    "d": (lambda v: _escada(v, ((0.5, 0.6), (0.1, 1.0), (0.02, 1.5)), 2.0),
+          lambda v: _escada(v, ((0.2, 0.2), (0.05, 0.3), (0.02, 0.4), (0.01, 0.5)), 1.0)),
+}
+
+
+def veredito(kind, v_nom, v_s, e_sis, e_ale):
+    # (ok_sis, ok_ale); o calcular comparava o valor mostrado, com três casas
+    def conforme(erro, limite):
+        return not abs(float("{:.3f}".format(erro))) > limite
+    if kind in VIDRARIA:
+        limite = VIDRARIA[kind](v_nom)
+        return (None if limite is None else conforme(e_sis, limite)), None
+    sis, ale = PISTAO[kind]
+    return (conforme(e_sis, v_nom / v_s * sis(v_nom)),
+            conforme(e_ale, v_nom / v_s * ale(v_nom)))
+
+
+def coluna(column, kind, coef_term, env, tara=False):
+    # a conversão e as estatísticas de uma coluna: os volumes [v_nom, v_s,
+    # v_1, ...] e [média, erro sistemático, erro aleatório]
+    ta, pa, ua, m_evap, ro_b = env.ta, env.pa, env.ua, env.m_evap, env.ro_b
+    mult = MULT[kind]
+    tw = column[2]
+    vol = []
+    for i, ml in enumerate(column):
+        ro_w = calc_ro_water(tw)
+        ro_a = calc_ro_air(ta, ua, pa)
+        if kind in ISO_4787:
+            if tara:
+                v = ml * 1/(ro_w + ro_a) * (1 - ro_a / ro_b) * (1 - coef_term * (tw - 20))
+            elif kind in ("bv", "bvl"):
+                v = (ml - column[3]) * 1/(ro_w + ro_a) * (1 - ro_a / ro_b) * (1 - coef_term * (tw - 20))
+            else:
+                v = (ml - column[i - 1]) * 1/(ro_w + ro_a) * (1 - ro_a / ro_b) * (1 - coef_term * (tw - 20))
+        elif tara:
+            v = (ml + m_evap) * 1/(ro_w + ro_a) * (1 - ro_a / ro_b) * (1 - coef_term * (tw - 20))
+        else:
+            v = (ml - column[i - 1] + m_evap) * 1/(ro_w + ro_a) * (1 - ro_a / ro_b) * (1 - coef_term * (tw - 20))
+        vol.append(v * mult)
+    vol[0] = column[0]
+    vol[1] = column[1]
+    del vol[2:4]
+    mean = statistics.mean(vol[2:])
+    e_sis = mean - vol[1] if kind in ISO_4787 else 100 * (mean - vol[1]) / vol[1]
+    e_ale = 100 * statistics.stdev(vol[2:]) / vol[1]
+    return vol, [mean, e_sis, e_ale]
+
+
+def calcular(table, kind, coef_term, env, tara=False):
+    # (volumes, resultados, ok_sis, ok_ale) de cada coluna; None nas vazias
+    out = []
+    for column in table:
+        if len(column) == 0:
+            out.append(None)
+            continue
+        vol, res = coluna(column, kind, coef_term, env, tara)
+        out.append((vol, res, *veredito(kind, vol[0], vol[1], res[1], res[2])))
+    return out
+
+
+def relatorio(run, tipo, table, volumes, resultados, impresso):
+    # o HTML do makeTableDocument, com as colunas de dados do ensaio (no
+    # formato dos .json do lote), os volumes e os resultados de cada coluna.
+    # A tabela da interface tinha ao menos 5 colunas e 14 linhas
+    colunas = max(5, len(table))
+    linhas = max(14, max((len(c) for c in table), default=0))
+    table_data = [list(c) + ['-'] * (linhas - len(c)) for c in table]
+    vol_data = [list(v) + ['-'] * (linhas - 2 - len(v)) for v in volumes]
+    res_data = [list(r) + ['-'] * (3 - len(r)) for r in resultados]
+    for dados, n in ((table_data, linhas), (vol_data, linhas - 2), (res_data, 3)):
+        dados += [['-'] * n for _ in range(colunas - len(dados))]
+    unid = 'µL' if MULT[run["instKind"]] == 1000 else 'mL'
+    cab_dados = linhas_dados(linhas - 4, unid)
+    cab_res = linhas_res(unid)
+    html = """<html>
+        <head>
+        <title>Relatório de ensaio</title>
+        </head>
+        <body dir="ltr">
+        <p align="right"><small>Página 1 de 2</small></p>
+        <h1 align="center">Relatório de Ensaio</h1>
+        """
+    html += '<p><b>Identificação do equipamento: </b><big>' + run.get("instId", "") + '</big><br>'
+    html += '<b>Tipo:</b> ' + tipo + ', ' + str(run["instMat"]) + '</p>'
+    html += '<p><b>Data de realização do ensaio:</b> ' + run.get("dateEdit", "") + '</p>'
+    html += '<table width="100%"><tr><td width="50%">'
+    html += '<p><b>Identificação dos instrumentos de medida utilizados:</b><br>'
+    html += 'Balança: ' + run.get("balId", "") + '<br>'
+    html += 'Termômetro (temp. ambiente): ' + run.get("termId", "") + '<br>'
+    html += 'Termômetro (temp. da água): ' + run.get("term2Id", "") + '<br>'
+    html += 'Barômetro: ' + run.get("barId", "") + '<br>'
+    html += 'Higrômetro: ' + run.get("higId", "") + '</p>'
+    html += '</td><td width="50%"></td>'
+    html += '<p><b>Parâmetros ambientais:</b><br>'
+    html += 'Temperatura ambiente: ' + str(run["tempAmb"]) + '°C<br>'
+    html += 'Pressão atmosférica: ' + str(run["presAtm"]) + ' hPa<br>'
+    html += 'Umidade relativa do ar: ' + str(run["umidRel"]) + '%<br>'
+    html += 'Perda por evaporação: ' + str(run.get("mEvap", 0.0)) + ' g<br>'
+    html += 'Densidade das massas de referência: ' + str(run.get("densPesos", 8.0)) + ' g·mL⁻¹</p></td></tr></table>'
+    html += '<p><b>Dados das medidas de massa:</b></p>'
+    html += '<table border="1" cellpadding="2" width="100%" style="border-collapse: collapse"><thead>'
+    html += '<tr>'
+    for c in range(colunas + 1):
+        if c == 0:
+            html += '<th width="20%" bgcolor="#E5E4E2"></th>'
+        else:
+            html += '<th  width="16%" bgcolor="#E5E4E2">{}</th>'.format(c)
+    html += '</tr></thead>'
+    for r in range(linhas):
+        html += '<tr>'
+        html += '<td bgcolor="#E5E4E2">{}</td>'.format(cab_dados[r])
+        for c in range(colunas):
+            item = table_data[c][r]
+            if isinstance(item, str):
+                html += '<td align="right">{}</td>'.format(item)
+            else:
+                html += '<td align="right">{}</td>'.format(str(item).replace(".", ","))
+        html += '</tr>'
+    html += '</table>'
+    html += '<div style="page-break-before:always"><p align="right"><small>Página 2 de 2</small></p>'
+    html += '<p><b>Dados das medidas convertidos para volume:</b></p>'
+    html += '<table border="1" cellpadding="2" width="100%" style="border-collapse: collapse"><thead>'
+    html += '<tr>'
+    for c in range(colunas + 1):
+        if c == 0:
+            html += '<th width="20%" bgcolor="#E5E4E2"></th>'
+        else:
+            html += '<th width="16%" bgcolor="#E5E4E2">{}</th>'.format(c)
+    html += '</tr></thead>'
+    for r in range(linhas - 2):
+        html += '<tr>'
+        if r == 0 or r == 1:
+            html += '<td bgcolor="#E5E4E2">{}</td>'.format(cab_dados[r])
+        else:
+            html += '<td bgcolor="#E5E4E2">{}</td>'.format(str(r-1) + 'ª medida, em ' + unid)
+        for c in range(colunas):
+            item = vol_data[c][r]
+            if isinstance(item, str):
+                html += '<td align="right">{}</td>'.format(item)
+            else:
+                item = "{:.3f}".format(item).replace(".", ",")
+                html += '<td align="right">{}</td>'.format(item)
+        html += '</tr>'
+    html += '</table>'
+    html += '<p><b>Resultados:</b></p>'
+    html += '<table border="1" cellpadding="2" width="100%" style="border-collapse: collapse"><thead>'
+    html += '<tr>'
+    for c in range(colunas + 1):
+        if c == 0:
+            html += '<th width="20%" bgcolor="#E5E4E2"></th>'
+        else:
+            html += '<th width="16%" bgcolor="#E5E4E2">{}</th>'.format(c)
+    html += '</tr></thead>'
+    html += '<tbody>'
+    for r in range(3):
+        html += '<tr>'
+        html += '<td bgcolor="#E5E4E2">{}</td>'.format(cab_res[r])
+        for c in range(colunas):
+            item = res_data[c][r]
+            if isinstance(item, str):
+                html += '<td align="right">{}</td>'.format(item)
+            else:
+                item = "{:.3f}".format(item).replace(".", ",")
+                html += '<td align="right">{}</td>'.format(item)
+        html += '</tr>'
+    html += '</tbody></table>'
+    html += '<p>&nbsp;</p>'
+    html += '<hr align="center" width=20% noshade>'
+    html += '<p align="center">Responsável pelo ensaio</p>'
+    html += '<p>&nbsp;</p>'
+    html += '<p align="right"><small>Impresso por V.A.Ca (v. <i>Angus</i>) em {}.</small></p></body></html>'.format(impresso)
+    return html
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Relatório de ensaio, em HTML para o QTextDocument.
+
+O modelo da página é compilado uma vez, na importação, e preenchido a partir
+de um Report: uma cópia imutável do ensaio, feita pela interface na hora da
+impressão. As tabelas são montadas em listas e unidas uma única vez, e nada
+do estado do cálculo é alterado; o mesmo Report gera sempre o mesmo HTML.
+
+A paginação fica com o QTextDocument: as tabelas largas são divididas em
+blocos de colunas, um abaixo do outro, e o cabeçalho de cada tabela (thead)
+se repete quando ela continua na página seguinte. A numeração das páginas é
+desenhada na impressão (export.py), depois que o número de páginas é
+conhecido.
+"""
+
+from html import escape
+from string import Template
+from typing import NamedTuple
+
+
+class Report(NamedTuple):
+    # identificação do ensaio
+    inst_id: str
+    tipo: str
+    material: str
+    data: str  # data do ensaio, dd/MM/aaaa
+    bal_id: str
+    term_id: str
+    term2_id: str
+    bar_id: str
+    hig_id: str
+    # parâmetros ambientais, já como texto
+    ta: str
+    pa: str
+    ua: str
+    m_evap: str
+    ro_b: str
+    unid: str  # mL ou µL
+    colunas: int
+    # rótulos das linhas das tabelas de dados e de resultados
+    linhas_dados: tuple
+    linhas_res: tuple
+    # uma tupla por coluna; colunas sem resultado ficam vazias
+    dados: tuple
+    volumes: tuple
+    resultados: tuple
+    veredito: str  # conformidade dos canais das multicanal, ou ""
+    impresso: str  # data e hora da impressão
+    rotulos: tuple = ()  # rótulos das colunas; vazio numera a partir de 1
+
+
+# colunas de valores por tabela; as demais vão para os blocos seguintes
+COLUNAS_POR_TABELA = 10
+
+
+# cabeçalho das linhas das tabelas de dados e de resultados
+def linhas_dados(medidas, unid="mL"):
+    return (["Volume nominal, em " + unid, "Volume ensaiado, em " + unid,
+             "Temperatura da água, em °C", "Massa do recipiente, em g"]
+            + ["%dª medida, em g" % (i + 1) for i in range(medidas)])
+
+
+def linhas_res(unid="mL"):
+    # em µL, o erro sistemático é apresentado em %
+    return ["Volume medido, em " + unid,
+            "Erro sistemático, em " + ("mL" if unid == "mL" else "%"),
+            "Erro aleatório, em %", "Incerteza expandida (k = 2), em " + unid]
+
+
+def rotulos_multicanal(colunas, canais):
+    # as colunas das multicanal vêm agrupadas por volume: V1/C1, V1/C2, ...
+    return ["V%d/C%d" % (c // canais + 1, c % canais + 1) for c in range(colunas)]
+
+
+def texto_veredito(vereditos, instrumento, norma):
+    # conformidade de cada canal e do instrumento, por extenso
+    texto = "Canais conformes: %d de %d." % (vereditos.count(True), len(vereditos))
+    nao = [str(c + 1) for c, ok in enumerate(vereditos) if ok is False]
+    if nao:
+        texto += " Não conformes: " + ", ".join(nao) + "."
+    falta = [str(c + 1) for c, ok in enumerate(vereditos) if ok is None]
+    if falta:
+        texto += " Sem resultado para todos os volumes: " + ", ".join(falta) + "."
+    if instrumento is None:
+        texto += " Avaliação do instrumento incompleta."
+    elif instrumento:
+        texto += " Instrumento conforme com a norma " + norma + "."
+    else:
+        texto += " Instrumento não conforme com a norma " + norma + "."
+    return texto
+
+
+PAGINA = Template("""<html>
+<head>
+<title>Relatório de ensaio</title>
+</head>
+<body dir="ltr">
+<h1 align="center">Relatório de Ensaio</h1>
+<p><b>Identificação do equipamento: </b><big>$inst_id</big><br>\
+<b>Tipo:</b> $tipo, $material</p>\
+<p><b>Data de realização do ensaio:</b> $data</p>\
+<table width="100%"><tr><td width="50%">\
+<p><b>Identificação dos instrumentos de medida utilizados:</b><br>\
+Balança: $bal_id<br>\
+Termômetro (temp. ambiente): $term_id<br>\
+Termômetro (temp. da água): $term2_id<br>\
+Barômetro: $bar_id<br>\
+Higrômetro: $hig_id</p>\
+</td><td width="50%"></td>\
+<p><b>Parâmetros ambientais:</b><br>\
+Temperatura ambiente: $ta°C<br>\
+Pressão atmosférica: $pa hPa<br>\
+Umidade relativa do ar: $ua%<br>\
+Perda por evaporação: $m_evap g<br>\
+Densidade das massas de referência: $ro_b g·mL⁻¹</p></td></tr></table>\
+<p><b>Dados das medidas de massa:</b></p>\
+$dados\
+<p style="page-break-before:always"><b>Dados das medidas convertidos para volume:</b></p>\
+$volumes\
+<p><b>Resultados:</b></p>\
+$resultados\
+$veredito\
+<p>&nbsp;</p>\
+<hr align="center" width=20% noshade>\
+<p align="center">Responsável pelo ensaio</p>\
+<p>&nbsp;</p>\
+<p align="right"><small>Impresso por V.A.Ca (v. <i>Angus</i>) em $impresso.</small></p></body></html>""")
+
+
+# formato de cada número; a vírgula decimal entra depois, uma vez por linha
+_massa = str  # as massas saem com a resolução em que foram lidas
+_volume = "{:.3f}".format
+
+_CELULAS = '</td><td align="right">'
+
+
+def _tabela(linhas, rotulos, valores, fmt):
+    # linhas e rotulos são os rótulos das linhas e das colunas; o que falta
+    # nas colunas sai como "-". Até 5 colunas, as tabelas ocupam a largura
+    # da página; as mais largas são divididas em blocos de COLUNAS_POR_TABELA.
+    # Cada coluna é formatada de uma vez, e cada linha é um join só
+    n = len(rotulos)
+    m = len(linhas)
+    largura = 80 / max(5, min(n, COLUNAS_POR_TABELA))
+    vazia = ["-"] * m
+    blocos = []
+    for a in range(0, n, COLUNAS_POR_TABELA):
+        bloco = range(a, min(n, a + COLUNAS_POR_TABELA))
+        cols = []
+        for c in bloco:
+            col = list(map(fmt, valores[c][:m])) if c < len(valores) else []
+            cols.append(col + vazia[len(col):])
+        out = ['<table border="1" cellpadding="2" width="{:g}%" style="border-collapse: collapse">'
+               '<thead><tr><th width="20%" bgcolor="#E5E4E2"></th>'.format(20 + largura * len(bloco))]
+        out.extend('<th width="{:g}%" bgcolor="#E5E4E2">{}</th>'.format(largura, escape(rotulos[c]))
+                   for c in bloco)
+        out.append('</tr></thead><tbody>')
+        out.extend('<tr><td bgcolor="#E5E4E2">{}</td><td align="right">{}</td></tr>'.format(
+                       rotulo, _CELULAS.join(celulas).replace(".", ","))
+                   for rotulo, celulas in zip(linhas, zip(*cols)))
+        out.append('</tbody></table>')
+        blocos.append("".join(out))
+    # um espaço entre os blocos
+    return "<p></p>".join(blocos)
+
+
+def render(r):
+    # a tabela de volumes tem as duas primeiras linhas da de dados e uma por medida
+    linhas_vol = (*r.linhas_dados[:2],
+                  *("{}ª medida, em {}".format(m, r.unid)
+                    for m in range(1, len(r.linhas_dados) - 3)))
+    rotulos = r.rotulos or [str(c + 1) for c in range(r.colunas)]
+    texto = {campo: escape(getattr(r, campo))
+             for campo in ("inst_id", "tipo", "material", "data", "bal_id", "term_id",
+                           "term2_id", "bar_id", "hig_id")}
+    return PAGINA.substitute(
+        texto,
+        ta=r.ta, pa=r.pa, ua=r.ua, m_evap=r.m_evap, ro_b=r.ro_b,
+        dados=_tabela(r.linhas_dados, rotulos, r.dados, _massa),
+        volumes=_tabela(linhas_vol, rotulos, r.volumes, _volume),
+        resultados=_tabela(r.linhas_res, rotulos, r.resultados, _volume),
+        veredito='<p><b>Avaliação dos canais:</b> {}</p>'.format(escape(r.veredito)) if r.veredito else "",
+        impresso=r.impresso)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Arquivo de ensaio (.vaca): o formulário inteiro, para ser reaberto depois.
+
+O arquivo começa com a assinatura, a versão do formato e o tamanho de um
+cabeçalho em JSON, com os campos do formulário no formato dos .json do lote
+(batch.py), sem a tabela. Depois vêm os números, em doubles little-endian
+(array("d")): as massas de cada coluna (o "tableData" do lote), a grade da
+tabela de dados como está na tela (valores, estado e casas decimais de cada
+célula) e os volumes de cada coluna calculada. Os resultados e o orçamento
+de incerteza de cada coluna vão no cabeçalho.
+
+Nada aqui depende do Qt: o lote lê os .vaca como lê os .json.
+"""
+
+import json
+import struct
+import sys
+
+from array import array
+from typing import NamedTuple
+
+from engine import CalibrationRun, ColumnResult, parse_run
+from uncertainty import Budget
+
+
+ASSINATURA = b"VACA"
+VERSAO = 1
+EXTENSAO = ".vaca"
+
+# assinatura, versão e tamanho do cabeçalho
+_INICIO = struct.Struct("<4sHI")
+
+
+class Grade(NamedTuple):
+    # tabela de dados da interface, célula a célula (tablemodel.DataModel)
+    linhas: int
+    colunas: int
+    values: array
+    state: bytes
+    casas: bytes
+    texts: dict  # posição -> texto das células que não são números
+
+
+class Sessao(NamedTuple):
+    run: dict  # formato dos .json do lote; ao abrir, com o "tableData"
+    calib: CalibrationRun  # a tabela e os resultados de cada coluna
+    budgets: tuple  # uncertainty.Budget de cada coluna, ou None
+    grade: Grade
+    origem: str  # identificação do ensaio no histórico (history.py)
+
+
+def _doubles(valores):
+    a = array("d", valores)
+    if sys.byteorder == "big":
+        a.byteswap()
+    return a.tobytes()
+
+
+def salva(filename, sessao):
+    run = dict(sessao.run)
+    run.pop("tableData", None)
+    calib = sessao.calib
+    grade = sessao.grade
+    calculadas = [(c, r, b) for c, (r, b) in enumerate(zip(calib.results, sessao.budgets))
+                  if r is not None and b is not None]
+    cabecalho = {
+        "run": run,
+        "origem": sessao.origem,
+        "medidas": [b - a for a, b in zip(calib.inicio, calib.inicio[1:])],
+        "grade": [grade.linhas, grade.colunas],
+        "textos": {str(p): t for p, t in grade.texts.items()},
+        "resultados": [[c, len(r.volumes), r.results, r.ok_sis, r.ok_ale,
+                        b.u, b.U, b.k, b.contributions] for c, r, b in calculadas],
+    }
+    texto = json.dumps(cabecalho, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    with open(filename, "wb") as f:
+        f.write(_INICIO.pack(ASSINATURA, VERSAO, len(texto)))
+        f.write(texto)
+        f.write(_doubles(calib.dados))
+        f.write(_doubles(grade.values))
+        f.write(bytes(grade.state))
+        f.write(bytes(grade.casas))
+        for _, r, _ in calculadas:
+            f.write(_doubles(r.volumes))
+
+
+def abre(filename):
+    with open(filename, "rb") as f:
+        conteudo = f.read()
+    if len(conteudo) < _INICIO.size:
+        raise ValueError("O arquivo não é um ensaio do V.A.Ca.")
+    assinatura, versao, tamanho = _INICIO.unpack_from(conteudo)
+    if assinatura != ASSINATURA:
+        raise ValueError("O arquivo não é um ensaio do V.A.Ca.")
+    if versao > VERSAO:
+        raise ValueError("O ensaio foi gravado por uma versão mais nova do V.A.Ca.")
+    if versao < 1:
+        raise ValueError("O arquivo não é um ensaio do V.A.Ca.")
+    p = _INICIO.size + tamanho
+    if len(conteudo) < p:
+        raise ValueError("O arquivo do ensaio está incompleto.")
+    try:
+        cabecalho = json.loads(conteudo[_INICIO.size:p].decode("utf-8"))
+    except ValueError:
+        raise ValueError("O arquivo do ensaio está corrompido.") from None
+    # os números vêm todos de uma vez; as colunas são fatias do mesmo array
+    medidas = cabecalho["medidas"]
+    linhas, colunas = cabecalho["grade"]
+    celulas = linhas * colunas
+    resultados = cabecalho["resultados"]
+    doubles = sum(medidas) + celulas
+    if len(conteudo) != p + 8 * doubles + 2 * celulas + 8 * sum(r[1] for r in resultados):
+        raise ValueError("O arquivo do ensaio está incompleto.")
+    numeros = array("d")
+    numeros.frombytes(conteudo[p:p + 8 * doubles])
+    p += 8 * doubles
+    state = conteudo[p:p + celulas]
+    casas = conteudo[p + celulas:p + 2 * celulas]
+    p += 2 * celulas
+    numeros.frombytes(conteudo[p:])
+    if sys.byteorder == "big":
+        numeros.byteswap()
+    run = cabecalho["run"]
+    inicio = array("L", [0])
+    for m in medidas:
+        inicio.append(inicio[-1] + m)
+    a = inicio[-1]
+    dados = numeros[:a]
+    # o lote lê o ensaio como lê os .json
+    run["tableData"] = [dados[i:j].tolist() for i, j in zip(inicio, inicio[1:])]
+    grade = Grade(linhas, colunas, numeros[a:a + celulas], state, casas,
+                  {int(p): t for p, t in cabecalho["textos"].items()})
+    a += celulas
+    results = [None] * len(medidas)
+    budgets = [None] * len(medidas)
+    for c, nvol, res, ok_sis, ok_ale, u, U, k, contrib in resultados:
+        results[c] = ColumnResult(numeros[a:a + nvol], tuple(res), ok_sis, ok_ale)
+        budgets[c] = Budget(u, U, k, tuple(contrib))
+        a += nvol
+    kind, coef_term, env = parse_run(run)
+    calib = CalibrationRun(kind, coef_term, env, bool(run.get("checkTara", False)),
+                           run.get("canais") or 0, dados, inicio, tuple(results))
+    return Sessao(run, calib, tuple(budgets), grade, cabecalho.get("origem"))
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Média e desvio-padrão das medidas de um volume ensaiado.
+
+RunningStats acumula as medidas uma a uma (algoritmo de Welford, com o
+incremento da média somado com compensação de Kahan), para quem as recebe
+aos poucos, como na leitura da balança: cada medida custa O(1), e a média,
+a variância e o coeficiente de variação estão sempre em dia. mean_stdev
+e column_stats são a forma em lote, em duas passadas com math.fsum; o
+resultado difere do módulo statistics em poucos ulps, sem passar pelas
+frações exatas que o tornam lento.
+"""
+
+import math
+
+from array import array
+
+
+class RunningStats:
+    __slots__ = ("n", "shift", "_mean", "m2", "_c")
+
+    def __init__(self, values=()):
+        self.n = 0
+        # as medidas são acumuladas como desvios da primeira, que é da ordem
+        # do desvio-padrão e não do volume: a variância não perde dígitos
+        self.shift = 0.0
+        self._mean = 0.0
+        self.m2 = 0.0
+        # compensação da soma da média
+        self._c = 0.0
+        for x in values:
+            self.add(x)
+
+    def add(self, x):
+        if self.n == 0:
+            self.shift = x
+        x -= self.shift
+        self.n += 1
+        delta = x - self._mean
+        y = delta / self.n - self._c
+        t = self._mean + y
+        self._c = (t - self._mean) - y
+        self._mean = t
+        self.m2 += delta * (x - self._mean)
+
+    @property
+    def mean(self):
+        return self.shift + self._mean
+
+    @property
+    def variance(self):
+        # variância amostral; indefinida com menos de duas medidas
+        return self.m2 / (self.n - 1) if self.n > 1 else math.nan
+
+    @property
+    def stdev(self):
+        return math.sqrt(self.variance)
+
+    def cv(self, ref=None):
+        # coeficiente de variação: o desvio-padrão como um percentual da
+        # média, ou de ref (o volume ensaiado, no erro aleatório)
+        return 100 * self.stdev / (self.mean if ref is None else ref)
+
+
+def mean_stdev(values):
+    n = len(values)
+    mean = math.fsum(values) / n
+    return mean, math.sqrt(math.fsum((x - mean)**2 for x in values) / (n - 1))
+
+
+def column_stats(columns):
+    # média e desvio-padrão de várias colunas de uma vez, em dois arrays
+    means = array("d", bytes(8 * len(columns)))
+    stdevs = array("d", bytes(8 * len(columns)))
+    for k, values in enumerate(columns):
+        means[k], stdevs[k] = mean_stdev(values)
+    return means, stdevs
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Folha de estilo da interface (vaca.qss).
+
+A folha é lida da pasta do programa, e não da pasta de onde ele foi aberto.
+As imagens do tema (url(theme/...)) passam a apontar para os caminhos
+completos, e os comentários e espaços são retirados. A folha pronta fica na
+pasta de cache do usuário, com o hash da original (e da pasta do programa)
+no nome: enquanto a vaca.qss não muda, a abertura só lê a cópia pronta.
+"""
+
+import hashlib
+import os
+import re
+
+from PySide6.QtCore import QStandardPaths
+
+
+basedir = os.path.dirname(os.path.abspath(__file__))
+
+FOLHA = os.path.join(basedir, "vaca.qss")
+
+_COMENTARIO = re.compile(r"/\*.*?\*/", re.DOTALL)
+_ESPACOS = re.compile(r"\s+")
+_SEPARADOR = re.compile(r" ?([{};,]) ?")
+_TEMA = re.compile(r"""url\((["']?)(theme/[^)"']*)\1\)""")
+
+
+def compila(texto, pasta=basedir):
+    # url() entre aspas, pra pasta poder ter espaços ("Program Files")
+    pasta = pasta.replace(os.sep, "/")
+    texto = _COMENTARIO.sub("", texto)
+    texto = _ESPACOS.sub(" ", texto)
+    texto = _SEPARADOR.sub(r"\1", texto)
+    return _TEMA.sub(lambda m: 'url("%s/%s")' % (pasta, m.group(2)), texto).strip()
+
+
+def _cache():
+    # a pasta vem dos nomes da organização e da aplicação, definidos pelo
+    # vaca.py antes de carregar a folha
+    return QStandardPaths.writableLocation(QStandardPaths.StandardLocation.CacheLocation)
+
+
+def folha_de_estilo(arquivo=FOLHA):
+    with open(arquivo, "rb") as f:
+        original = f.read()
+    chave = hashlib.sha1(original + basedir.encode()).hexdigest()[:16]
+    pasta = _cache()
+    pronta = os.path.join(pasta, "vaca-%s.qss" % chave) if pasta else None
+    if pronta:
+        try:
+            with open(pronta, encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            pass
+    texto = compila(original.decode("utf-8"))
+    if pronta:
+        # sem cache (pasta sem permissão, por exemplo) a folha só é compilada
+        # de novo na próxima abertura
+        try:
+            os.makedirs(pasta, exist_ok=True)
+            for velha in os.listdir(pasta):
+                if velha.startswith("vaca-") and velha.endswith(".qss"):
+                    os.remove(os.path.join(pasta, velha))
+            temp = pronta + ".tmp"
+            with open(temp, "w", encoding="utf-8") as f:
+                f.write(texto)
+            os.replace(temp, pronta)
+        except OSError:
+            pass
+    return texto
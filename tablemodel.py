@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modelos das tabelas de dados e de resultados.
+
+Os valores ficam num array de floats contíguo, coluna após coluna (cada
+coluna é um volume ensaiado), com uma máscara do estado de cada célula. O
+texto só é formatado quando o Qt pede uma célula visível; só o que não é
+número (um valor inválido ou ainda sendo digitado) é guardado como texto.
+"""
+
+import math
+import re
+
+from array import array
+from decimal import Decimal, InvalidOperation
+
+from PySide6.QtCore import QAbstractTableModel, QLocale, QModelIndex, Qt
+
+
+# estado de cada célula
+VAZIO, NUMERO, PARCIAL, INVALIDO = range(4)
+
+# começo de um número ainda sendo digitado, como "-", "1e" ou "1e-"
+NUMERO_PARCIAL = re.compile(r"[+-]?\d*\.?\d*([eE][+-]?)?$")
+
+# os números são apresentados no formato brasileiro, como no relatório
+LOCALE = QLocale(QLocale.Language.Portuguese, QLocale.Country.Brazil)
+
+_EDICAO = (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole)
+_MARCAS = (Qt.ItemDataRole.DecorationRole, Qt.ItemDataRole.ToolTipRole)
+
+
+def parse_cell(text):
+    # (estado, valor, casas decimais) do texto digitado numa célula; aceita
+    # vírgula ou ponto como separador decimal
+    text = text.strip().replace(",", ".")
+    if not text:
+        return VAZIO, 0.0, 0
+    try:
+        d = Decimal(text)
+    except InvalidOperation:
+        return (PARCIAL if NUMERO_PARCIAL.match(text) else INVALIDO), 0.0, 0
+    if not d.is_finite():
+        return INVALIDO, 0.0, 0
+    value = float(text)
+    # um Decimal finito ainda pode estourar o float ("1e400")
+    if not math.isfinite(value):
+        return INVALIDO, 0.0, 0
+    return NUMERO, value, min(max(0, -d.as_tuple().exponent), 255)
+
+
+def format_number(value, casas):
+    return "{:.{}f}".format(value, casas).replace(".", LOCALE.decimalPoint())
+
+
+def _numero(value, casas=3):
+    # sem valor (None ou nan) fica em branco
+    if value is None or math.isnan(value):
+        return ""
+    return format_number(value, casas)
+
+
+def _volume(value):
+    # volumes nominal e ensaiado com as casas com que foram gravados: 0,02 mL
+    # e 0,05 mL são pontos diferentes
+    return "{:g}".format(value).replace(".", LOCALE.decimalPoint())
+
+
+class _ArrayModel(QAbstractTableModel):
+    # base das duas tabelas: valores, estados e marcas (ícone e dica) por
+    # célula, na posição coluna * linhas + linha
+
+    def __init__(self, headers, columns, parent=None):
+        super().__init__(parent)
+        self.headers = list(headers)
+        self._rows = len(self.headers)
+        self._cols = columns
+        # rótulos das colunas; None numera as colunas a partir de 1
+        self.labels = None
+        self._alloc()
+
+    def _alloc(self):
+        n = self._rows * self._cols
+        self.values = array("d", bytes(8 * n))
+        self.state = bytearray(n)
+        # só as células com erro ou avaliadas têm marca
+        self.marks = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._cols
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Vertical:
+            return self.headers[section]
+        if self.labels is not None and section < len(self.labels):
+            return self.labels[section]
+        return str(section + 1)
+
+    def set_header(self, row, text):
+        self.headers[row] = text
+        self.headerDataChanged.emit(Qt.Orientation.Vertical, row, row)
+
+    def set_labels(self, labels):
+        self.labels = None if labels is None else list(labels)
+        self.headerDataChanged.emit(Qt.Orientation.Horizontal, 0, self._cols - 1)
+
+    def set_column_count(self, columns):
+        # as colunas são blocos contíguos: aumentar ou diminuir a tabela é só
+        # acrescentar ou cortar o fim dos arrays
+        if columns > self._cols:
+            self.beginInsertColumns(QModelIndex(), self._cols, columns - 1)
+            self._resize(columns)
+            self.endInsertColumns()
+        elif columns < self._cols:
+            self.beginRemoveColumns(QModelIndex(), columns, self._cols - 1)
+            self._resize(columns)
+            self.endRemoveColumns()
+
+    def _resize(self, columns):
+        n = self._rows * columns
+        extra = n - len(self.state)
+        if extra > 0:
+            self.values.extend(array("d", bytes(8 * extra)))
+            self.state.extend(bytes(extra))
+        else:
+            del self.values[n:]
+            del self.state[n:]
+            for p in [p for p in self.marks if p >= n]:
+                del self.marks[p]
+        self._cols = columns
+
+    def set_rows(self, headers):
+        # muda o número de linhas; os dados das linhas que ficam são mantidos
+        rows = len(headers)
+        if rows == self._rows:
+            self.headers = list(headers)
+            self.headerDataChanged.emit(Qt.Orientation.Vertical, 0, rows - 1)
+            return
+        inserir = rows > self._rows
+        if inserir:
+            self.beginInsertRows(QModelIndex(), self._rows, rows - 1)
+        else:
+            self.beginRemoveRows(QModelIndex(), rows, self._rows - 1)
+        self._relayout(rows)
+        self._rows = rows
+        self.headers = list(headers)
+        if inserir:
+            self.endInsertRows()
+        else:
+            self.endRemoveRows()
+
+    def _relayout(self, rows):
+        # Cada coluna ocupa um bloco de self._rows posições; com outro número
+        # de linhas, os blocos são copiados para os novos arrays, um por vez
+        n = min(rows, self._rows)
+        self.values = self._copy(self.values, array("d", bytes(8 * rows * self._cols)), rows, n)
+        self.state = self._copy(self.state, bytearray(rows * self._cols), rows, n)
+        self.marks = self._remap(self.marks, rows)
+
+    def _copy(self, old, new, rows, n):
+        for c in range(self._cols):
+            new[c * rows:c * rows + n] = old[c * self._rows:c * self._rows + n]
+        return new
+
+    def _remap(self, sparse, rows):
+        out = {}
+        for p, v in sparse.items():
+            c, r = divmod(p, self._rows)
+            if r < rows:
+                out[c * rows + r] = v
+        return out
+
+    def pos(self, row, column):
+        return column * self._rows + row
+
+    def _text(self, p):
+        raise NotImplementedError
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        p = self.pos(index.row(), index.column())
+        if role in _EDICAO:
+            return self._text(p)
+        if role == Qt.ItemDataRole.DecorationRole and p in self.marks:
+            return self.marks[p][0]
+        if role == Qt.ItemDataRole.ToolTipRole and p in self.marks:
+            return self.marks[p][1]
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return int(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+        return None
+
+    def text(self, row, column):
+        return self._text(self.pos(row, column))
+
+    def column(self, column):
+        # valores e estados de uma coluna, sem formatar nada
+        a = column * self._rows
+        return self.values[a:a + self._rows], self.state[a:a + self._rows]
+
+    def mark(self, row, column, icon, tip):
+        self.marks[self.pos(row, column)] = (icon, tip)
+        index = self.index(row, column)
+        self.dataChanged.emit(index, index, _MARCAS)
+
+    def clear_marks(self, column):
+        a = column * self._rows
+        for p in range(a, a + self._rows):
+            self.marks.pop(p, None)
+        self.dataChanged.emit(self.index(0, column), self.index(self._rows - 1, column), _MARCAS)
+
+    def clear(self):
+        self.beginResetModel()
+        self._alloc()
+        self.endResetModel()
+
+
+class DataModel(_ArrayModel):
+    # tabela de dados do ensaio, editável
+
+    def _alloc(self):
+        super()._alloc()
+        n = self._rows * self._cols
+        # casas decimais digitadas, pra mostrar o número com a mesma resolução
+        self.casas = bytearray(n)
+        # texto das células que não são números
+        self.texts = {}
+
+    def _resize(self, columns):
+        n = self._rows * columns
+        extra = n - len(self.casas)
+        if extra > 0:
+            self.casas.extend(bytes(extra))
+        else:
+            del self.casas[n:]
+            for p in [p for p in self.texts if p >= n]:
+                del self.texts[p]
+        super()._resize(columns)
+
+    def _relayout(self, rows):
+        n = min(rows, self._rows)
+        self.casas = self._copy(self.casas, bytearray(rows * self._cols), rows, n)
+        self.texts = self._remap(self.texts, rows)
+        super()._relayout(rows)
+
+    def _text(self, p):
+        estado = self.state[p]
+        if estado == NUMERO:
+            return format_number(self.values[p], self.casas[p])
+        if estado == VAZIO:
+            return ""
+        return self.texts[p]
+
+    def flags(self, index):
+        return (Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled
+                | Qt.ItemFlag.ItemIsEditable)
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not index.isValid() or role != Qt.ItemDataRole.EditRole:
+            return False
+        p = self.pos(index.row(), index.column())
+        text = "" if value is None else str(value)
+        estado, valor, casas = parse_cell(text)
+        self.state[p] = estado
+        self.values[p] = valor
+        self.casas[p] = casas
+        if estado in (PARCIAL, INVALIDO):
+            self.texts[p] = text.strip()
+        else:
+            self.texts.pop(p, None)
+        self.dataChanged.emit(index, index, _EDICAO)
+        return True
+
+    def set_text(self, row, column, text):
+        return self.setData(self.index(row, column), text)
+
+    def contents(self):
+        # cópia de todas as células, para gravar o ensaio (session.Grade)
+        return (self._rows, self._cols, array("d", self.values), bytes(self.state),
+                bytes(self.casas), dict(self.texts))
+
+    def set_contents(self, values, state, casas, texts):
+        # troca todas as células de uma vez, sem mudar o tamanho da tabela
+        n = self._rows * self._cols
+        if len(values) != n or len(state) != n or len(casas) != n:
+            raise ValueError("O tamanho da tabela não confere.")
+        self.beginResetModel()
+        self.values = array("d", values)
+        self.state = bytearray(state)
+        self.casas = bytearray(casas)
+        self.texts = dict(texts)
+        self.marks = {}
+        self.endResetModel()
+
+
+class ResultModel(_ArrayModel):
+    # tabela de resultados, só leitura, com 3 casas decimais
+
+    def _text(self, p):
+        if self.state[p] == VAZIO:
+            return ""
+        return format_number(self.values[p], 3)
+
+    def flags(self, index):
+        return Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled
+
+    def set_column(self, column, values):
+        a = column * self._rows
+        for row, v in enumerate(values):
+            self.values[a + row] = v
+            self.state[a + row] = NUMERO
+        self.dataChanged.emit(self.index(0, column), self.index(self._rows - 1, column), _EDICAO)
+
+    def clear_column(self, column):
+        a = column * self._rows
+        self.state[a:a + self._rows] = bytes(self._rows)
+        self.clear_marks(column)
+        self.dataChanged.emit(self.index(0, column), self.index(self._rows - 1, column), _EDICAO)
+
+
+class TrendModel(QAbstractTableModel):
+    # deriva de cada ponto de calibração (trends.Tendencia), uma por linha,
+    # formatada só quando o Qt pede a célula
+
+    COLUNAS = ("Instrumento", "Tipo", "Volume nominal", "Volume ensaiado", "Canal", "Ensaios",
+               "Erro sistemático médio", "Deriva sistemática por ano", "Limite sistemático",
+               "Erro aleatório médio, em %", "Deriva aleatória por ano", "Limite aleatório, em %",
+               "Não conformidade prevista")
+
+    def __init__(self, tendencias, tipos, parent=None):
+        super().__init__(parent)
+        self.tendencias = list(tendencias)
+        # nome de cada tipo de instrumento
+        self.tipos = tipos
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.tendencias)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUNAS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.COLUNAS[section]
+        return str(section + 1)
+
+    # texto de cada coluna; só a coluna pedida é formatada
+    _TEXTOS = (
+        lambda t, tipos: t.inst_id,
+        lambda t, tipos: tipos.get(t.tipo, t.tipo),
+        lambda t, tipos: _volume(t.v_nom),
+        lambda t, tipos: _volume(t.v_s),
+        lambda t, tipos: str(t.canal) if t.canal else "",
+        lambda t, tipos: str(t.n),
+        lambda t, tipos: _numero(t.sis.media),
+        lambda t, tipos: _numero(t.sis.deriva),
+        lambda t, tipos: _numero(t.lim_sis),
+        lambda t, tipos: _numero(t.ale.media),
+        lambda t, tipos: _numero(t.ale.deriva),
+        lambda t, tipos: _numero(t.lim_ale),
+        lambda t, tipos: "" if t.previsao is None else t.previsao.strftime("%d/%m/%Y"),
+    )
+
+    def _text(self, t, column):
+        return self._TEXTOS[column](t, self.tipos)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        t = self.tendencias[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self._text(t, index.column())
+        if role == Qt.ItemDataRole.TextAlignmentRole and index.column() > 1:
+            return int(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+        return None
@@ -0,0 +1,5 @@
+# os módulos do V.A.Ca. ficam na pasta do programa, um nível acima
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
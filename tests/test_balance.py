@@ -0,0 +1,126 @@
+# Leitura da balança: as linhas MT-SICS e SBI, o filtro de leituras estáveis
+# e a porta serial, com um pseudoterminal no lugar da balança
+
+import os
+import sys
+
+import pytest
+
+from balance import DIGITOS, BalanceReader, Reading, StableFilter, parse_line
+
+
+@pytest.mark.parametrize("linha, esperado", (
+    # MT-SICS
+    ("S S      100.0012 g\r\n", Reading(100.0012, "100.0012", True, 1e-4)),
+    ("S D      100.0010 g", Reading(100.0010, "100.0010", False, 1e-4)),
+    ("S S     -  0.0003 g", Reading(-0.0003, "-0.0003", True, 1e-4)),
+    ("S S      1250.5 mg", Reading(1.2505, repr(1250.5 * 1e-3), True, 1e-4)),
+    # SBI: a instável vem sem a unidade
+    ("N     +  100.0012 g ", Reading(100.0012, "100.0012", True, 1e-4)),
+    ("N     +  100.0010   ", Reading(100.0010, "100.0010", False, 1e-4)),
+    ("    -    12,35 g", Reading(-12.35, "-12.35", True, 1e-2)),
+))
+def test_pesagens(linha, esperado):
+    r = parse_line(linha)
+    assert (r.mass, r.text, r.stable) == (pytest.approx(esperado.mass), esperado.text,
+                                          esperado.stable)
+    assert r.resolution == pytest.approx(esperado.resolution)
+
+
+@pytest.mark.parametrize("linha", (
+    "S +", "S -",  # sobrecarga e carga abaixo do mínimo no MT-SICS
+    "S I", "ES", "EL", "S S      100.0012 lb", "N     +  Overload", "", "Stat"))
+def test_nao_sao_pesagens(linha):
+    assert parse_line(linha) is None
+
+
+def _estavel(massa, resolucao=1e-4):
+    return Reading(massa, str(massa), True, resolucao)
+
+
+def test_uma_leitura_por_pesagem():
+    filtro = StableFilter()
+    assert filtro.feed(_estavel(10.0)) is not None
+    # o último dígito oscilando não é outra pesagem
+    assert filtro.feed(_estavel(10.0003)) is None
+    assert filtro.feed(_estavel(10.0)) is None
+    # a próxima só depois de uma instável...
+    assert filtro.feed(Reading(20.0, "20.0", False, 1e-4)) is None
+    assert filtro.feed(_estavel(20.0)) is not None
+    # ... ou de uma variação maior que DIGITOS vezes a resolução
+    delta = DIGITOS * 1e-4
+    assert filtro.feed(_estavel(20.0 + 0.9 * delta)) is None
+    assert filtro.feed(_estavel(20.0 + 0.9 * delta + 1.1 * delta)) is not None
+
+
+def test_delta_segue_a_resolucao():
+    # a mesma variação é outra pesagem numa balança de 0,1 mg, mas não numa
+    # de 10 mg
+    for resolucao, outra in ((1e-4, True), (1e-2, False)):
+        filtro = StableFilter()
+        assert filtro.feed(_estavel(50.0, resolucao)) is not None
+        assert (filtro.feed(_estavel(50.05, resolucao)) is not None) is outra
+
+
+def test_delta_informado():
+    filtro = StableFilter(0.5)
+    assert filtro.feed(_estavel(50.0)) is not None
+    assert filtro.feed(_estavel(50.4)) is None
+    assert filtro.feed(_estavel(51.0)) is not None
+
+
+def test_deriva_lenta_nao_e_outra_pesagem():
+    filtro = StableFilter()
+    assert filtro.feed(_estavel(50.0)) is not None
+    # cada passo abaixo do delta, mesmo somando mais que ele
+    assert all(filtro.feed(_estavel(50.0 - k * 5e-4)) is None for k in range(1, 20))
+
+
+def test_zero_nao_e_pesagem():
+    filtro = StableFilter()
+    assert filtro.feed(_estavel(0.0)) is None
+    assert filtro.feed(_estavel(0.0004)) is None
+    assert filtro.feed(_estavel(-0.0002)) is None
+    # o filtro continua armado para a primeira pesagem de verdade
+    assert filtro.feed(_estavel(25.0)) is not None
+    # e tarar a balança com o recipiente em cima não conta
+    filtro.feed(Reading(0.0, "0.0", False, 1e-4))
+    assert filtro.feed(_estavel(0.0)) is None
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="pseudoterminal só no POSIX")
+def test_leitura_pela_porta():
+    import pty
+    from PySide6.QtCore import QCoreApplication, QTimer
+    app = QCoreApplication.instance() or QCoreApplication(["test"])
+    mestre, escravo = pty.openpty()
+    os.set_blocking(mestre, False)
+    leitor = BalanceReader(os.ttyname(escravo), 9600, comando=b"SIR\r\n")
+    massas = []
+    erros = []
+    leitor.massa.connect(massas.append)
+    leitor.erro.connect(erros.append)
+    # as linhas chegam picadas, como numa porta serial de verdade
+    partes = (b"S D      100.0010 g\r\nS S      100.00", b"12 g\r\nS S      100.0013 g\r",
+              b"\nS +\r\nS D      1.0 g\r\nS S        0.0001 g\r\n",
+              b"S S      150.2004 g\r\n")
+    for k, parte in enumerate(partes):
+        QTimer.singleShot(200 + 50 * k, lambda parte=parte: os.write(mestre, parte))
+    QTimer.singleShot(3000, app.quit)
+    leitor.massa.connect(lambda _: app.quit() if len(massas) == 2 else None)
+    leitor.erro.connect(lambda _: app.quit())
+    try:
+        leitor.start()
+        app.exec()
+    finally:
+        leitor.stop()
+        try:
+            comando = os.read(mestre, 64)
+        except BlockingIOError:
+            comando = b""
+        os.close(mestre)
+        os.close(escravo)
+    assert erros == []
+    assert massas == ["100.0012", "150.2004"]
+    # o comando vai para a balança ao conectar
+    assert comando.replace(b"\r\n", b"\n").startswith(b"SIR")
@@ -0,0 +1,57 @@
+# O lote: um erro num ensaio vira uma linha do resumo, sem parar os demais
+
+import json
+
+from batch import process_run, run_batch
+
+
+RUN = {"instId": "Pipeta 01", "instKind": "msa", "instMat": "Polipropileno (PP)",
+       "dateEdit": "2024-01-31", "balId": "", "termId": "", "term2Id": "", "barId": "",
+       "higId": "", "tempAmb": 21.5, "presAtm": 1013.25, "umidRel": 45.0, "mEvap": 0.0,
+       "densPesos": 8.0, "checkTara": True,
+       "tableData": [[1000, 1000, 22.0, 0.0, 0.9975, 0.9981, 0.9969, 0.9978, 0.9972]]}
+
+
+def _grava(pasta, nome, run):
+    caminho = pasta / nome
+    caminho.write_text(json.dumps(run), encoding="utf-8")
+    return caminho
+
+
+def test_resultado_gravado(tmp_path):
+    caminho = _grava(tmp_path, "a.json", RUN)
+    rows, _, _ = process_run(str(caminho), str(tmp_path))
+    assert [r["erro"] for r in rows] == [""]
+    out = json.loads((tmp_path / "a.res.json").read_text(encoding="utf-8"))
+    assert out["columns"][0]["results"] == list(rows[0][k] for k in ("media", "erro_sis",
+                                                                    "erro_ale"))
+
+
+def test_saida_invalida_vira_erro(tmp_path):
+    caminho = _grava(tmp_path, "a.json", RUN)
+    rows, report, registro = process_run(str(caminho), str(tmp_path / "nao" / "existe"))
+    assert len(rows) == 1 and "a.res.json" in rows[0]["erro"]
+    assert report is None and registro is None
+
+
+def test_lote_continua_depois_de_um_erro(tmp_path):
+    pasta = tmp_path / "ensaios"
+    pasta.mkdir()
+    _grava(pasta, "a.json", RUN)
+    _grava(pasta, "b.json", dict(RUN, instKind="xyz"))
+    _grava(pasta, "c.json", RUN)
+    n, erros = run_batch(str(pasta), str(tmp_path / "saida"), jobs=1)
+    assert (n, erros) == (3, 1)
+    assert sorted(p.name for p in (tmp_path / "saida").glob("*.res.json")) == [
+        "a.res.json", "c.res.json"]
+
+
+def test_monte_carlo_no_resultado(tmp_path):
+    run = dict(RUN, semente=8655, incertezas={"u_bal": 1e-5, "u_tw": 0.1})
+    caminho = _grava(tmp_path, "a.json", run)
+    rows, _, _ = process_run(str(caminho), str(tmp_path), monte_carlo=True)
+    assert rows[0]["erro"] == ""
+    mc = json.loads((tmp_path / "a.res.json").read_text(encoding="utf-8"))[
+        "columns"][0]["monte_carlo"]
+    assert mc["seed"] == 8655 and mc["p"] == 0.95
+    assert mc["low"] < rows[0]["media"] < mc["high"]
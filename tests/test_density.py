@@ -0,0 +1,23 @@
+# A tabela da água interpolada contra a fórmula de Tanaka, dentro do limite
+# documentado em density.py, e a fórmula fora da tabela
+
+import pytest
+
+from density import (WATER_MAX_INTERP_ERROR, WATER_STEP, WATER_T_MAX, WATER_T_MIN,
+                     calc_ro_water, interp_ro_water)
+
+
+def test_interpolacao_dentro_do_limite():
+    # passos que não caem nos nós da tabela, de uma ponta à outra
+    passo = WATER_STEP / 7.3
+    n = int((WATER_T_MAX - WATER_T_MIN) / passo)
+    erro = max(abs(interp_ro_water(t) - calc_ro_water(t))
+               for t in (WATER_T_MIN + i * passo for i in range(n + 1)))
+    assert erro <= WATER_MAX_INTERP_ERROR
+    # o limite não está folgado demais (o máximo medido é uns 2,3e-10)
+    assert erro > WATER_MAX_INTERP_ERROR / 2
+
+
+@pytest.mark.parametrize("t", (-0.5, WATER_T_MAX, 45.0))
+def test_fora_da_tabela_usa_a_formula(t):
+    assert interp_ro_water(t) == calc_ro_water(t)
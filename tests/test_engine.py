@@ -0,0 +1,96 @@
+# Regressão do cálculo: o engine tem de continuar dando os mesmos volumes e
+# vereditos do MainWindow.calcular original (original.py) e os mesmos
+# resultados, a menos do último bit da média e do desvio-padrão (statistics
+# trocado por math.fsum)
+
+import math
+import random
+
+import pytest
+
+from engine import INSTRUMENTOS, MULT, Environment, LiveColumn, calculate
+from original import calcular
+
+
+ENV = Environment(21.5, 1013.25, 45.0, 0.001, 8.0)
+
+# volumes nominais de cada tipo, dentro e fora das tabelas das normas
+NOMINAIS = {"bv": (5000, 100, 10, 7), "bvl": (1000, 5, 3), "b": (50, 1, 3),
+            "pg": (25, 0.5, 3), "pv": (100, 0.5, 7), "msa": (1000, 10, 2, 20000),
+            "msd2": (200, 50, 3), "mm": (300, 10, 1), "bda": (50, 2, 0.5),
+            "bdm": (20, 2, 0.5), "d": (1, 0.05, 0.005)}
+
+
+def _coluna(rng, kind, tara):
+    v_nom = rng.choice(NOMINAIS[kind])
+    v_s = v_nom * rng.choice((1, 0.5, 0.1))
+    recipiente = round(rng.uniform(10, 50), 4)
+    massas = []
+    acumulada = recipiente
+    for _ in range(rng.choice((3, 10))):
+        m = round(v_s / MULT[kind] * (1 + rng.gauss(0, 0.003)), 5)
+        if tara:
+            massas.append(m)
+        elif kind in ("bv", "bvl"):
+            massas.append(round(recipiente + m, 5))
+        else:
+            acumulada = round(acumulada + m, 5)
+            massas.append(acumulada)
+    return [v_nom, v_s, round(rng.uniform(15, 30), 1), recipiente, *massas]
+
+
+@pytest.mark.parametrize("tara", (False, True))
+@pytest.mark.parametrize("kind", list(INSTRUMENTOS))
+def test_igual_ao_calculo_original(kind, tara):
+    rng = random.Random("%s:%s" % (kind, tara))
+    for coef_term in (9.9e-6, 2.4e-4):
+        table = [_coluna(rng, kind, tara) for _ in range(20)]
+        for r, (vol, res, ok_sis, ok_ale) in zip(calculate(table, kind, coef_term, ENV, tara),
+                                                  calcular(table, kind, coef_term, ENV, tara)):
+            assert list(r.volumes) == vol
+            assert r.results == pytest.approx(res, rel=1e-12, abs=1e-12)
+            assert (r.ok_sis, r.ok_ale) == (ok_sis, ok_ale)
+
+
+def test_bureta_sem_tara():
+    col = [100, 100, 21.3, 10.0, 109.68, 209.41, 309.05, 408.77, 508.44]
+    r = calculate([col], "b", 9.9e-6, ENV)[0]
+    assert list(r.volumes) == pytest.approx(
+        [100.0, 100.0, 99.75135717953506, 99.80139297266282, 99.71132854503286,
+         99.79138581403726, 99.74135002090952], rel=1e-15)
+    assert r.results == pytest.approx(
+        (99.7593629064355, -0.24063709356450147, 0.03704000763323373), rel=1e-12)
+    # ISO 385: 0,241 mL além dos 0,1 mL; não há limite para o erro aleatório
+    assert (r.ok_sis, r.ok_ale) == (False, None)
+
+
+def test_micropipeta_tarada():
+    col = [1000, 1000, 22.0, 0.0, 0.9975, 0.9981, 0.9969, 0.9978, 0.9972]
+    r = calculate([col], "msa", 2.4e-4, ENV, True)[0]
+    assert list(r.volumes) == pytest.approx(
+        [1000.0, 1000.0, 998.9044881055676, 999.5047311630169, 998.304245048118,
+         999.2046096342923, 998.6043665768426], rel=1e-15)
+    assert r.results == pytest.approx(
+        (998.9044881055676, -0.10955118944324341, 0.047453380281093485), rel=1e-12)
+    assert (r.ok_sis, r.ok_ale) == (True, True)
+
+
+def test_colunas_vazias_ficam_no_lugar():
+    col = [100, 100, 21.3, 10.0, 109.68, 209.41, 309.05]
+    out = calculate([[], col, []], "b", 9.9e-6, ENV)
+    assert out[0] is None and out[2] is None
+    assert not math.isnan(out[1].results[0])
+
+
+@pytest.mark.parametrize("tara", (False, True))
+@pytest.mark.parametrize("kind", list(INSTRUMENTOS))
+def test_coluna_ao_vivo_igual_ao_calculo(kind, tara):
+    # as medidas chegando uma a uma dão, ao final, os resultados de calculate
+    rng = random.Random("ao vivo %s:%s" % (kind, tara))
+    for _ in range(10):
+        column = _coluna(rng, kind, tara)
+        live = LiveColumn(column[:4], kind, 9.9e-6, ENV, tara)
+        volumes = [live.add(m) for m in column[4:]]
+        r = calculate([column], kind, 9.9e-6, ENV, tara)[0]
+        assert volumes == pytest.approx(list(r.volumes[2:]), rel=1e-15)
+        assert live.results() == pytest.approx(list(r.results), rel=1e-12, abs=1e-12)
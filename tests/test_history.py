@@ -0,0 +1,113 @@
+# O histórico: a substituição dos ensaios pela origem, as somas das
+# tendências mantidas a cada gravação e a atualização de um banco antigo
+
+import sqlite3
+
+import pytest
+
+from batch import compute_run
+from history import VERSAO, Historico
+
+
+def _ensaio(inst_id, data, desvio=0.0, canais=0):
+    # micropipeta tarada, com dois volumes ensaiados (vezes os canais);
+    # desvio desloca todas as medidas, em g
+    massas = [m + desvio for m in (0.9975, 0.9981, 0.9969, 0.9978, 0.9972)]
+    colunas = [[1000, 1000, 22.0, 0.0, *massas], [1000, 500, 22.0, 0.0, *(m / 2 for m in massas)]]
+    run = {"instId": inst_id, "instKind": "msa", "instMat": "Polipropileno (PP)",
+           "dateEdit": data, "tempAmb": 21.5, "presAtm": 1013.25, "umidRel": 45.0,
+           "mEvap": 0.0, "densPesos": 8.0, "checkTara": True,
+           "tableData": [c for c in colunas for _ in range(canais or 1)], "canais": canais}
+    return run, compute_run(run), None
+
+
+def _grava(historico, *ensaios):
+    return historico.grava([(run, calib, inc, origem) for origem, (run, calib, inc) in ensaios])
+
+
+def _somas(historico):
+    # as tendências, com as somas arredondadas: a ordem em que entraram muda
+    # os últimos bits
+    return [tuple(round(v, 6) if isinstance(v, float) else v for v in linha)
+            for linha in historico.tendencias()]
+
+
+@pytest.fixture
+def abre(tmp_path):
+    abertos = []
+
+    def abre(nome="historico.sqlite3"):
+        abertos.append(Historico(str(tmp_path / nome)))
+        return abertos[-1]
+    yield abre
+    for h in abertos:
+        h.close()
+
+
+def test_mesma_origem_substitui(abre):
+    historico = abre()
+    _grava(historico, ("a.json", _ensaio("P1", "2024-01-10")),
+           ("b.json", _ensaio("P1", "2024-06-10")))
+    _grava(historico, ("a.json", _ensaio("P1", "2024-02-10", 0.001)))
+    ensaios = historico.db.execute("SELECT origem, data FROM ensaios ORDER BY origem")
+    assert [tuple(e) for e in ensaios] == [("a.json", "2024-02-10"), ("b.json", "2024-06-10")]
+    # as colunas do ensaio substituído saíram junto
+    assert historico.db.execute("SELECT count(*) FROM colunas").fetchone()[0] == 4
+    # sem origem, o ensaio sempre entra de novo
+    _grava(historico, (None, _ensaio("P1", "2024-03-10")), (None, _ensaio("P1", "2024-03-10")))
+    assert historico.db.execute("SELECT count(*) FROM ensaios").fetchone()[0] == 4
+
+
+def test_tendencias_depois_de_substituir(abre):
+    historico = abre()
+    _grava(historico, ("a.json", _ensaio("P1", "2024-01-10")),
+           ("b.json", _ensaio("P1", "2024-06-10", 0.002)),
+           ("c.json", _ensaio("P2", "2024-03-01", canais=2)))
+    # a.json muda de data e de medidas; c.json vira outro instrumento
+    _grava(historico, ("a.json", _ensaio("P1", "2024-02-10", 0.001)),
+           ("c.json", _ensaio("P3", "2024-03-01")))
+    # as somas são as de um banco gravado só com os ensaios finais
+    novo = abre("novo.sqlite3")
+    _grava(novo, ("a.json", _ensaio("P1", "2024-02-10", 0.001)),
+           ("b.json", _ensaio("P1", "2024-06-10", 0.002)),
+           ("c.json", _ensaio("P3", "2024-03-01")))
+    assert _somas(historico) == _somas(novo)
+    # o P2, que ficou sem ensaios, saiu das tendências
+    assert [(linha["inst_id"], linha["v_s"], linha["n"]) for linha in historico.tendencias()] == [
+        ("P1", 500, 2), ("P1", 1000, 2), ("P3", 500, 1), ("P3", 1000, 1)]
+
+
+def test_multicanal_um_ponto_por_canal(abre):
+    historico = abre()
+    _grava(historico, ("a.json", _ensaio("P2", "2024-03-01", canais=2)),
+           ("b.json", _ensaio("P2", "2024-04-01", canais=2)))
+    assert [(linha["v_s"], linha["canal"], linha["n"])
+            for linha in historico.tendencias("P2")] == [
+        (500, 1, 2), (500, 2, 2), (1000, 1, 2), (1000, 2, 2)]
+
+
+def test_atualiza_banco_sem_tendencias(abre, tmp_path):
+    historico = abre()
+    _grava(historico, ("a.json", _ensaio("P1", "2024-01-10")),
+           ("b.json", _ensaio("P1", "2024-06-10", 0.002)),
+           (None, _ensaio("P3", "2024-03-01")))
+    esperado = _somas(historico)
+    # um banco da versão 1, de antes das tendências
+    historico.db.execute("DROP TABLE tendencias")
+    historico.db.execute("PRAGMA user_version = 1")
+    historico.db.commit()
+    historico.close()
+    atualizado = abre()
+    assert atualizado.db.execute("PRAGMA user_version").fetchone()[0] == VERSAO
+    assert _somas(atualizado) == esperado
+    # abrir de novo não soma outra vez
+    atualizado.close()
+    assert _somas(abre()) == esperado
+
+
+def test_banco_mais_novo(abre, tmp_path):
+    db = sqlite3.connect(str(tmp_path / "historico.sqlite3"))
+    db.execute("PRAGMA user_version = %d" % (VERSAO + 1))
+    db.close()
+    with pytest.raises(sqlite3.DatabaseError):
+        abre()
@@ -0,0 +1,59 @@
+# O relatório contra o makeTableDocument original (original.py): todo número
+# que o original mostrava continua no relatório, que só acrescenta a
+# incerteza; e o mesmo Report dá sempre o mesmo HTML
+
+import re
+
+from collections import Counter
+
+from batch import compute_run, make_report
+from engine import INSTRUMENTOS
+from original import relatorio
+from report import render
+
+
+RUN = {"instId": "Pipeta <01>", "instKind": "mm", "instMat": "Polipropileno (PP)",
+       "dateEdit": "2024-01-31", "balId": "", "termId": "", "term2Id": "", "barId": "",
+       "higId": "", "tempAmb": 21.5, "presAtm": 1013.25, "umidRel": 45.0, "mEvap": 0.0,
+       "densPesos": 8.0, "checkTara": True, "canais": 8}
+
+_CELULA = re.compile(r'<td align="right">([^<]*)</td>')
+
+
+def _numeros(html):
+    return Counter(c for c in _CELULA.findall(html) if c != "-")
+
+
+def _run(colunas):
+    # colunas de volumes de 100 e 50 µL, com uma vazia no meio
+    table = []
+    for c in range(colunas):
+        v_s = 100 if c < colunas // 2 else 50
+        table.append([100, v_s, 21.0 + c / 10, 0.0,
+                      *(round(v_s / 1000 * (0.997 + k / 5000 + c / 9000), 5) for k in range(10))])
+    table[colunas // 2 + 1] = []
+    return dict(RUN, tableData=table)
+
+
+def test_mesmos_numeros_do_original():
+    # 4 colunas (menos que a tabela original) e 16, que o relatório divide
+    # em blocos
+    for colunas in (4, 16):
+        run = _run(colunas)
+        calib = compute_run(run)
+        antigo = relatorio(run, INSTRUMENTOS[calib.kind], calib.columns(),
+                           [() if r is None else r.volumes for r in calib.results],
+                           [() if r is None else r.results for r in calib.results], "")
+        atual = _numeros(render(make_report(run, calib)))
+        assert not _numeros(antigo) - atual
+        # o que sobra é a linha da incerteza, uma por coluna calculada
+        sobra = atual - _numeros(antigo)
+        assert sum(sobra.values()) == colunas - 1
+
+
+def test_mesmo_html_sempre():
+    run = _run(16)
+    report = make_report(run)
+    html = render(report)
+    assert all(render(report) == html for _ in range(100))
+    assert "Pipeta &lt;01&gt;" in html
@@ -0,0 +1,84 @@
+# O arquivo de ensaio (.vaca): ida e volta sem perder nada, e um erro claro
+# para o que não é um ensaio, é de outra versão ou chegou pela metade
+
+import struct
+
+from array import array
+
+import pytest
+
+from batch import compute_run, load_run
+from session import ASSINATURA, VERSAO, Grade, Sessao, abre, salva
+from uncertainty import Uncertainties, gum_budget
+
+
+RUN = {"instId": "Bureta 07", "instKind": "b", "instMat": "Vidro borossilicato 3.3",
+       "dateEdit": "2024-01-31", "balId": "BAL-1", "termId": "T-1", "term2Id": "T-2",
+       "barId": "B-1", "higId": "H-1", "tempAmb": 21.5, "presAtm": 1013.25, "umidRel": 45.0,
+       "mEvap": 0.0, "densPesos": 8.0, "checkTara": False,
+       "incertezas": {"u_bal": 1e-4, "u_tw": 0.1},
+       # a coluna do meio ainda está vazia
+       "tableData": [[100.0, 100.0, 21.3, 10.0, 109.68, 209.41, 309.05, 408.77, 508.44], [],
+                     [50.0, 25.0, 21.4, 9.5, 34.48, 59.4, 84.37]]}
+
+
+@pytest.fixture
+def sessao():
+    calib = compute_run(RUN)
+    unc = Uncertainties(**RUN["incertezas"])
+    budgets = tuple(None if r is None else
+                    gum_budget(calib.column(c), r.volumes, calib.kind, calib.coef_term,
+                               calib.env, unc)
+                    for c, r in enumerate(calib.results))
+    # a grade da tela, com uma célula ainda sendo digitada
+    linhas, colunas = 9, 3
+    values = array("d", (float(i) / 7 for i in range(linhas * colunas)))
+    state = bytes(i % 4 for i in range(linhas * colunas))
+    casas = bytes(i % 6 for i in range(linhas * colunas))
+    grade = Grade(linhas, colunas, values, state, casas, {4: "1e-", 20: "abc"})
+    return Sessao(RUN, calib, budgets, grade, "sessao-0001")
+
+
+def test_ida_e_volta(sessao, tmp_path):
+    caminho = str(tmp_path / "ensaio.vaca")
+    salva(caminho, sessao)
+    lida = abre(caminho)
+    assert lida.run == RUN
+    assert lida.calib == sessao.calib
+    assert lida.calib.results[1] is None
+    assert lida.budgets == sessao.budgets
+    assert lida.grade == sessao.grade
+    assert lida.origem == "sessao-0001"
+    # o lote lê o .vaca como o .json
+    assert load_run(caminho) == RUN
+    assert compute_run(load_run(caminho)) == sessao.calib
+
+
+def _cabecalho(conteudo, assinatura=ASSINATURA, versao=VERSAO):
+    inicio = struct.Struct("<4sHI")
+    _, _, tamanho = inicio.unpack_from(conteudo)
+    return inicio.pack(assinatura, versao, tamanho) + conteudo[inicio.size:]
+
+
+@pytest.mark.parametrize("assinatura, versao, mensagem", (
+    (b"PK\x03\x04", VERSAO, "não é um ensaio"),
+    (ASSINATURA, VERSAO + 1, "versão mais nova"),
+    (ASSINATURA, 0, "não é um ensaio"),
+))
+def test_outro_formato(sessao, tmp_path, assinatura, versao, mensagem):
+    caminho = tmp_path / "ensaio.vaca"
+    salva(str(caminho), sessao)
+    caminho.write_bytes(_cabecalho(caminho.read_bytes(), assinatura, versao))
+    with pytest.raises(ValueError, match=mensagem):
+        abre(str(caminho))
+
+
+def test_arquivo_cortado(sessao, tmp_path):
+    caminho = tmp_path / "ensaio.vaca"
+    salva(str(caminho), sessao)
+    conteudo = caminho.read_bytes()
+    # cortado em qualquer ponto: no início, no cabeçalho, nos números
+    for n in range(len(conteudo)):
+        caminho.write_bytes(conteudo[:n])
+        with pytest.raises(ValueError, match="ensaio"):
+            abre(str(caminho))
@@ -0,0 +1,59 @@
+# As estatísticas em float (stats.py) contra o statistics, que trabalha com
+# frações exatas: a diferença fica no último bit e nunca aparece nas três
+# casas dos resultados
+
+import math
+import random
+import statistics
+
+import pytest
+
+from stats import RunningStats, column_stats, mean_stdev
+
+
+def _colunas():
+    rng = random.Random(14)
+    for _ in range(2000):
+        n = rng.choice((2, 3, 10, 30, 100))
+        centro = rng.choice((0.002, 1.0, 99.7, 1000.0, 5000.0))
+        espalhamento = centro * rng.choice((1e-9, 1e-6, 1e-3, 0.05))
+        yield [rng.gauss(centro, espalhamento) for _ in range(n)]
+
+
+def test_igual_ao_statistics():
+    colunas = list(_colunas())
+    means, stdevs = column_stats(colunas)
+    for values, m_lote, s_lote in zip(colunas, means, stdevs):
+        mean, s = statistics.mean(values), statistics.stdev(values)
+        for m, d in (mean_stdev(values), (m_lote, s_lote)):
+            assert m == pytest.approx(mean, rel=1e-15)
+            assert d == pytest.approx(s, rel=1e-10)
+            assert "{:.3f}".format(m) == "{:.3f}".format(mean)
+        acumulado = RunningStats(values)
+        assert acumulado.n == len(values)
+        assert acumulado.mean == pytest.approx(mean, rel=1e-15)
+        assert acumulado.stdev == pytest.approx(s, rel=1e-14)
+        assert acumulado.cv() == pytest.approx(100 * s / mean, rel=1e-14)
+        assert acumulado.cv(values[0]) == pytest.approx(100 * s / values[0], rel=1e-14)
+
+
+def test_acumula_uma_a_uma():
+    # média, variância e CV em dia a cada medida que chega
+    values = [99.751, 99.801, 99.711, 99.791, 99.741]
+    acumulado = RunningStats()
+    for n, x in enumerate(values, 1):
+        acumulado.add(x)
+        assert acumulado.n == n
+        assert acumulado.mean == pytest.approx(statistics.mean(values[:n]), rel=1e-15)
+        if n > 1:
+            s = statistics.stdev(values[:n])
+            assert acumulado.variance == pytest.approx(s**2, rel=1e-12)
+            assert acumulado.cv() == pytest.approx(100 * s / statistics.mean(values[:n]),
+                                                   rel=1e-12)
+
+
+def test_uma_medida_nao_tem_desvio():
+    acumulado = RunningStats([10.0])
+    assert acumulado.mean == 10.0
+    assert math.isnan(acumulado.variance)
+    assert math.isnan(acumulado.cv())
@@ -0,0 +1,28 @@
+# O texto digitado numa célula da tabela de dados
+
+import pytest
+
+from tablemodel import INVALIDO, NUMERO, PARCIAL, VAZIO, parse_cell
+
+
+@pytest.mark.parametrize("texto, esperado", (
+    ("", (VAZIO, 0.0, 0)),
+    ("  ", (VAZIO, 0.0, 0)),
+    ("100", (NUMERO, 100.0, 0)),
+    ("99,7512", (NUMERO, 99.7512, 4)),
+    (" 0.50 ", (NUMERO, 0.5, 2)),
+    ("-1e-3", (NUMERO, -0.001, 3)),
+    ("1e3", (NUMERO, 1000.0, 0)),
+    ("-", (PARCIAL, 0.0, 0)),
+    ("1e", (PARCIAL, 0.0, 0)),
+    ("1e-", (PARCIAL, 0.0, 0)),
+    ("abc", (INVALIDO, 0.0, 0)),
+    ("1,2,3", (INVALIDO, 0.0, 0)),
+    ("nan", (INVALIDO, 0.0, 0)),
+    ("inf", (INVALIDO, 0.0, 0)),
+    # finitos no Decimal, infinitos no float
+    ("1e400", (INVALIDO, 0.0, 0)),
+    ("-1e400", (INVALIDO, 0.0, 0)),
+))
+def test_parse_cell(texto, esperado):
+    assert parse_cell(texto) == esperado
@@ -0,0 +1,52 @@
+# A tabela de tolerâncias tem de dar os mesmos vereditos das escadas de
+# if/elif do calcular original (original.py), em todos os tipos de
+# instrumento
+
+import itertools
+
+import pytest
+
+from engine import INSTRUMENTOS
+from original import PISTAO, VIDRARIA, veredito
+from tolerances import EXACT, RANGES, evaluate, limits
+
+
+def _nominais(kind):
+    # os volumes das tabelas e os pisos das faixas, com vizinhos dos dois lados
+    if kind in EXACT:
+        base = set(EXACT[kind])
+    else:
+        base = {piso for faixas in RANGES[kind] for piso, _ in faixas if piso is not None}
+    volumes = {0.001, 0.005, 0.3, 3, 7, 150, 20000}
+    for v in base:
+        volumes.update((v, v * (1 - 1e-9), v * (1 + 1e-9), v * 0.9, v * 1.1))
+    return sorted(volumes)
+
+
+def test_todos_os_tipos_tem_escada():
+    assert set(VIDRARIA) | set(PISTAO) == set(INSTRUMENTOS)
+
+
+@pytest.mark.parametrize("kind", list(INSTRUMENTOS))
+def test_tabela_igual_as_escadas(kind):
+    erros = (0.0, 0.0049, 0.005, 0.0051, 0.0995, 0.1, 0.1004, 0.1005, 0.5, 1.0, 2.4995,
+             2.5, 2.5005, 8.0, 50.0)
+    casos = [(v_nom, v_nom * f, sinal * es, ea)
+             for v_nom in _nominais(kind) for f in (1, 0.5, 0.1)
+             for sinal in (1, -1) for es, ea in itertools.product(erros, erros[::3])]
+    novos = evaluate(kind, *zip(*casos))
+    for caso, novo in zip(casos, novos):
+        assert novo == veredito(kind, *caso), caso
+
+
+@pytest.mark.parametrize("kind", list(INSTRUMENTOS))
+def test_limites_iguais_as_escadas(kind):
+    for v_nom in _nominais(kind):
+        for v_s in (v_nom, v_nom / 2):
+            lim_sis, lim_ale = limits(kind, v_nom, v_s)
+            if kind in VIDRARIA:
+                assert (lim_sis, lim_ale) == (VIDRARIA[kind](v_nom), None)
+            else:
+                sis, ale = PISTAO[kind]
+                assert lim_sis == pytest.approx(v_nom / v_s * sis(v_nom), rel=1e-15)
+                assert lim_ale == pytest.approx(v_nom / v_s * ale(v_nom), rel=1e-15)
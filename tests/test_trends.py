@@ -0,0 +1,112 @@
+# A deriva de um ponto de calibração a partir das somas do histórico, contra
+# séries sintéticas de inclinação conhecida
+
+import math
+import statistics
+
+from datetime import date, timedelta
+
+import pytest
+
+from tolerances import limits
+from trends import DIAS_POR_ANO, EPOCA, reta, tendencia, tendencias
+
+
+# micropipeta de 1000 µL: limites de 0,8 % (sistemático) e 0,3 % (aleatório)
+LIM_SIS, LIM_ALE = limits("msa", 1000, 1000)
+
+
+def _linha(pontos, inst_id="P1"):
+    # a linha da tabela tendencias do histórico para os pontos (data, erro
+    # sistemático, erro aleatório)
+    t = [(d - EPOCA).days for d, _, _ in pontos]
+    s = [e for _, e, _ in pontos]
+    a = [e for _, _, e in pontos]
+    return {"inst_id": inst_id, "tipo": "msa", "v_nom": 1000, "v_s": 1000, "canal": 0,
+            "n": len(pontos), "st": sum(t), "stt": sum(x * x for x in t),
+            "ss": sum(s), "sts": sum(x * y for x, y in zip(t, s)),
+            "sss": sum(y * y for y in s), "sa": sum(a),
+            "sta": sum(x * y for x, y in zip(t, a)), "saa": sum(y * y for y in a)}
+
+
+def _serie(inicio, dias, sis, ale):
+    # pontos nas datas inicio + dias, com os erros dados por funções do dia
+    return [(inicio + timedelta(days=d), sis(d), ale(d)) for d in dias]
+
+
+DIAS = (0, 91, 180, 275, 366, 450, 547)
+INICIO = date(2023, 1, 15)
+
+
+def test_reta_igual_aos_minimos_quadrados():
+    # uma série com ruído, contra a regressão do statistics
+    ruido = (0.03, -0.02, 0.05, -0.04, 0.0, 0.02, -0.01)
+    pontos = _serie(INICIO, DIAS, lambda d: 0.1 + 0.0004 * d + ruido[DIAS.index(d)],
+                    lambda d: 0.1)
+    linha = _linha(pontos)
+    r = reta(linha["n"], linha["st"], linha["stt"], linha["ss"], linha["sts"])
+    t = [(d - EPOCA).days for d, _, _ in pontos]
+    esperado = statistics.linear_regression(t, [e for _, e, _ in pontos])
+    assert r.b == pytest.approx(esperado.slope, rel=1e-9)
+    assert r.a == pytest.approx(esperado.intercept, rel=1e-9)
+    assert r.deriva == pytest.approx(esperado.slope * DIAS_POR_ANO, rel=1e-9)
+    assert r.media == pytest.approx(statistics.mean(e for _, e, _ in pontos))
+
+
+def test_reta_exata():
+    pontos = _serie(INICIO, DIAS, lambda d: 0.1 + 0.0005 * d, lambda d: 0.1)
+    t = tendencia(_linha(pontos))
+    assert t.sis.b == pytest.approx(0.0005, rel=1e-9)
+    # erro previsto no primeiro ensaio
+    t0 = (INICIO - EPOCA).days
+    assert t.sis.a + t.sis.b * t0 == pytest.approx(0.1, abs=1e-9)
+    assert t.ale.deriva == pytest.approx(0.0, abs=1e-12)
+    assert t.n == len(DIAS)
+    assert (t.lim_sis, t.lim_ale) == (LIM_SIS, LIM_ALE)
+
+
+def _cruzamento(valor_inicial, inclinacao, limite):
+    # data em que valor_inicial + inclinacao * dias alcança o limite
+    return INICIO + timedelta(days=(limite - valor_inicial) / inclinacao)
+
+
+@pytest.mark.parametrize("sis, ale, esperado", (
+    # o sistemático sobe até o limite
+    (lambda d: 0.1 + 0.0005 * d, lambda d: 0.1, _cruzamento(0.1, 0.0005, LIM_SIS)),
+    # ou desce até -limite: o sistemático sai pelos dois lados
+    (lambda d: -0.1 - 0.0005 * d, lambda d: 0.1, _cruzamento(-0.1, -0.0005, -LIM_SIS)),
+    # o aleatório sobe até o limite, antes do sistemático
+    (lambda d: 0.1 + 0.0001 * d, lambda d: 0.1 + 0.0002 * d, _cruzamento(0.1, 0.0002, LIM_ALE)),
+))
+def test_data_da_nao_conformidade(sis, ale, esperado):
+    t = tendencia(_linha(_serie(INICIO, DIAS, sis, ale)))
+    assert abs((t.previsao - esperado).days) <= 1
+
+
+def test_sem_cruzamento_quando_se_afasta_do_limite():
+    # o sistemático parado e o aleatório caindo: nunca alcançam o limite
+    t = tendencia(_linha(_serie(INICIO, DIAS, lambda d: 0.2, lambda d: 0.25 - 0.0002 * d)))
+    assert t.ale.b < 0
+    assert t.previsao is None
+
+
+def test_ja_fora_do_limite():
+    # o erro médio já fora dá a data média dos ensaios
+    pontos = _serie(INICIO, DIAS, lambda d: LIM_SIS + 0.1, lambda d: 0.1)
+    t = tendencia(_linha(pontos))
+    assert t.previsao == t.data_media
+    assert t.data_media == INICIO + timedelta(days=sum(DIAS) / len(DIAS))
+
+
+def test_uma_data_so():
+    pontos = _serie(INICIO, (0, 0, 0), lambda d: 0.1, lambda d: 0.1)
+    t = tendencia(_linha(pontos))
+    assert math.isnan(t.sis.deriva) and math.isnan(t.ale.deriva)
+    assert t.sis.media == pytest.approx(0.1)
+    assert t.previsao is None
+
+
+def test_sem_identificacao_fica_de_fora():
+    pontos = _serie(INICIO, DIAS, lambda d: 0.1, lambda d: 0.1)
+    linhas = [_linha(pontos, ""), _linha(pontos, "  "), _linha(pontos, "P1")]
+    assert [t.inst_id for t in tendencias(linhas)] == ["P1"]
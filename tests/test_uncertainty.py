@@ -0,0 +1,62 @@
+# Monte Carlo (GUM S1) contra o orçamento do GUM, e a reprodutibilidade pela
+# semente, com qualquer número de processos
+
+import pytest
+
+from engine import Environment, calculate
+from uncertainty import Uncertainties, gum_budget, mc_column
+
+
+ENV = Environment(21.5, 1013.25, 45.0, 0.001, 8.0)
+
+UNC = Uncertainties(u_bal=1e-5, u_tw=0.1, u_ta=0.5, u_pa=1.0, u_ua=5.0, u_ro_b=0.06,
+                    u_coef=2.4e-5, u_evap=1e-5)
+
+# (coluna, tipo, coeficiente de expansão, tara)
+COLUNAS = (
+    ([1000, 1000, 22.0, 0.0, 0.9975, 0.9981, 0.9969, 0.9978, 0.9972], "msa", 2.4e-4, True),
+    ([100, 100, 21.3, 10.0, 109.68, 209.41, 309.05, 408.77, 508.44], "b", 9.9e-6, False),
+)
+
+SEMENTE = 8655
+
+
+@pytest.fixture(scope="module", params=COLUNAS, ids=lambda c: c[1])
+def coluna(request):
+    column, kind, coef_term, tara = request.param
+    mc = mc_column(column, kind, coef_term, ENV, UNC, tara, seed=SEMENTE, processos=1)
+    return column, kind, coef_term, tara, mc
+
+
+def test_mesmo_resultado_com_varios_processos(coluna):
+    column, kind, coef_term, tara, mc = coluna
+    # três blocos por rodada: a rodada passa do ponto de parada
+    for processos in (2, 3):
+        assert mc_column(column, kind, coef_term, ENV, UNC, tara, seed=SEMENTE,
+                         processos=processos) == mc
+    assert mc_column(column, kind, coef_term, ENV, UNC, tara, seed=SEMENTE + 1,
+                     processos=1) != mc
+
+
+def test_igual_ao_orcamento_do_gum(coluna):
+    column, kind, coef_term, tara, mc = coluna
+    r = calculate([column], kind, coef_term, ENV, tara)[0]
+    budget = gum_budget(column, r.volumes, kind, coef_term, ENV, UNC)
+    # o modelo é quase linear nessas incertezas: as duas propagações coincidem
+    assert mc.u == pytest.approx(budget.u, rel=0.02)
+    assert mc.y == pytest.approx(r.results[0], abs=budget.u / 10)
+    assert mc.low < r.results[0] < mc.high
+
+
+def test_para_antes_do_maximo(coluna):
+    _, _, _, _, mc = coluna
+    assert mc.seed == SEMENTE
+    assert 2 * 10**4 <= mc.trials < 10**6
+    assert mc.trials % 10**4 == 0
+
+
+def test_sem_convergencia_para_no_maximo():
+    column, kind, coef_term, tara = COLUNAS[1]
+    mc = mc_column(column, kind, coef_term, ENV, UNC, tara, seed=SEMENTE, ndig=6,
+                   max_trials=3 * 10**4, processos=1)
+    assert mc.trials == 3 * 10**4
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Erros máximos permitidos de cada tipo de instrumento.
+
+A tabela é declarativa e é compilada na importação: a vidraria vira um
+dicionário de volumes nominais e os instrumentos de pistão viram vetores
+ordenados de faixas, consultados com bisect.
+"""
+
+from bisect import bisect_left
+
+
+# texto usado nas dicas de conformidade e a norma que define os volumes nominais
+NORMAS = {
+    "bv": ("vidraria Classe A da ISO 1042:1998", "ISO 1042:1998"),
+    "bvl": ("vidraria Classe A da ISO 1042:1998", "ISO 1042:1998"),
+    "b": ("vidraria Classe A|AS da ISO 385:2005", "ISO 385:2005"),
+    "pg": ("vidraria Classe A|AS da ISO 835:2007", "ISO 835:2007"),
+    "pv": ("vidraria Classe A|AS da ISO 648:1998", "ISO 648:2008"),
+    "msa": ("os limites da norma ISO 8655-2:2022", "ISO 8655-2:2022"),
+    "msd2": ("os limites da norma ISO 8655-2:2022", "ISO 8655-2:2022"),
+    "mm": ("os limites da norma ISO 8655-2:2022", "ISO 8655-2:2022"),
+    "bda": ("os limites da norma ISO 8655-3:2022", "ISO 8655-3:2022"),
+    "bdm": ("os limites da norma ISO 8655-3:2022", "ISO 8655-3:2022"),
+    "d": ("os limites da norma ISO 8655-5:2022", "ISO 8655-5:2022"),
+}
+
+# Vidraria Classe A (ISO 4787): erro sistemático máximo, em mL, para cada
+# volume nominal previsto na norma do instrumento. Não há limite para o
+# erro aleatório e volumes fora da tabela não são avaliados.
+EXACT = {
+    # ISO 1042:1998
+    "bv": {5000: 1.2, 2000: 0.6, 1000: 0.4, 500: 0.25, 250: 0.15, 200: 0.15,
+           100: 0.1, 50: 0.06, 25: 0.04, 20: 0.04, 10: 0.025, 5: 0.025,
+           2: 0.025, 1: 0.025},
+    "bvl": {1000: 0.6, 50: 0.1, 25: 0.06, 20: 0.06, 10: 0.04, 5: 0.04},
+    # ISO 385:2005
+    "b": {100: 0.1, 50: 0.05, 25: 0.05, 10: 0.03, 5: 0.01, 2: 0.01, 1: 0.006},
+    # ISO 835:2007
+    "pg": {25: 0.1, 20: 0.1, 10: 0.05, 5: 0.03, 2: 0.01, 1: 0.007, 0.5: 0.006,
+           0.2: 0.006, 0.1: 0.006},
+    # ISO 648:2008
+    "pv": {100: 0.08, 50: 0.05, 25: 0.03, 20: 0.03, 10: 0.02, 5: 0.015,
+           2: 0.010, 1: 0.008, 0.5: 0.005},
+}
+
+# Instrumentos de pistão (ISO 8655): erros sistemático e aleatório máximos,
+# em %, por faixa de volume nominal. Cada faixa é (volume acima do qual o
+# limite vale, limite), da maior para a menor; a última não tem piso. O
+# limite é relativo ao volume nominal, então é escalado por v_nom / v_s.
+RANGES = {
+    # ISO 8655-2:2022
+    "msa": (((5000, 0.6), (50, 0.8), (10, 1.0), (5, 1.2), (None, 2.5)),
+            ((50, 0.3), (10, 0.5), (5, 0.8), (3, 1.5), (None, 2.0))),
+    "msd2": (((100, 1.2), (20, 1.4), (5, 2.0), (None, 2.5)),
+             ((100, 0.4), (20, 0.6), (10, 0.8), (5, 1.0), (None, 1.5))),
+    "mm": (((50, 1.6), (10, 2.0), (5, 2.4), (2, 5.0), (None, 8.0)),
+           ((50, 0.6), (20, 0.8), (10, 1.0), (5, 1.6), (2, 3.0), (None, 8.0))),
+    # ISO 8655-3:2022
+    "bda": (((5, 0.2), (2, 0.3), (1, 0.5), (None, 0.6)),
+            ((50, 0.03), (25, 0.05), (5, 0.07), (None, 0.1))),
+    "bdm": (((10, 0.2), (2, 0.3), (1, 0.5), (None, 0.6)),
+            ((None, 0.1),)),
+    # ISO 8655-5:2022
+    "d": (((0.5, 0.6), (0.1, 1.0), (0.02, 1.5), (None, 2.0)),
+          ((0.2, 0.2), (0.05, 0.3), (0.02, 0.4), (0.01, 0.5), (None, 1.0))),
+}
+
+
+def _compile(faixas):
+    # (pisos em ordem crescente, limites): o limite de v_nom é
+    # limites[bisect_left(pisos, v_nom)], pois v_nom tem de ser maior que o piso
+    pisos = [piso for piso, _ in reversed(faixas) if piso is not None]
+    limites = [limite for _, limite in reversed(faixas)]
+    return pisos, limites
+
+
+_RANGES = {kind: tuple(_compile(f) for f in faixas) for kind, faixas in RANGES.items()}
+
+
+def _range_limit(compiled, v_nom):
+    pisos, limites = compiled
+    return limites[bisect_left(pisos, v_nom)]
+
+
+def limits(kind, v_nom, v_s):
+    # limites (sistemático, aleatório) nas unidades dos resultados;
+    # None quando a norma não prevê a avaliação
+    if kind in EXACT:
+        return EXACT[kind].get(v_nom), None
+    sis, ale = _RANGES[kind]
+    escala = v_nom / v_s
+    return escala * _range_limit(sis, v_nom), escala * _range_limit(ale, v_nom)
+
+
+def _shown(value):
+    # a conformidade é avaliada sobre o valor apresentado, com 3 casas
+    return abs(float('{:.3f}'.format(value)))
+
+
+def evaluate(kind, v_nom, v_s, e_sis, e_ale):
+    # avalia todas as colunas de uma vez. Recebe sequências paralelas e
+    # devolve (ok_sis, ok_ale) por coluna: True se conforme, False se não
+    # conforme e None se a norma não prevê a avaliação
+    out = []
+    if kind in EXACT:
+        tabela = EXACT[kind]
+        for vn, es in zip(v_nom, e_sis):
+            lim = tabela.get(vn)
+            out.append((None if lim is None else _shown(es) <= lim, None))
+        return out
+    sis, ale = _RANGES[kind]
+    for vn, vs, es, ea in zip(v_nom, v_s, e_sis, e_ale):
+        escala = vn / vs
+        out.append((_shown(es) <= escala * _range_limit(sis, vn),
+                    _shown(ea) <= escala * _range_limit(ale, vn)))
+    return out
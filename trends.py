@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Deriva dos instrumentos ao longo das calibrações.
+
+Para cada ponto de calibração de um instrumento, os erros sistemático e
+aleatório dos ensaios do histórico são ajustados por mínimos quadrados
+contra a data. A reta dá a deriva (por ano) e a data em que o erro previsto
+alcança o limite da norma, o mesmo que o "Calcular" aplica
+(tolerances.limits). O ajuste sai só das somas mantidas pelo histórico
+(history.py), em O(1) por ponto, sem ler as medidas.
+"""
+
+import math
+
+from datetime import date, timedelta
+from typing import NamedTuple
+
+from tolerances import limits
+
+
+# origem das datas das somas do histórico (t = dias desde esta data)
+EPOCA = date(2000, 1, 1)
+
+DIAS_POR_ANO = 365.25
+
+
+class Reta(NamedTuple):
+    media: float  # erro médio dos ensaios
+    deriva: float  # variação do erro por ano; nan com uma data só
+    a: float  # erro previsto em t = 0 (EPOCA)
+    b: float  # variação por dia
+
+
+class Tendencia(NamedTuple):
+    inst_id: str
+    tipo: str
+    v_nom: float
+    v_s: float
+    canal: int  # 0 fora das multicanal
+    n: int  # ensaios (colunas) no ajuste
+    data_media: date  # data média dos ensaios
+    sis: Reta
+    ale: Reta
+    lim_sis: float | None  # None quando a norma não prevê a avaliação
+    lim_ale: float | None
+    previsao: date | None  # quando a reta alcança o limite; None se nunca
+
+
+def reta(n, st, stt, se, ste):
+    # mínimos quadrados de e = a + b*t, a partir das somas
+    media = se / n
+    sxx = stt - st * st / n
+    # com todos os ensaios no mesmo dia não há como estimar a deriva
+    if n < 2 or sxx <= 1e-9 * max(1.0, stt):
+        return Reta(media, math.nan, media, math.nan)
+    b = (ste - st * se / n) / sxx
+    return Reta(media, b * DIAS_POR_ANO, (se - b * st) / n, b)
+
+
+def _alcanca(r, limite, simetrico, t_medio):
+    # primeiro t, a partir da data média, em que a reta fica fora do limite
+    # (abaixo de -limite também, se simetrico); None se isso nunca acontece.
+    # Na data média, a reta passa pelo erro médio
+    if limite is None:
+        return None
+    if r.media > limite or (simetrico and r.media < -limite):
+        return t_medio
+    if math.isnan(r.b) or r.b == 0:
+        return None
+    if r.b > 0:
+        return (limite - r.a) / r.b
+    if simetrico:
+        return (-limite - r.a) / r.b
+    return None
+
+
+def _data(t):
+    try:
+        return EPOCA + timedelta(days=t)
+    except OverflowError:
+        return None
+
+
+def tendencia(linha):
+    # linha da tabela tendencias do histórico (history.Historico.tendencias)
+    n = linha["n"]
+    sis = reta(n, linha["st"], linha["stt"], linha["ss"], linha["sts"])
+    ale = reta(n, linha["st"], linha["stt"], linha["sa"], linha["sta"])
+    lim_sis, lim_ale = limits(linha["tipo"], linha["v_nom"], linha["v_s"])
+    # o erro sistemático pode sair pelos dois lados; o aleatório só cresce.
+    # Um erro médio já fora do limite dá a própria data média
+    t_medio = linha["st"] / n
+    cruzamentos = [t for t in (_alcanca(sis, lim_sis, True, t_medio),
+                               _alcanca(ale, lim_ale, False, t_medio)) if t is not None]
+    previsao = _data(min(cruzamentos)) if cruzamentos else None
+    return Tendencia(linha["inst_id"], linha["tipo"], linha["v_nom"], linha["v_s"],
+                     linha["canal"], n, _data(t_medio), sis, ale, lim_sis, lim_ale, previsao)
+
+
+def tendencias(linhas):
+    # os ensaios sem a identificação do instrumento ficam de fora: juntos,
+    # seriam uma série de instrumentos diferentes
+    return [tendencia(linha) for linha in linhas if linha["inst_id"].strip()]
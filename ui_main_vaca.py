@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 
 ################################################################################
-## Form generated from reading UI file 'vacasfsDjU.ui'
+## Form generated from reading UI file 'vaca.ui'
 ##
 ## Created by: Qt User Interface Compiler version 6.6.1
 ##
@@ -19,8 +19,8 @@ from PySide6.QtWidgets import (QAbstractScrollArea, QAbstractSpinBox, QApplicati
     QComboBox, QDateEdit, QDoubleSpinBox, QFormLayout,
     QGridLayout, QGroupBox, QHBoxLayout, QHeaderView,
     QLabel, QLineEdit, QMainWindow, QScrollArea,
-    QSizePolicy, QSpacerItem, QStatusBar, QTableWidget,
-    QTableWidgetItem, QToolBar, QVBoxLayout, QWidget)
+    QSizePolicy, QSpacerItem, QStatusBar, QTableView,
+    QToolBar, QVBoxLayout, QWidget)
 
 class Ui_MainWindow(object):
     def setupUi(self, MainWindow):
@@ -283,47 +283,13 @@ class Ui_MainWindow(object):
 
         self.verticalLayout_4.addWidget(self.checkTara)
 
-        self.tableData = QTableWidget(self.groupBox_5)
-        if (self.tableData.columnCount() < 5):
-            self.tableData.setColumnCount(5)
-        if (self.tableData.rowCount() < 14):
-            self.tableData.setRowCount(14)
-        __qtablewidgetitem = QTableWidgetItem()
-        self.tableData.setVerticalHeaderItem(0, __qtablewidgetitem)
-        __qtablewidgetitem1 = QTableWidgetItem()
-        self.tableData.setVerticalHeaderItem(1, __qtablewidgetitem1)
-        __qtablewidgetitem2 = QTableWidgetItem()
-        self.tableData.setVerticalHeaderItem(2, __qtablewidgetitem2)
-        __qtablewidgetitem3 = QTableWidgetItem()
-        self.tableData.setVerticalHeaderItem(3, __qtablewidgetitem3)
-        __qtablewidgetitem4 = QTableWidgetItem()
-        self.tableData.setVerticalHeaderItem(4, __qtablewidgetitem4)
-        __qtablewidgetitem5 = QTableWidgetItem()
-        self.tableData.setVerticalHeaderItem(5, __qtablewidgetitem5)
-        __qtablewidgetitem6 = QTableWidgetItem()
-        self.tableData.setVerticalHeaderItem(6, __qtablewidgetitem6)
-        __qtablewidgetitem7 = QTableWidgetItem()
-        self.tableData.setVerticalHeaderItem(7, __qtablewidgetitem7)
-        __qtablewidgetitem8 = QTableWidgetItem()
-        self.tableData.setVerticalHeaderItem(8, __qtablewidgetitem8)
-        __qtablewidgetitem9 = QTableWidgetItem()
-        self.tableData.setVerticalHeaderItem(9, __qtablewidgetitem9)
-        __qtablewidgetitem10 = QTableWidgetItem()
-        self.tableData.setVerticalHeaderItem(10, __qtablewidgetitem10)
-        __qtablewidgetitem11 = QTableWidgetItem()
-        self.tableData.setVerticalHeaderItem(11, __qtablewidgetitem11)
-        __qtablewidgetitem12 = QTableWidgetItem()
-        self.tableData.setVerticalHeaderItem(12, __qtablewidgetitem12)
-        __qtablewidgetitem13 = QTableWidgetItem()
-        self.tableData.setVerticalHeaderItem(13, __qtablewidgetitem13)
+        self.tableData = QTableView(self.groupBox_5)
         self.tableData.setObjectName(u"tableData")
         self.tableData.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
         self.tableData.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
         self.tableData.setSizeAdjustPolicy(QAbstractScrollArea.AdjustToContents)
         self.tableData.setAutoScroll(True)
         self.tableData.setCornerButtonEnabled(False)
-        self.tableData.setRowCount(14)
-        self.tableData.setColumnCount(5)
         self.tableData.horizontalHeader().setVisible(True)
 
         self.verticalLayout_4.addWidget(self.tableData, 0, Qt.AlignLeft|Qt.AlignVCenter)
@@ -338,25 +304,13 @@ class Ui_MainWindow(object):
         self.groupBox_4.setMinimumSize(QSize(0, 205))
         self.verticalLayout_5 = QVBoxLayout(self.groupBox_4)
         self.verticalLayout_5.setObjectName(u"verticalLayout_5")
-        self.tableRes = QTableWidget(self.groupBox_4)
-        if (self.tableRes.columnCount() < 5):
-            self.tableRes.setColumnCount(5)
-        if (self.tableRes.rowCount() < 3):
-            self.tableRes.setRowCount(3)
-        __qtablewidgetitem14 = QTableWidgetItem()
-        self.tableRes.setVerticalHeaderItem(0, __qtablewidgetitem14)
-        __qtablewidgetitem15 = QTableWidgetItem()
-        self.tableRes.setVerticalHeaderItem(1, __qtablewidgetitem15)
-        __qtablewidgetitem16 = QTableWidgetItem()
-        self.tableRes.setVerticalHeaderItem(2, __qtablewidgetitem16)
+        self.tableRes = QTableView(self.groupBox_4)
         self.tableRes.setObjectName(u"tableRes")
         self.tableRes.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
         self.tableRes.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
         self.tableRes.setSizeAdjustPolicy(QAbstractScrollArea.AdjustToContents)
         self.tableRes.setAutoScroll(True)
         self.tableRes.setCornerButtonEnabled(False)
-        self.tableRes.setRowCount(3)
-        self.tableRes.setColumnCount(5)
         self.tableRes.horizontalHeader().setVisible(True)
 
         self.verticalLayout_5.addWidget(self.tableRes, 0, Qt.AlignLeft)
@@ -424,41 +378,7 @@ class Ui_MainWindow(object):
         self.label_2.setText("")
         self.groupBox_5.setTitle(QCoreApplication.translate("MainWindow", u"Dados do ensaio:", None))
         self.checkTara.setText(QCoreApplication.translate("MainWindow", u"Balan\u00e7a tarada entre as medidas", None))
-        ___qtablewidgetitem = self.tableData.verticalHeaderItem(0)
-        ___qtablewidgetitem.setText(QCoreApplication.translate("MainWindow", u"Volume nominal, em mL", None));
-        ___qtablewidgetitem1 = self.tableData.verticalHeaderItem(1)
-        ___qtablewidgetitem1.setText(QCoreApplication.translate("MainWindow", u"Volume ensaiado, em mL", None));
-        ___qtablewidgetitem2 = self.tableData.verticalHeaderItem(2)
-        ___qtablewidgetitem2.setText(QCoreApplication.translate("MainWindow", u"Temperatura da \u00e1gua, em \u00b0C", None));
-        ___qtablewidgetitem3 = self.tableData.verticalHeaderItem(3)
-        ___qtablewidgetitem3.setText(QCoreApplication.translate("MainWindow", u"Massa do recipiente, em g", None));
-        ___qtablewidgetitem4 = self.tableData.verticalHeaderItem(4)
-        ___qtablewidgetitem4.setText(QCoreApplication.translate("MainWindow", u"1\u00aa medida, em g", None));
-        ___qtablewidgetitem5 = self.tableData.verticalHeaderItem(5)
-        ___qtablewidgetitem5.setText(QCoreApplication.translate("MainWindow", u"2\u00aa medida, em g", None));
-        ___qtablewidgetitem6 = self.tableData.verticalHeaderItem(6)
-        ___qtablewidgetitem6.setText(QCoreApplication.translate("MainWindow", u"3\u00aa medida, em g", None));
-        ___qtablewidgetitem7 = self.tableData.verticalHeaderItem(7)
-        ___qtablewidgetitem7.setText(QCoreApplication.translate("MainWindow", u"4\u00aa medida, em g", None));
-        ___qtablewidgetitem8 = self.tableData.verticalHeaderItem(8)
-        ___qtablewidgetitem8.setText(QCoreApplication.translate("MainWindow", u"5\u00aa medida, em g", None));
-        ___qtablewidgetitem9 = self.tableData.verticalHeaderItem(9)
-        ___qtablewidgetitem9.setText(QCoreApplication.translate("MainWindow", u"6\u00aa medida, em g", None));
-        ___qtablewidgetitem10 = self.tableData.verticalHeaderItem(10)
-        ___qtablewidgetitem10.setText(QCoreApplication.translate("MainWindow", u"7\u00aa medida, em g", None));
-        ___qtablewidgetitem11 = self.tableData.verticalHeaderItem(11)
-        ___qtablewidgetitem11.setText(QCoreApplication.translate("MainWindow", u"8\u00aa medida, em g", None));
-        ___qtablewidgetitem12 = self.tableData.verticalHeaderItem(12)
-        ___qtablewidgetitem12.setText(QCoreApplication.translate("MainWindow", u"9\u00aa medida, em g", None));
-        ___qtablewidgetitem13 = self.tableData.verticalHeaderItem(13)
-        ___qtablewidgetitem13.setText(QCoreApplication.translate("MainWindow", u"10\u00aa medida, em g", None));
         self.groupBox_4.setTitle(QCoreApplication.translate("MainWindow", u"Resultados:", None))
-        ___qtablewidgetitem14 = self.tableRes.verticalHeaderItem(0)
-        ___qtablewidgetitem14.setText(QCoreApplication.translate("MainWindow", u"Volume medido, em mL", None));
-        ___qtablewidgetitem15 = self.tableRes.verticalHeaderItem(1)
-        ___qtablewidgetitem15.setText(QCoreApplication.translate("MainWindow", u"Erro sistem\u00e1tico, em mL", None));
-        ___qtablewidgetitem16 = self.tableRes.verticalHeaderItem(2)
-        ___qtablewidgetitem16.setText(QCoreApplication.translate("MainWindow", u"Erro aleat\u00f3rio, em %", None));
         self.toolBar.setWindowTitle(QCoreApplication.translate("MainWindow", u"toolBar", None))
     # retranslateUi
 
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Incerteza de medição do volume médio de cada coluna.
+
+A propagação é feita pela lei de propagação de incertezas do GUM (JCGM
+100:2008), como na ISO 8655-6 e na ISO 4787, ou pelo método de Monte Carlo
+do suplemento 1 do GUM (JCGM 101:2008), sobre o mesmo modelo do cálculo:
+
+    V = (m + m_evap) / (ro_w(t_w) + ro_a) * (1 - ro_a / ro_b)
+        * (1 - gamma * (t_w - 20)) * mult
+
+com ro_a = ro_a(t_a, u_a, p_a) da ISO 8655-6. Todas as grandezas de entrada
+são tratadas como normais, com as incertezas-padrão informadas. A massa é a
+média das massas líquidas, com a repetibilidade (s / raiz de n) e duas
+leituras da balança por medida.
+
+Sem o NumPy, cada ensaio de Monte Carlo custa uns 6 µs de Python puro. Com
+a tolerância padrão (ndig=2), a vidraria de incerteza pequena costuma chegar
+ao limite de 1e6 ensaios (uns 7 s num núcleo), e as micropipetas param com
+uns 1e5. Por isso os blocos de ensaios são avaliados por padrão em todos os
+núcleos, em processos separados (monte_carlo); quem chama da interface deve
+fazê-lo fora da thread da interface.
+"""
+
+import os
+import math
+import random
+
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import NamedTuple
+
+from density import interp_ro_water, ro_air, ro_water
+from engine import ISO_4787, MULT, net_masses
+from stats import mean_stdev
+
+
+class Uncertainties(NamedTuple):
+    # incertezas-padrão das grandezas de entrada
+    u_bal: float = 0.0  # balança, em g, por leitura
+    u_tw: float = 0.0  # temperatura da água, em °C
+    u_ta: float = 0.0  # temperatura ambiente, em °C
+    u_pa: float = 0.0  # pressão atmosférica, em hPa
+    u_ua: float = 0.0  # umidade relativa, em %
+    u_ro_b: float = 0.0  # densidade dos pesos, em g/mL
+    u_coef: float = 0.0  # coeficiente de expansão térmica, em 1/°C
+    u_evap: float = 0.0  # perda por evaporação, em g
+
+
+class Budget(NamedTuple):
+    u: float  # incerteza-padrão combinada do volume médio
+    U: float  # incerteza expandida
+    k: float  # fator de abrangência
+    contributions: tuple  # incerteza-padrão, em volume, de cada entrada
+
+
+class MonteCarloResult(NamedTuple):
+    y: float  # estimativa do volume médio
+    u: float  # incerteza-padrão
+    low: float  # limites do intervalo de abrangência
+    high: float
+    p: float  # probabilidade de abrangência
+    trials: int  # número de ensaios de Monte Carlo
+    seed: int  # semente usada, para reproduzir o resultado
+
+
+def _d_ro_water(tw):
+    # derivada da fórmula de Tanaka em relação à temperatura
+    a, b, c, d = 3.983035, 301.797, 522528.9, 69.34881
+    g = (2 * (tw - a) * (tw + b) * (tw + d) + (tw - a)**2 * (tw + d)
+         - (tw - a)**2 * (tw + b)) / (tw + d)**2
+    return -0.99997495 * g / c
+
+
+@lru_cache(maxsize=1024)
+def sensitivities(kind, coef_term, env, tw):
+    # Coeficientes de sensibilidade do modelo. O primeiro é dV/dm, o volume
+    # por grama de água (vale também para a evaporação); os demais são
+    # relativos, (dV/dx) / V, na ordem de Uncertainties. Dependem só do tipo,
+    # do material, do ambiente e da temperatura da água, então são
+    # calculados uma vez e reaproveitados por todas as colunas e ensaios
+    ta, pa, ua, ro_b = env.ta, env.pa, env.ua, env.ro_b
+    ro_w = ro_water(tw)
+    ro_a = ro_air(ta, ua, pa)
+    dens = ro_w + ro_a
+    empuxo = 1 - ro_a / ro_b
+    dilat = 1 - coef_term * (tw - 20)
+    por_grama = 1 / dens * empuxo * dilat * MULT[kind]
+    # derivadas da densidade do ar (ISO 8655-6)
+    e = math.exp(0.061 * ta)
+    tk = ta + 273.15
+    da_dpa = 0.34848 / 1000 / tk
+    da_dua = -0.009 * e / 1000 / tk
+    da_dta = (-0.009 * ua * 0.061 * e * tk - (0.34848 * pa - 0.009 * ua * e)) / 1000 / tk**2
+    # sensibilidade relativa do volume à densidade do ar
+    rel_ro_a = -1 / dens - (1 / ro_b) / empuxo
+    return (por_grama,
+            -_d_ro_water(tw) / dens - coef_term / dilat,
+            rel_ro_a * da_dta,
+            rel_ro_a * da_dpa,
+            rel_ro_a * da_dua,
+            (ro_a / ro_b**2) / empuxo,
+            -(tw - 20) / dilat)
+
+
+def gum_budget(column, vol, kind, coef_term, env, unc, k=2):
+    # orçamento de incerteza do volume médio de uma coluna, a partir da coluna
+    # de dados [v_nom, v_s, t_água, ...] e dos volumes [v_nom, v_s, v_1, ...]
+    medidas = vol[2:]
+    n = len(medidas)
+    mean, s = mean_stdev(medidas)
+    por_grama, r_tw, r_ta, r_pa, r_ua, r_ro_b, r_coef = sensitivities(
+        kind, coef_term, env, column[2])
+    # a ISO 4787 não considera a evaporação
+    u_evap = 0.0 if kind in ISO_4787 else unc.u_evap
+    contrib = (s / math.sqrt(n),
+               por_grama * math.sqrt(2) * unc.u_bal,
+               abs(r_tw * mean * unc.u_tw),
+               abs(r_ta * mean * unc.u_ta),
+               abs(r_pa * mean * unc.u_pa),
+               abs(r_ua * mean * unc.u_ua),
+               abs(r_ro_b * mean * unc.u_ro_b),
+               abs(r_coef * mean * unc.u_coef),
+               por_grama * u_evap)
+    u = math.sqrt(math.fsum(c**2 for c in contrib))
+    return Budget(u, k * u, k, contrib)
+
+
+def mc_model(column, kind, coef_term, env, unc, tara=False):
+    # monta as médias e incertezas das entradas de uma coluna
+    # [v_nom, v_s, t_água, m_recipiente, m_1, ..., m_n]
+    net = net_masses(column[4:], None if tara else column[3], kind)
+    n = len(net)
+    m, s = mean_stdev(net)
+    u_m = math.sqrt(s**2 / n + 2 * unc.u_bal**2)
+    # a ISO 4787 não considera a evaporação
+    if kind in ISO_4787:
+        m_evap, u_evap = 0.0, 0.0
+    else:
+        m_evap, u_evap = env.m_evap, unc.u_evap
+    return (m, u_m, column[2], unc.u_tw, env.ta, unc.u_ta, env.pa, unc.u_pa,
+            env.ua, unc.u_ua, env.ro_b, unc.u_ro_b, coef_term, unc.u_coef,
+            m_evap, u_evap, MULT[kind])
+
+
+def mc_chunk(model, seed, n):
+    # avalia n ensaios do modelo; cada bloco tem sua própria semente, então o
+    # resultado não depende de quantos processos foram usados
+    (m, u_m, tw, u_tw, ta, u_ta, pa, u_pa, ua, u_ua, ro_b, u_ro_b,
+     coef, u_coef, m_evap, u_evap, mult) = model
+    g = random.Random(seed).gauss
+    exp = math.exp
+    ro_water = interp_ro_water
+    out = array("d", bytes(8 * n))
+    for i in range(n):
+        t = g(tw, u_tw)
+        t_a = g(ta, u_ta)
+        ro_a = (1 / 1000) * (0.34848 * g(pa, u_pa) - 0.009 * g(ua, u_ua) * exp(0.061 * t_a))/(t_a + 273.15)
+        out[i] = ((g(m, u_m) + g(m_evap, u_evap)) / (ro_water(t) + ro_a)
+                  * (1 - ro_a / g(ro_b, u_ro_b)) * (1 - g(coef, u_coef) * (t - 20)) * mult)
+    return out
+
+
+def _summary(values, p):
+    # estimativa, incerteza-padrão e intervalo probabilisticamente simétrico
+    v = sorted(values)
+    n = len(v)
+    q = int(n * (1 - p) / 2 + 0.5)
+    return (*mean_stdev(v), v[q], v[n - 1 - q])
+
+
+def _pooled_std(blocos, n):
+    # desvio-padrão de todos os valores a partir das médias e desvios dos
+    # blocos de n valores, sem percorrer os valores de novo
+    h = len(blocos)
+    mean = math.fsum(b[0] for b in blocos) / h
+    ss = math.fsum((n - 1) * b[1]**2 + n * (b[0] - mean)**2 for b in blocos)
+    return math.sqrt(ss / (h * n - 1))
+
+
+def _tolerance(u, ndig):
+    # tolerância numérica do GUM S1, 7.9.2: meia unidade do último dígito
+    # significativo de u
+    if u <= 0:
+        return 0.0
+    return 0.5 * 10**(math.floor(math.log10(u)) - ndig + 1)
+
+
+def _convergiu(blocos, chunk, ndig):
+    # o desvio-padrão das médias, da incerteza e dos limites dos blocos, vezes
+    # dois, abaixo da tolerância numérica (GUM S1, 7.9.4)
+    h = len(blocos)
+    delta = _tolerance(_pooled_std(blocos, chunk), ndig)
+    return all(2 * mean_stdev([b[k] for b in blocos])[1] / math.sqrt(h) <= delta
+               for k in range(4))
+
+
+def monte_carlo(model, p=0.95, seed=None, ndig=2, chunk=10**4,
+                max_trials=10**6, executor=None, per_round=None, processos=None):
+    # Procedimento adaptativo do GUM S1, 7.9: avalia blocos de `chunk`
+    # ensaios até que os blocos convirjam, ou até `max_trials`. Cada rodada
+    # avalia `per_round` blocos em paralelo no executor; sem um, os blocos
+    # vão para um ProcessPoolExecutor próprio com `processos` processos
+    # (padrão: todos os núcleos). processos=1 avalia tudo neste processo. A
+    # convergência é conferida bloco a bloco, na ordem, e os blocos da rodada
+    # que passarem do ponto de parada são descartados: com a mesma semente, o
+    # resultado é o mesmo com qualquer número de processos
+    if seed is None:
+        seed = random.randrange(2**32)
+    if executor is None and processos != 1 and (processos or os.cpu_count() or 1) > 1:
+        with ProcessPoolExecutor(processos) as proprio:
+            return monte_carlo(model, p, seed, ndig, chunk, max_trials, proprio,
+                               per_round or processos or os.cpu_count())
+    if per_round is None:
+        per_round = 1 if executor is None else os.cpu_count()
+    chunk = max(chunk, int(100 / (1 - p)))
+    values = array("d")
+    blocos = []
+    convergiu = False
+    while len(values) < max_trials and not convergiu:
+        h = len(blocos)
+        n = min(per_round, -(-(max_trials - len(values)) // chunk))
+        seeds = ["%d:%d" % (seed, h + i) for i in range(n)]
+        if executor is None:
+            done = map(mc_chunk, [model] * n, seeds, [chunk] * n)
+        else:
+            done = executor.map(mc_chunk, [model] * n, seeds, [chunk] * n)
+        for out in done:
+            values.extend(out)
+            blocos.append(_summary(out, p))
+            if len(blocos) >= 2 and _convergiu(blocos, chunk, ndig):
+                convergiu = True
+                break
+    y, u, low, high = _summary(values, p)
+    return MonteCarloResult(y, u, low, high, p, len(values), seed)
+
+
+def mc_column(column, kind, coef_term, env, unc, tara=False, **kwargs):
+    # atalho: incerteza do volume médio de uma coluna da tabela de dados
+    return monte_carlo(mc_model(column, kind, coef_term, env, unc, tara), **kwargs)
@@ -8,38 +8,80 @@ Created on Thu Nov 30 20:03:00 2023
 
 import os
 import sys
-import math
-import statistics
+import time
+import uuid
+
+# início da inicialização, para o --profile-startup
+INICIO = time.perf_counter()
+
+if __name__ == "__main__":
+    # processos filhos do modo em lote no executável do PyInstaller; fora
+    # dele, o multiprocessing nem precisa ser carregado aqui
+    if getattr(sys, "frozen", False):
+        import multiprocessing
+        multiprocessing.freeze_support()
+    # modo em lote, sem interface: "vaca batch <pasta>"
+    if sys.argv[1:2] == ["batch"]:
+        from batch import main
+        sys.exit(main(sys.argv[2:]))
 
 from datetime import datetime
-from PySide6 import QtSvg, QtPrintSupport
 from PySide6.QtCore import __version__ as pyside_version
 
 from PySide6.QtGui import (
     QAction,
     QIcon,
-    QFontDatabase,
-    QTextDocument,
-    QPageSize,
-    QPageLayout,
-    QFont
+    QPixmap
 )
 from PySide6.QtWidgets import (
     QMainWindow,
     QApplication,
-    QTableWidget,
-    QTableWidgetItem,
     QFileDialog,
-    QMessageBox
+    QMessageBox,
+    QGroupBox,
+    QFormLayout,
+    QDialog,
+    QDialogButtonBox,
+    QDoubleSpinBox,
+    QHeaderView,
+    QTableView,
+    QVBoxLayout,
+    QAbstractSpinBox,
+    QCheckBox,
+    QLineEdit,
+    QStyledItemDelegate,
+    QHBoxLayout,
+    QLabel,
+    QComboBox,
+    QProgressDialog,
+    QPushButton,
+    QSpinBox,
+    QStyle
 )
 from PySide6.QtCore import (
     QDate,
-    QMargins,
-    QSizeF
+    QEvent,
+    QObject,
+    QTimer,
+    Qt
 )
+from PySide6.QtSerialPort import QSerialPortInfo
 from platform import python_version
 
 from ui_main_vaca import Ui_MainWindow
+from engine import (Environment, INSTRUMENTOS, ISO_4787, MATERIAIS, MIN_MEDIDAS, MULT,
+                    LiveColumn, calibrate, channel_verdicts, check_column, device_verdict,
+                    recalculate)
+from uncertainty import Uncertainties, gum_budget
+from balance import BAUDS, BalanceReader
+from icons import icone
+from fonts import FONTES_INTERFACE, carrega_fontes
+from style import folha_de_estilo
+from session import EXTENSAO, Grade, Sessao, abre, salva
+from tolerances import NORMAS
+from report import Report, linhas_dados, linhas_res, rotulos_multicanal, texto_veredito
+from tablemodel import (DataModel, ResultModel, TrendModel, NUMERO, PARCIAL, VAZIO,
+                        format_number)
 
 basedir = os.path.dirname(__file__)
 
@@ -54,22 +96,86 @@ except ImportError:
     pass
 
 
-def calc_ro_water(tw, ta, ua, pa):
-    # densidade da água segundo "Tanaka M. et al., Recommended table
-    # for the density of water between 0 °C and 40 °C based on
-    # recent experimental reports,  Metrologia,  2001, 38, 301-309  
-    ro_w = 0.99997495 * (1 - (tw - 3.983035)**2 * (tw + 301.797)/(522528.9 * (tw + 69.34881)))
-    return ro_w
+# campos das incertezas-padrão: nome, rótulo, sufixo e casas decimais.
+# A do coeficiente de expansão é relativa, em %
+CAMPOS_INCERTEZA = (
+    ("u_bal", "Balança:", " g", 5),
+    ("u_tw", "Termômetro água:", "°C", 2),
+    ("u_ta", "Termômetro ambiente:", "°C", 2),
+    ("u_pa", "Barômetro:", " hPa", 1),
+    ("u_ua", "Higrômetro:", "%", 1),
+    ("u_ro_b", "Dens. dos pesos de ref.:", " g·mL⁻¹", 3),
+    ("u_coef", "Coef. de expansão:", "%", 1),
+    ("u_evap", "Perda por evaporação:", " g", 5),
+)
+
+# tamanho inicial e máximo da tabela de dados: volumes ensaiados (colunas)
+# e medidas por volume (linhas, além das quatro do cabeçalho)
+COLUNAS = 5
+MAX_VOLUMES = 100
+MEDIDAS = 10
+MAX_MEDIDAS = 100
+
+# número de canais das pipetas multicanal
+CANAIS = (8, 12, 16, 96)
+
+# espera, em ms, depois da última edição antes do cálculo automático
+ESPERA_AUTO = 400
+
+# espera, em ms, depois do último cálculo antes de gravar o ensaio no histórico
+ESPERA_HISTORICO = 3000
+
+class EditorAoVivo(QStyledItemDelegate):
+    # no cálculo automático, o texto vai para a tabela a cada tecla, e não
+    # só quando a edição termina
+
+    def __init__(self, ativo, parent=None):
+        super().__init__(parent)
+        self.ativo = ativo
+
+    def createEditor(self, parent, option, index):
+        editor = super().createEditor(parent, option, index)
+        if isinstance(editor, QLineEdit):
+            editor.textEdited.connect(lambda text: self.ativo() and self.commitData.emit(editor))
+        return editor
+
+    def setEditorData(self, editor, index):
+        # não devolve ao editor o texto que ele mesmo acabou de enviar (e que
+        # o modelo reformata), senão o cursor pula e a vírgula some a cada tecla
+        if isinstance(editor, QLineEdit) and editor.isModified():
+            return
+        super().setEditorData(editor, index)
+
+
+class PerfilInicio(QObject):
+    # --profile-startup: tempo de cada fase da inicialização, desde o início
+    # do vaca.py até a primeira pintura da janela
+    def __init__(self):
+        super().__init__()
+        self.fases = []
+        self.anterior = INICIO
+
+    def marca(self, fase):
+        agora = time.perf_counter()
+        self.fases.append((fase, agora - self.anterior))
+        self.anterior = agora
 
-def calc_ro_air(ta, ua, pa):
-    # Densidade do ar de acordo com a ISO 8655-6:2022
-    ro_a = (1 / 1000) * (0.34848 * pa - 0.009 * ua * math.e**(0.061 * ta))/(ta + 273.15)
-    return ro_a
+    def eventFilter(self, obj, event):
+        # instalado na aplicação: a primeira pintura de qualquer widget
+        if event.type() == QEvent.Type.Paint:
+            QApplication.instance().removeEventFilter(self)
+            self.marca("primeira pintura")
+            # o relatório sai depois que a pintura termina
+            QTimer.singleShot(0, self.mostra)
+        return False
 
-# variáveis para armazenamento das tabelas para uso na impressão
-table_data = []
-vol_data = []
-res_data = []
+    def mostra(self):
+        linhas = ["%-20s %8.1f ms" % (fase, 1000 * t) for fase, t in self.fases]
+        linhas.append("%-20s %8.1f ms" % ("total", 1000 * sum(t for _, t in self.fases)))
+        texto = "\n".join(linhas)
+        print(texto, file=sys.stderr)
+        # o executável não tem console: o relatório também vai numa janela
+        QMessageBox.information(None, "V.A.Ca. - inicialização", "<pre>" + texto + "</pre>")
 
 
 class MainWindow(QMainWindow, Ui_MainWindow):
@@ -77,11 +183,10 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     def __init__(self):
         super().__init__()
         self.setupUi(self)
-        #Adicionando as fontes Cantarell
-        QFontDatabase.addApplicationFont(os.path.join(basedir, "Cantarell-Regular.ttf"))
-        QFontDatabase.addApplicationFont(os.path.join(basedir, "Cantarell-Bold.ttf"))
-        QFontDatabase.addApplicationFont(os.path.join(basedir, "Cantarell-BoldItalic.ttf"))
-        QFontDatabase.addApplicationFont(os.path.join(basedir, "Cantarell-Italic.ttf"))
+        # o logo do formulário vem da pasta do programa, e não da pasta atual
+        self.label_2.setPixmap(QPixmap(os.path.join(basedir, "logo.png")))
+        #Adicionando as fontes Cantarell; as itálicas, só do relatório, depois
+        carrega_fontes(FONTES_INTERFACE)
         # barra de botões
         button_calc = QAction(QIcon(os.path.join(basedir,"calc_icon.svg")), "Calcular", self)
         button_calc.triggered.connect(self.calcular)
@@ -89,42 +194,305 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         button_clear = QAction(QIcon(os.path.join(basedir,"clear_icon.svg")), "Limpar", self)
         button_clear.triggered.connect(self.clear_tables)
         self.toolBar.addAction(button_clear)
+        button_abrir = QAction(self.style().standardIcon(QStyle.StandardPixmap.SP_DialogOpenButton),
+                               "Abrir ensaio", self)
+        button_abrir.triggered.connect(self.abre_ensaio)
+        self.toolBar.addAction(button_abrir)
+        button_salvar = QAction(self.style().standardIcon(QStyle.StandardPixmap.SP_DialogSaveButton),
+                                "Salvar ensaio", self)
+        button_salvar.triggered.connect(self.salva_ensaio)
+        self.toolBar.addAction(button_salvar)
         button_relat = QAction(QIcon(os.path.join(basedir,"relat_icon.svg")), "Relatório", self)
         button_relat.triggered.connect(self.handlePrint)
         self.toolBar.addAction(button_relat)
+        button_lote = QAction(QIcon(os.path.join(basedir,"relat_icon.svg")), "Relatórios em lote", self)
+        button_lote.triggered.connect(self.relatorios_lote)
+        self.toolBar.addAction(button_lote)
+        button_tend = QAction(QIcon(os.path.join(basedir, "calc_icon.svg")), "Tendências", self)
+        button_tend.triggered.connect(self.mostra_tendencias)
+        self.toolBar.addAction(button_tend)
         button_sobre = QAction(QIcon(os.path.join(basedir,"icon.svg")), "Sobre", self)
         button_sobre.triggered.connect(self.sobre)
         self.toolBar.addAction(button_sobre)
         # populando drop list com o multiplicador pra apresentar o resultado em µL ou mL
         # e tipo de instrumento
-        self.instKind.addItem("Balão volumétrico Classe A", (1, "bv"))
-        self.instKind.addItem("Bal. vol. Cl. A, boca larga", (1, "bvl"))
-        self.instKind.addItem("Bureta Classe A|AS", (1, "b"))
-        self.instKind.addItem('Bureta "digital" manual', (1, "bdm"))
-        self.instKind.addItem('Bureta "digital" motorizada', (1, "bda"))
-        self.instKind.addItem("Dispensador", (1, "d"))
-        self.instKind.addItem("Micropipeta tipo A|D1", (1000, "msa"))
-        self.instKind.addItem("Micropipeta tipo D2", (1000, "msd2"))
-        self.instKind.addItem("Micropipeta multicanal", (1000, "mm"))
-        self.instKind.addItem("Pipeta graduada Classe A|AS", (1, "pg"))
-        self.instKind.addItem("Pipeta volumétrica Classe A|AS", (1, "pv"))
+        for kind, nome in INSTRUMENTOS.items():
+            self.instKind.addItem(nome, (MULT[kind], kind))
         # populando drop list com o coeficiente de expansão térmica de acordo com o material
-        # valores da ISO 1042:1998
-        self.instMat.addItem("Vidro borossilicato 3.3", 9.9e-6)
-        self.instMat.addItem("Vidro borossilicato 5.0", 1.5e-5)
-        self.instMat.addItem("Vidro soda-lime", 2.7e-5)
-        self.instMat.addItem("Polipropileno (PP)", 2.4e-4)
-        self.instMat.addItem("Poliestireno (PS)", 4.5e-4)
-        self.instMat.addItem("Policarbonato (PC)", 2.1e-4)
-        self.instMat.addItem("Perfluoroalcoxi alcano (PFA)", 3.9e-4)
-        self.instMat.addItem("Polimetilpenteno (PMP)", 3.6e-4)
+        for nome, coef in MATERIAIS.items():
+            self.instMat.addItem(nome, coef)
         # conecta o combo pra mudar as unidades entre µL e mL
         self.instKind.currentIndexChanged.connect(self.muda_unidade)
         # seta a data de hoje no caledário do dia do ensaio, pra facilitar a vida do usuário
         self.dateEdit.setDate(QDate.currentDate())
+        # as tabelas guardam os números em arrays, sem um objeto por célula
+        self.dados = DataModel(linhas_dados(MEDIDAS), COLUNAS, self)
+        self.tableData.setModel(self.dados)
+        self.resultados = ResultModel(linhas_res(), COLUNAS, self)
+        self.tableRes.setModel(self.resultados)
         # alinhando o cabeçalho das linhas nas duas tabelas
         self.tableData.verticalHeader().setFixedWidth(210)
         self.tableRes.verticalHeader().setFixedWidth(210)
+        self.setup_incertezas()
+        # cálculo incremental: só as colunas alteradas são recalculadas
+        n = self.dados.columnCount()
+        self._dirty = set(range(n))
+        self._colunas = [[] for _ in range(n)]
+        self._results = [None] * n
+        self._budgets = [None] * n
+        # estatística parcial das colunas sendo lidas da balança
+        self._ao_vivo = {}
+        self.dados.dataChanged.connect(self.marca_colunas)
+        # os campos compartilhados afetam todas as colunas
+        for spin in (self.tempAmb, self.presAtm, self.umidRel, self.mEvap, self.densPesos,
+                     *self.incert.values()):
+            spin.valueChanged.connect(self.marca_tudo)
+        self.instKind.currentIndexChanged.connect(self.marca_tudo)
+        self.instMat.currentIndexChanged.connect(self.marca_tudo)
+        self.checkTara.toggled.connect(self.marca_tudo)
+        # cálculo automático: as edições em sequência são agrupadas pelo timer
+        self.checkAuto = QCheckBox("Cálculo automático", self.groupBox_5)
+        self.verticalLayout_4.insertWidget(1, self.checkAuto)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(ESPERA_AUTO)
+        self._timer.timeout.connect(self.calculo_automatico)
+        self.checkAuto.toggled.connect(self.agenda)
+        self.tableData.setItemDelegate(EditorAoVivo(self.checkAuto.isChecked, self.tableData))
+        self.setup_balanca()
+        self.setup_grade()
+        # gravação dos relatórios em lote, quando em andamento
+        self.exportacao = None
+        # histórico das calibrações: o ensaio é gravado quando os cálculos
+        # param, e cada gravação da mesma sessão substitui a anterior
+        self.historico = None
+        self._origem = "interface:" + uuid.uuid4().hex
+        self._timer_historico = QTimer(self)
+        self._timer_historico.setSingleShot(True)
+        self._timer_historico.setInterval(ESPERA_HISTORICO)
+        self._timer_historico.timeout.connect(self.grava_historico)
+        # o que não é preciso para a primeira pintura fica para depois
+        QTimer.singleShot(0, self.adiados)
+
+    def adiados(self):
+        # roda com a janela já na tela: a lista de portas seriais, que pode
+        # demorar no Windows, e as fontes que só o relatório usa
+        self.lista_portas()
+        carrega_fontes()
+
+    def lista_portas(self):
+        # o que já foi digitado na porta não é trocado pela primeira da lista
+        texto = self.balPorta.currentText()
+        for info in QSerialPortInfo.availablePorts():
+            self.balPorta.addItem(info.portName())
+        if texto:
+            self.balPorta.setEditText(texto)
+
+    def setup_incertezas(self):
+        # caixa com as incertezas-padrão das entradas, logo abaixo dos
+        # parâmetros ambientais
+        self.groupIncert = QGroupBox("Incertezas-padrão:", self.widget_2)
+        layout = QFormLayout(self.groupIncert)
+        self.incert = {}
+        for campo, rotulo, sufixo, casas in CAMPOS_INCERTEZA:
+            spin = QDoubleSpinBox(self.groupIncert)
+            spin.setButtonSymbols(QAbstractSpinBox.NoButtons)
+            spin.setDecimals(casas)
+            spin.setSuffix(sufixo)
+            layout.addRow(rotulo, spin)
+            self.incert[campo] = spin
+        self.verticalLayout_2.insertWidget(self.verticalLayout_2.indexOf(self.groupBox_3) + 1,
+                                           self.groupIncert)
+
+    def setup_balanca(self):
+        # linha com a porta da balança, acima da tabela de dados
+        self.balanca = None
+        linha = QHBoxLayout()
+        linha.addWidget(QLabel("Balança:", self.groupBox_5))
+        self.balPorta = QComboBox(self.groupBox_5)
+        # editável, pra aceitar portas que não aparecem na lista
+        self.balPorta.setEditable(True)
+        self.balPorta.setMinimumWidth(160)
+        linha.addWidget(self.balPorta)
+        self.balBaud = QComboBox(self.groupBox_5)
+        for baud in BAUDS:
+            self.balBaud.addItem(str(baud) + " bps", baud)
+        self.balBaud.setCurrentIndex(BAUDS.index(9600))
+        linha.addWidget(self.balBaud)
+        # variação da massa que conta como outra pesagem; em 0, dez vezes a
+        # resolução da balança (balance.DIGITOS)
+        linha.addWidget(QLabel("Variação mínima:", self.groupBox_5))
+        self.balDelta = QDoubleSpinBox(self.groupBox_5)
+        self.balDelta.setDecimals(4)
+        self.balDelta.setRange(0, 100)
+        self.balDelta.setSingleStep(0.001)
+        self.balDelta.setSuffix(" g")
+        self.balDelta.setSpecialValueText("automática")
+        linha.addWidget(self.balDelta)
+        self.balConecta = QPushButton("Conectar", self.groupBox_5)
+        self.balConecta.setCheckable(True)
+        self.balConecta.toggled.connect(self.conecta_balanca)
+        linha.addWidget(self.balConecta)
+        linha.addStretch()
+        self.verticalLayout_4.insertLayout(2, linha)
+
+    def setup_grade(self):
+        # Tamanho da tabela de dados: volumes ensaiados (colunas) e medidas
+        # por volume (linhas). Nas pipetas multicanal há uma coluna por canal e
+        # por volume, agrupadas por volume, e os canais herdam o volume nominal,
+        # o volume ensaiado e a temperatura da água do primeiro canal do grupo
+        linha = QHBoxLayout()
+        linha.addWidget(QLabel("Volumes ensaiados:", self.groupBox_5))
+        self.nVolumes = QSpinBox(self.groupBox_5)
+        self.nVolumes.setRange(1, MAX_VOLUMES)
+        self.nVolumes.setValue(COLUNAS)
+        linha.addWidget(self.nVolumes)
+        linha.addWidget(QLabel("Medidas por volume:", self.groupBox_5))
+        self.nMedidas = QSpinBox(self.groupBox_5)
+        self.nMedidas.setRange(MIN_MEDIDAS, MAX_MEDIDAS)
+        self.nMedidas.setValue(MEDIDAS)
+        linha.addWidget(self.nMedidas)
+        self.labelCanais = QLabel("Canais:", self.groupBox_5)
+        linha.addWidget(self.labelCanais)
+        self.mmCanais = QComboBox(self.groupBox_5)
+        for n in CANAIS:
+            self.mmCanais.addItem(str(n), n)
+        linha.addWidget(self.mmCanais)
+        linha.addStretch()
+        self.verticalLayout_4.insertLayout(3, linha)
+        # conformidade por canal e do instrumento, abaixo dos resultados
+        self.veredito = QLabel(self.groupBox_4)
+        self.veredito.setWordWrap(True)
+        self.verticalLayout_5.addWidget(self.veredito)
+        self.mmCanais.currentIndexChanged.connect(self.muda_colunas)
+        self.nVolumes.valueChanged.connect(self.muda_colunas)
+        self.instKind.currentIndexChanged.connect(self.muda_colunas)
+        self.nMedidas.valueChanged.connect(self.muda_linhas)
+        self.muda_colunas()
+
+    def canais(self):
+        # número de canais da pipeta multicanal, ou 0 fora do modo multicanal
+        if self.instKind.currentData()[1] != "mm":
+            return 0
+        return self.mmCanais.currentData()
+
+    def muda_colunas(self, *args):
+        canais = self.canais()
+        for w in (self.labelCanais, self.mmCanais, self.veredito):
+            w.setVisible(bool(canais))
+        volumes = self.nVolumes.value()
+        if canais:
+            n = canais * volumes
+            labels = rotulos_multicanal(n, canais)
+        else:
+            n = volumes
+            labels = None
+        for model in (self.dados, self.resultados):
+            model.set_column_count(n)
+            model.set_labels(labels)
+        # os grupos de canais mudaram: tudo é recalculado
+        self._colunas[n:] = []
+        self._colunas += [[] for _ in range(n - len(self._colunas))]
+        self._results = (self._results + [None] * n)[:n]
+        self._budgets = (self._budgets + [None] * n)[:n]
+        self._dirty = set(range(n))
+        self._ao_vivo = {}
+        self.veredito.clear()
+
+    def muda_linhas(self, medidas):
+        # as linhas que ficam mantêm os dados; as cortadas são descartadas
+        self.dados.set_rows(linhas_dados(medidas))
+        self.muda_unidade()
+        self.marca_tudo()
+
+    def conecta_balanca(self, conectar):
+        if self.balanca is not None:
+            self.balanca.stop()
+            self.balanca = None
+        self.balPorta.setEnabled(not conectar)
+        self.balBaud.setEnabled(not conectar)
+        self.balDelta.setEnabled(not conectar)
+        self.balConecta.setText("Desconectar" if conectar else "Conectar")
+        if not conectar:
+            self.statusbar.showMessage("Balança desconectada.", 3000)
+            return
+        self.balanca = BalanceReader(self.balPorta.currentText().strip(),
+                                     self.balBaud.currentData(),
+                                     delta=self.balDelta.value())
+        self.balanca.massa.connect(self.recebe_massa)
+        self.balanca.erro.connect(self.erro_balanca)
+        self.balanca.start()
+        self.statusbar.showMessage("Aguardando leituras estáveis da balança.", 3000)
+
+    def erro_balanca(self, msg):
+        self.balConecta.setChecked(False)
+        QMessageBox.critical(self, "V.A.Ca.", msg)
+
+    def recebe_massa(self, massa):
+        # a massa vai para a primeira célula vazia da coluna selecionada, a
+        # partir da massa do recipiente (linha 3)
+        coluna = max(self.tableData.currentIndex().column(), 0)
+        estados = self.dados.column(coluna)[1]
+        for row in range(3, self.dados.rowCount()):
+            if estados[row] == VAZIO:
+                # a edição abaixo descarta a estatística parcial da coluna
+                live = self._ao_vivo.pop(coluna, None)
+                self.dados.set_text(row, coluna, massa)
+                self.tableData.setCurrentIndex(self.dados.index(row, coluna))
+                self.previa(coluna, row, live)
+                return
+        self.statusbar.showMessage("A coluna " + str(coluna + 1) + " está cheia. "
+                                   "Selecione outra coluna para continuar.", 5000)
+
+    def previa(self, coluna, row, live):
+        # Média e CV parciais a cada leitura da balança. A coluna só é lida
+        # inteira na primeira leitura; as seguintes entram em O(1)
+        if row < 4:
+            return
+        valores, estados = self.coluna(coluna)
+        if live is None or live.stats.n != row - 4:
+            if any(e != NUMERO for e in estados[:row]) or valores[1] == 0:
+                return
+            live = LiveColumn(valores[:row], self.instKind.currentData()[1],
+                              self.instMat.currentData(), self.ambiente(),
+                              self.checkTara.isChecked())
+        live.add(valores[row])
+        self._ao_vivo[coluna] = live
+        unid = "µL" if self.instKind.currentData()[0] == 1000 else "mL"
+        mean, e_sis, e_ale = live.results()
+        texto = "Coluna %d, %dª medida: média de %s %s" % (
+            coluna + 1, live.stats.n, format_number(mean, 3), unid)
+        if live.stats.n > 1:
+            texto += ", erro aleatório de %s %%" % format_number(e_ale, 3)
+        self.statusbar.showMessage(texto + ".")
+
+    def closeEvent(self, event):
+        # a thread da balança tem de parar antes de a janela ser destruída
+        if self.balanca is not None:
+            self.balanca.stop()
+            self.balanca = None
+        # e o lote de relatórios é cancelado
+        if self.exportacao is not None:
+            self.exportacao.stop()
+            self.exportacao = None
+        # o último cálculo ainda não gravado vai para o histórico
+        if self._timer_historico.isActive():
+            self.grava_historico()
+        if self.historico is not None:
+            self.historico.close()
+            self.historico = None
+        super().closeEvent(event)
+
+    def ambiente(self):
+        # condições ambientais do ensaio
+        return Environment(self.tempAmb.value(), self.presAtm.value(), self.umidRel.value(),
+                           self.mEvap.value(), self.densPesos.value())
+
+    def incertezas(self):
+        # incertezas-padrão informadas; a do coeficiente passa de % para 1/°C
+        u = {campo: spin.value() for campo, spin in self.incert.items()}
+        u["u_coef"] = self.instMat.currentData() * u["u_coef"] / 100
+        return Uncertainties(**u)
     
     def sobre(self):
         QMessageBox.about(self, "Sobre..", "V.A.Ca. (versão <i>Angus</i>) foi idealizado "
@@ -135,852 +503,488 @@ class MainWindow(QMainWindow, Ui_MainWindow):
                                            % (python_version(), pyside_version))
     def muda_unidade(self):
         # troca a unidade da interface de acordo com a unidade de volume do instrumento
-        if self.instKind.currentData()[0] == 1:
-            self.tableData.setVerticalHeaderItem(0, QTableWidgetItem("Volume nominal, em mL"))
-            self.tableData.setVerticalHeaderItem(1, QTableWidgetItem("Volume ensaiado, em mL"))
-            self.tableRes.setVerticalHeaderItem(0, QTableWidgetItem("Volume medido, em mL"))
-            self.tableRes.setVerticalHeaderItem(1, QTableWidgetItem("Erro sistemático, em mL"))
-        else:
-            self.tableData.setVerticalHeaderItem(0, QTableWidgetItem("Volume nominal, em µL"))
-            self.tableData.setVerticalHeaderItem(1, QTableWidgetItem("Volume ensaiado, em µL"))
-            self.tableRes.setVerticalHeaderItem(0, QTableWidgetItem("Volume medido, em µL"))
-            self.tableRes.setVerticalHeaderItem(1, QTableWidgetItem("Erro sistemático, em %"))
+        unid = 'mL' if self.instKind.currentData()[0] == 1 else 'µL'
+        for row, texto in enumerate(linhas_dados(0, unid)[:2]):
+            self.dados.set_header(row, texto)
+        for row, texto in enumerate(linhas_res(unid)):
+            self.resultados.set_header(row, texto)
+
+    def marca_colunas(self, topLeft, bottomRight, roles=()):
+        # só as colunas editadas precisam ser recalculadas; ícones e dicas
+        # de erro não mudam os dados
+        if roles and Qt.ItemDataRole.EditRole not in roles:
+            return
+        colunas = range(topLeft.column(), bottomRight.column() + 1)
+        self._dirty.update(colunas)
+        for c in colunas:
+            self._ao_vivo.pop(c, None)
+        # no modo multicanal, o cabeçalho do primeiro canal vale para o grupo
+        canais = self.canais()
+        if canais and topLeft.row() < 3:
+            for c in colunas:
+                if c % canais == 0:
+                    self._dirty.update(range(c, c + canais))
+        self.agenda()
+
+    def marca_tudo(self, *args):
+        # mudou um campo compartilhado: todas as colunas serão recalculadas
+        self._dirty.update(range(self.dados.columnCount()))
+        self._ao_vivo = {}
+        self.agenda()
+
+    def agenda(self, *args):
+        # reinicia a espera a cada edição; calcula quando o usuário para
+        if self.checkAuto.isChecked():
+            self._timer.start()
 
     def clear_tables(self):
-        # limpa os dados das tabelas e variáveis globais
-        self.tableData.clearContents()
-        self.tableRes.clearContents()
-        global table_data
-        global vol_data
-        global res_data
-        table_data = []
-        vol_data = []
-        res_data = []
+        # limpa os dados das tabelas e os resultados; o que vier depois é
+        # outro ensaio no histórico
+        if self._timer_historico.isActive():
+            self.grava_historico()
+        self._origem = "interface:" + uuid.uuid4().hex
+        self.dados.clear()
+        self.resultados.clear()
+        n = self.dados.columnCount()
+        self._dirty = set(range(n))
+        self._ao_vivo = {}
+        self._colunas = [[] for _ in range(n)]
+        self._results = [None] * n
+        self._budgets = [None] * n
+        self.veredito.clear()
 
     def calcular(self):
-        # limpando a tabela de resultados
-        self.tableRes.clearContents()
+        # botão "Calcular": os erros são avisados numa única caixa de diálogo
+        erros, avisos = self.atualiza(auto=False)
+        if erros:
+            QMessageBox.critical(self, "V.A.Ca.", "\n".join(dict.fromkeys(erros)))
+        for aviso in avisos:
+            QMessageBox.about(self, "Informação", aviso)
+
+    def calculo_automatico(self):
+        # cálculo automático: nada de janelas modais, só a barra de status
+        if not self.checkAuto.isChecked():
+            return
+        erros, avisos = self.atualiza(auto=True)
+        msgs = list(dict.fromkeys(erros + avisos))
+        if msgs:
+            self.statusbar.showMessage(" ".join(msgs))
+        else:
+            self.statusbar.clearMessage()
+
+    def atualiza(self, auto):
+        # recalcula as colunas alteradas e devolve as mensagens de erro e os
+        # avisos. No cálculo automático, as colunas com um número ainda sendo
+        # digitado ou com menos de duas medidas ficam para depois, sem erro
+        erros = []
+        avisos = []
         # extraindo as condições ambientais
-        ta = self.tempAmb.value()
-        pa = self.presAtm.value()
-        ua = self.umidRel.value()
-        m_evap = self.mEvap.value()
-        ro_b = self.densPesos.value()
-        # resgatando qual multiplicador usar para calcular em mL ou µL
-        mult = self.instKind.currentData()[0]
+        env = self.ambiente()
+        kind = self.instKind.currentData()[1]
         # coeficiente de expansão térmica do material
         coef_term = self.instMat.currentData()
-        # extraindo o array dos dados de massa
-        table_array = []
-        for i in range(self.tableData.columnCount()):
-            col = []
-            table_array.append(col)
-            for j in range(self.tableData.rowCount()):
-                item = self.tableData.item(j, i)
-                if item is not None and item.text().strip():
-                    # remove o ícone, caso tenha sido adicionado pelo "erro"
-                    item.setIcon(QIcon())
-                    text = item.text().replace(",", ".")
-                    # se o valor não for um número, dá erro
-                    try:
-                        col.append(float(text))
-                    except ValueError:
-                        QMessageBox.critical(self, "V.A.Ca.",
-                                          "O valor informado não é um número válido.")
-                        item.setIcon(QIcon(os.path.join(basedir, "critical.svg")))
-        # salvando pra futuro relatório
-        global table_data
-        table_data = table_array
-        # transformando massa em volume
-        # um IF, pois há pequenas diferenças entre a ISO 4787 e a ISO 8655
-        if self.instKind.currentData()[1] in ["bv", "bvl", "b", "pv", "pg"]:
-            vol_array = []
-            for medida, column in enumerate(table_array):
-                if len(column) != 0:
-                    # verificando se foi informado o volume nominal
-                    try:
-                        float(self.tableData.item(0, medida).text().replace(",", "."))
-                    except:
-                        QMessageBox.critical(self, "V.A.Ca.",
-                                          "O valor do volume nominal não é um número válido.")
-                        self.tableData.setItem(0, medida, QTableWidgetItem(QIcon(os.path.join(basedir, "critical.svg")), ""))
-                        break
-                    # o volume medido
-                    try:
-                        float(self.tableData.item(1, medida).text().replace(",", "."))
-                    except:
-                        QMessageBox.critical(self, "V.A.Ca.",
-                                          "O valor do volume medido não é um número válido.")
-                        self.tableData.setItem(1, medida, QTableWidgetItem(QIcon(os.path.join(basedir, "critical.svg")), ""))
-                        break
-                    # e a temperatura da água
-                    try:
-                        float(self.tableData.item(2, medida).text().replace(",", "."))
-                    except:
-                        QMessageBox.critical(self, "V.A.Ca.",
-                                          "O valor da temperatura da água não é um número válido.")
-                        self.tableData.setItem(2, medida, QTableWidgetItem(QIcon(os.path.join(basedir, "critical.svg")), ""))
-                        break
-                    tw = column[2]
-                    vol = []
-                    for i, ml in enumerate(column):
-                        ro_w = calc_ro_water(tw, ta, ua, pa)
-                        ro_a = calc_ro_air( ta, ua, pa)
-                        if self.checkTara.isChecked():
-                            v = ml * 1/(ro_w + ro_a) * (1 - ro_a / ro_b) * (1 - coef_term * (tw - 20))
-                            vol.append(v * mult)
-                        else:
-                            if self.instKind.currentData()[1] in ["bv", "bvl"]:
-                                v = (ml - column[3]) * 1/(ro_w + ro_a) * (1 - ro_a / ro_b) * (1 - coef_term * (tw - 20))
-                            else:
-                                v = (ml - column[i - 1]) * 1/(ro_w + ro_a) * (1 - ro_a / ro_b) * (1 - coef_term * (tw - 20))
-                            vol.append(v * mult)
-                    # restaurando o volume nominal, ensaiado
-                    vol[0] = column[0]
-                    vol[1] = column[1]
-                    # removendo temperatura e massa do recipiente
-                    vol.pop(2)
-                    vol.pop(2)
-                    # inserindo a coluna no novo array de volumes
-                    vol_array.append(vol)
-        else:
-            vol_array = []
-            for medida, column in enumerate(table_array):
-                if len(column) != 0:
-                    # verificando se foi informado o volume nominal
-                    try:
-                        float(self.tableData.item(0, medida).text().replace(",", "."))
-                    except:
-                        QMessageBox.critical(self, "V.A.Ca.",
-                                          "O valor do volume nominal não é um número válido.")
-                        self.tableData.setItem(0, medida, QTableWidgetItem(QIcon(os.path.join(basedir, "critical.svg")), ""))
-                        break
-                    # o volume medido
-                    try:
-                        float(self.tableData.item(1, medida).text().replace(",", "."))
-                    except:
-                        QMessageBox.critical(self, "V.A.Ca.",
-                                          "O valor do volume medido não é um número válido.")
-                        self.tableData.setItem(1, medida, QTableWidgetItem(QIcon(os.path.join(basedir, "critical.svg")), ""))
-                        break
-                    # e a temperatura da água
-                    try:
-                        float(self.tableData.item(2, medida).text().replace(",", "."))
-                    except:
-                        QMessageBox.critical(self, "V.A.Ca.",
-                                          "O valor da temperatura da água não é um número válido.")
-                        self.tableData.setItem(2, medida, QTableWidgetItem(QIcon(os.path.join(basedir, "critical.svg")), ""))
-                        break
-                    tw = column[2]
-                    vol = []
-                    for i, ml in enumerate(column):
-                        ro_w = calc_ro_water(tw, ta, ua, pa)
-                        ro_a = calc_ro_air( ta, ua, pa)
-                        if self.checkTara.isChecked():
-                            v = (ml + m_evap) * 1/(ro_w + ro_a) * (1 - ro_a / ro_b) * (1 - coef_term * (tw - 20))
-                            vol.append(v * mult)
-                        else:
-                            v = (ml - column[i - 1] + m_evap) * 1/(ro_w + ro_a) * (1 - ro_a / ro_b) * (1 - coef_term * (tw - 20))
-                            vol.append(v * mult)
-                    # restaurando o volume nominal, ensaiado
-                    vol[0] = column[0]
-                    vol[1] = column[1]
-                    # removendo temperatura e massa do recipiente
-                    vol.pop(2)
-                    vol.pop(2)
-                    # inserindo a coluna no novo array de volumes
-                    vol_array.append(vol)
-        # salvando pra futuro relatório
-        global vol_data
-        vol_data = vol_array
-        # atribuindo os resultados à tabela tableRes da interface
-        # novo IF, pois a 4787 não tem erros aleatórios e os sistemáticos estão em mL
-        if self.instKind.currentData()[1] in ["bv", "bvl", "b", "pv", "pg"]:
-            # calculando os resultados
-            global res_data
-            res_array = []            
-            for i in vol_array:
-                res = []
-                # a média das medidas
-                mean = statistics.mean(i[2:])
-                res.append(mean)
-                # o erro sistemático é a diferença entre o nominal e o medido
-                e_sis = mean - i[1]
-                res.append(e_sis)
-                # o erro aleatório em percentual. Na prática, um CV
-                e_ale = 100 * statistics.stdev(i[2:]) / i[1]
-                res.append(e_ale)
-                res_array.append(res)
-            # salvando pra futuro relatório
-            res_data = res_array
-            # ISO 4787:2021
-            for i, j in enumerate(res_array):
-                for x, y in enumerate(j):
-                    item = str('{:.3f}'.format(y)).replace(".", ",")
-                    self.tableRes.setItem(x, i, QTableWidgetItem(item))
-            # Não é legal o usuário poder editar os resultos. Bloqueando!
-            self.tableRes.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-            # Calculando os limites, de acordo com a norma ISO do instrumento
-            match self.instKind.currentData()[1]:
-                case "bv":
-                    # comparando o erro sistemático com o limite da norma
-                    for column in range(self.tableRes.columnCount()):
-                        _item = self.tableRes.item(1, column)
-                        if _item:
-                            v_nom =  float(self.tableData.item(0,column).text().replace(",", "."))
-                            v_s = float(self.tableData.item(1,column).text().replace(",", "."))
-                            # verificando qual o limite dos erros na ISO 8655-2:2022
-                            # o erro é em mL para vidraira Classe A
-                            if v_nom == 5000:
-                                e_vnom = 1.2
-                            elif v_nom == 2000:
-                                e_vnom = 0.6
-                            elif v_nom == 1000:
-                                e_vnom = 0.4
-                            elif v_nom == 500:
-                                e_vnom = 0.25
-                            elif v_nom == 250:
-                                e_vnom = 0.15
-                            elif v_nom == 200:
-                                e_vnom = 0.15
-                            elif v_nom == 100:
-                                e_vnom = 0.1
-                            elif v_nom == 50:
-                                e_vnom = 0.06
-                            elif v_nom == 25:
-                                e_vnom = 0.04
-                            elif v_nom == 20:
-                                e_vnom = 0.04
-                            elif v_nom == 10:
-                                e_vnom = 0.025
-                            elif v_nom == 5:
-                                e_vnom = 0.025
-                            elif v_nom == 2:
-                                e_vnom = 0.025
-                            elif v_nom == 1:
-                                e_vnom = 0.025
-                            else:
-                                e_vnom = 1e+6
-                                QMessageBox.about(self, "Informação",
-                                                        "O volume nominal informado não está "
-                                                        "previsto na norma ISO 1042:1998 para "
-                                                        "esta vidraria. A conformidade dos "
-                                                        "resultados não será avaliada.")
-                            if e_vnom < 1e+5:
-                                if abs(float(_item.text().replace(",", "."))) > e_vnom:
-                                    _item.setToolTip("Não conforme com vidraria Classe A da ISO 1042:1998.")
-                                    _item.setIcon(QIcon(os.path.join(basedir, "alert.svg")))
-                                else:
-                                    _item.setToolTip("Conforme com vidraria Classe A da ISO 1042:1998.")
-                                    _item.setIcon(QIcon(os.path.join(basedir, "ok.svg")))
-                                
-                case "bvl":
-                    # comparando o erro sistemático com o limite da norma
-                    for column in range(self.tableRes.columnCount()):
-                        _item = self.tableRes.item(1, column)
-                        if _item:
-                            v_nom =  float(self.tableData.item(0,column).text().replace(",", "."))
-                            v_s = float(self.tableData.item(1,column).text().replace(",", "."))
-                            # verificando qual o limite dos erros na ISO 8655-2:2022
-                            # o erro é em mL para vidraira Classe A
-                            if v_nom == 1000:
-                                e_vnom = 0.6
-                            elif v_nom == 50:
-                                e_vnom = 0.1
-                            elif v_nom == 25:
-                                e_vnom = 0.06
-                            elif v_nom == 20:
-                                e_vnom = 0.06
-                            elif v_nom == 10:
-                                e_vnom = 0.04
-                            elif v_nom == 5:
-                                e_vnom = 0.04
-                            else:
-                                e_vnom = 1e+6
-                                QMessageBox.about(self, "Informação",
-                                                        "O volume nominal informado não está "
-                                                        "previsto na norma ISO 1042:1998 para "
-                                                        "esta vidraria. A conformidade dos "
-                                                        "resultados não será avaliada.")
-                            if e_vnom < 1e+5:
-                                if abs(float(_item.text().replace(",", "."))) > e_vnom:
-                                    _item.setToolTip("Não conforme com vidraria Classe A da ISO 1042:1998.")
-                                    _item.setIcon(QIcon(os.path.join(basedir, "alert.svg")))
-                                else:
-                                    _item.setToolTip("Conforme com vidraria Classe A da ISO 1042:1998.")
-                                    _item.setIcon(QIcon(os.path.join(basedir, "ok.svg")))
-                case "b":
-                    # comparando o erro sistemático com o limite da norma
-                    for column in range(self.tableRes.columnCount()):
-                        _item = self.tableRes.item(1, column)
-                        if _item:
-                            v_nom =  float(self.tableData.item(0,column).text().replace(",", "."))
-                            v_s = float(self.tableData.item(1,column).text().replace(",", "."))
-                            # verificando qual o limite dos erros na ISO 385:2005
-                            # o erro é em mL para vidraira Classe A
-                            if v_nom == 100:
-                                e_vnom = 0.1
-                            elif v_nom == 50:
-                                e_vnom = 0.05
-                            elif v_nom == 25:
-                                e_vnom = 0.05
-                            elif v_nom == 10:
-                                e_vnom = 0.03
-                            elif v_nom == 5:
-                                e_vnom = 0.01
-                            elif v_nom == 2:
-                                e_vnom = 0.01
-                            elif v_nom == 1:
-                                e_vnom = 0.006
-                            else:
-                                e_vnom = 1e+6
-                                QMessageBox.about(self, "Informação",
-                                                        "O volume nominal informado não está "
-                                                        "previsto na norma ISO 385:2005 para "
-                                                        "esta vidraria. A conformidade dos "
-                                                        "resultados não será avaliada.")
-                            if e_vnom < 1e+5:
-                                if abs(float(_item.text().replace(",", "."))) > e_vnom:
-                                    _item.setToolTip("Não conforme com vidraria Classe A|AS da ISO 385:2005.")
-                                    _item.setIcon(QIcon(os.path.join(basedir, "alert.svg")))
-                                else:
-                                    _item.setToolTip("Conforme com vidraria Classe A|AS da ISO 385:2005.")
-                                    _item.setIcon(QIcon(os.path.join(basedir, "ok.svg")))
-                case "pg":
-                    # comparando o erro sistemático com o limite da norma
-                    for column in range(self.tableRes.columnCount()):
-                        _item = self.tableRes.item(1, column)
-                        if _item:
-                            v_nom =  float(self.tableData.item(0,column).text().replace(",", "."))
-                            v_s = float(self.tableData.item(1,column).text().replace(",", "."))
-                            # verificando qual o limite dos erros na ISO 835:2007
-                            # o erro é em mL para vidraira Classe A
-                            if v_nom == 25:
-                                e_vnom = 0.1
-                            elif v_nom == 20:
-                                e_vnom = 0.1
-                            elif v_nom == 10:
-                                e_vnom = 0.05
-                            elif v_nom == 5:
-                                e_vnom = 0.03
-                            elif v_nom == 2:
-                                e_vnom = 0.01
-                            elif v_nom == 1:
-                                e_vnom = 0.007
-                            elif v_nom == 0.5:
-                                e_vnom = 0.006
-                            elif v_nom == 0.2:
-                                e_vnom = 0.006
-                            elif v_nom == 0.1:
-                                e_vnom = 0.006
-                            else:
-                                e_vnom = 1e+6
-                                QMessageBox.about(self, "Informação",
-                                                        "O volume nominal informado não está "
-                                                        "previsto na norma ISO 835:2007 para "
-                                                        "esta vidraria. A conformidade dos "
-                                                        "resultados não será avaliada.")
-                            if e_vnom < 1e+5:
-                                if abs(float(_item.text().replace(",", "."))) > e_vnom:
-                                    _item.setToolTip("Não conforme com vidraria Classe A|AS da ISO 835:2007.")
-                                    _item.setIcon(QIcon(os.path.join(basedir, "alert.svg")))
-                                else:
-                                    _item.setToolTip("Conforme com vidraria Classe A|AS da ISO 835:2007.")
-                                    _item.setIcon(QIcon(os.path.join(basedir, "ok.svg")))
-                case "pv":
-                    # comparando o erro sistemático com o limite da norma
-                    for column in range(self.tableRes.columnCount()):
-                        _item = self.tableRes.item(1, column)
-                        if _item:
-                            v_nom =  float(self.tableData.item(0,column).text().replace(",", "."))
-                            v_s = float(self.tableData.item(1,column).text().replace(",", "."))
-                            # verificando qual o limite dos erros na ISO 648:2008
-                            # o erro é em mL para vidraira Classe A
-                            if v_nom == 100:
-                                e_vnom = 0.08
-                            elif v_nom == 50:
-                                e_vnom = 0.05
-                            elif v_nom == 25:
-                                e_vnom = 0.03
-                            elif v_nom == 20:
-                                e_vnom = 0.03
-                            elif v_nom == 10:
-                                e_vnom = 0.02
-                            elif v_nom == 5:
-                                e_vnom = 0.015
-                            elif v_nom == 2:
-                                e_vnom = 0.010
-                            elif v_nom == 1:
-                                e_vnom = 0.008
-                            elif v_nom == 0.5:
-                                e_vnom = 0.005
-                            else:
-                                e_vnom = 1e+6
-                                QMessageBox.about(self, "Informação",
-                                                        "O volume nominal informado não está "
-                                                        "previsto na norma ISO 648:2008 para "
-                                                        "esta vidraria. A conformidade dos "
-                                                        "resultados não será avaliada.")
-                            if e_vnom < 1e+5:
-                                if abs(float(_item.text().replace(",", "."))) > e_vnom:
-                                    _item.setToolTip("Não conforme com vidraria Classe A|AS da ISO 648:1998.")
-                                    _item.setIcon(QIcon(os.path.join(basedir, "alert.svg")))
-                                else:
-                                    _item.setToolTip("Conforme com vidraria Classe A|AS da ISO 648:1998.")
-                                    _item.setIcon(QIcon(os.path.join(basedir, "ok.svg")))
-        else:
-            # ISO 8655:2022
-             # calculando os resultados
-            res_array = []
-            for i in vol_array:
-                res = []
-                # a média das medidas
-                mean = statistics.mean(i[2:])
-                res.append(mean)
-                # o erro sistemático como um percentual do volume ensaiado
-                e_sis = 100 * (mean - i[1])/i[1]
-                res.append(e_sis)
-                # o erro aleatório em percentual. Na prática, um CV
-                e_ale = 100 * statistics.stdev(i[2:]) / i[1]
-                res.append(e_ale)
-                res_array.append(res)
-            res_data = res_array
-            for i, j in enumerate(res_array):
-                for x, y in enumerate(j):
-                    item = str('{:.3f}'.format(y)).replace(".", ",")
-                    self.tableRes.setItem(x, i, QTableWidgetItem(item))
-            # Não é legal o usuário poder editar os resultos. Bloqueando!
-            self.tableRes.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-            # Calculando os limites, de acordo com a norma ISO do instrumento
-            match self.instKind.currentData()[1]:
-                case "msa":
-                    # comparando o erro sistemático com o limite da norma
-                    for column in range(self.tableRes.columnCount()):
-                        _item = self.tableRes.item(1, column)
-                        if _item:
-                            v_nom =  float(self.tableData.item(0,column).text().replace(",", "."))
-                            v_s = float(self.tableData.item(1,column).text().replace(",", "."))
-                            # verificando qual o limite dos erros na ISO 8655-2:2022
-                            if v_nom > 5000:
-                                e_vnom = 0.6
-                            elif v_nom > 50:
-                                e_vnom = 0.8
-                            elif v_nom > 10:
-                                e_vnom = 1.0
-                            elif v_nom > 5:
-                                e_vnom = 1.2
-                            else:
-                                e_vnom = 2.5                    
-                            limite = v_nom / v_s * e_vnom
-                            if abs(float(_item.text().replace(",", "."))) > limite:
-                                _item.setToolTip("Não conforme com os limites da norma ISO 8655-2:2022.")
-                                _item.setIcon(QIcon(os.path.join(basedir, "alert.svg")))
-                            else:
-                                _item.setToolTip("Conforme com os limites da norma ISO 8655-2:2022.")
-                                _item.setIcon(QIcon(os.path.join(basedir, "ok.svg")))
-                    # comparando o erro aleatório com o limite da norma
-                    for column in range(self.tableRes.columnCount()):
-                        _item = self.tableRes.item(2, column)
-                        if _item:
-                            v_nom =  float(self.tableData.item(0,column).text().replace(",", "."))
-                            v_s = float(self.tableData.item(1,column).text().replace(",", "."))
-                            # verificando qual o limite dos erros na ISO 8655-2:2022
-                            if v_nom > 50:
-                                e_vnom = 0.3
-                            elif v_nom > 10:
-                                e_vnom = 0.5
-                            elif v_nom > 5:
-                                e_vnom = 0.8
-                            elif v_nom > 3:
-                                e_vnom = 1.5
-                            else:
-                                e_vnom = 2.0
-                            limite = v_nom / v_s * e_vnom
-                            if abs(float(_item.text().replace(",", "."))) > limite:
-                                _item.setToolTip("Não conforme com os limites da norma ISO 8655-2:2022.")
-                                _item.setIcon(QIcon(os.path.join(basedir, "alert.svg")))
-                            else:
-                                _item.setToolTip("Conforme com os limites da norma ISO 8655-2:2022.")
-                                _item.setIcon(QIcon(os.path.join(basedir, "ok.svg")))
-                case "msd2":
-                    for column in range(self.tableRes.columnCount()):
-                        _item = self.tableRes.item(1, column)               
-                        if _item:
-                            v_nom =  float(self.tableData.item(0,column).text().replace(",", "."))
-                            v_s = float(self.tableData.item(1,column).text().replace(",", "."))
-                            # verificando qual o limite dos erros na ISO 8655-2:2022
-                            if v_nom > 100:
-                                e_vnom = 1.2
-                            elif v_nom > 20:
-                                e_vnom = 1.4
-                            elif v_nom > 5:
-                                e_vnom = 2.0
-                            else:
-                                e_vnom = 2.5
-                            limite = v_nom / v_s * e_vnom
-                            if abs(float(_item.text().replace(",", "."))) > limite:
-                                _item.setToolTip("Não conforme com os limites da norma ISO 8655-2:2022.")
-                                _item.setIcon(QIcon(os.path.join(basedir, "alert.svg")))
-                            else:
-                                _item.setToolTip("Conforme com os limites da norma ISO 8655-2:2022.")
-                                _item.setIcon(QIcon(os.path.join(basedir, "ok.svg")))
-                    # comparando o erro aleatório com o limite da norma
-                    for column in range(self.tableRes.columnCount()):
-                        _item = self.tableRes.item(2, column)
-                        if _item:
-                            v_nom =  float(self.tableData.item(0,column).text().replace(",", "."))
-                            v_s = float(self.tableData.item(1,column).text().replace(",", "."))
-                            # verificando qual o limite dos erros na ISO 8655-2:2022
-                            if v_nom > 100:
-                                e_vnom = 0.4
-                            elif v_nom > 20:
-                                e_vnom = 0.6
-                            elif v_nom > 10:
-                                e_vnom = 0.8
-                            elif v_nom > 5:
-                                e_vnom = 1.0
-                            else:
-                                e_vnom = 1.5
-                            limite = v_nom / v_s * e_vnom
-                            if abs(float(_item.text().replace(",", "."))) > limite:
-                                _item.setToolTip("Não conforme com os limites da norma ISO 8655-2:2022.")
-                                _item.setIcon(QIcon(os.path.join(basedir, "alert.svg")))
-                            else:
-                                _item.setToolTip("Conforme com os limites da norma ISO 8655-2:2022.")
-                                _item.setIcon(QIcon(os.path.join(basedir, "ok.svg")))
-                case "mm":
-                    # comparando o erro sistemático com o limite da norma
-                    for column in range(self.tableRes.columnCount()):                
-                        _item = self.tableRes.item(1, column)
-                        if _item:
-                            v_nom =  float(self.tableData.item(0,column).text().replace(",", "."))
-                            v_s = float(self.tableData.item(1,column).text().replace(",", "."))
-                            # verificando qual o limite dos erros na ISO 8655-2:2022
-                            if v_nom > 50:
-                                e_vnom = 1.6
-                            elif v_nom > 10:
-                                e_vnom = 2.0
-                            elif v_nom > 5:
-                                e_vnom = 2.4
-                            elif v_nom > 2:
-                                e_vnom = 5.0
-                            else:
-                                e_vnom = 8.0
-                            limite = v_nom / v_s * e_vnom
-                            if abs(float(_item.text().replace(",", "."))) > limite:
-                                _item.setToolTip("Não conforme com os limites da norma ISO 8655-2:2022.")
-                                _item.setIcon(QIcon(os.path.join(basedir, "alert.svg")))
-                            else:
-                                _item.setToolTip("Conforme com os limites da norma ISO 8655-2:2022.")
-                                _item.setIcon(QIcon(os.path.join(basedir, "ok.svg")))
-                    # comparando o erro aleatório com o limite da norma
-                    for column in range(self.tableRes.columnCount()):
-                        _item = self.tableRes.item(2, column)
-                        if _item:
-                            v_nom =  float(self.tableData.item(0,column).text().replace(",", "."))
-                            v_s = float(self.tableData.item(1,column).text().replace(",", "."))
-                            # verificando qual o limite dos erros na ISO 8655-2:2022
-                            if v_nom > 50:
-                                e_vnom = 0.6
-                            elif v_nom > 20:
-                                e_vnom = 0.8
-                            elif v_nom > 10:
-                                e_vnom = 1.0
-                            elif v_nom > 5:
-                                e_vnom = 1.6
-                            elif v_nom > 2:
-                                e_vnom = 3.0
-                            else:
-                                e_vnom = 8.0
-                            limite = v_nom / v_s * e_vnom
-                            if abs(float(_item.text().replace(",", "."))) > limite:
-                                _item.setToolTip("Não conforme com os limites da norma ISO 8655-2:2022.")
-                                _item.setIcon(QIcon(os.path.join(basedir, "alert.svg")))
-                            else:
-                                _item.setToolTip("Conforme com os limites da norma ISO 8655-2:2022.")
-                                _item.setIcon(QIcon(os.path.join(basedir, "ok.svg")))
-                case "bda":
-                    # comparando o erro sistemático com o limite da norma
-                    for column in range(self.tableRes.columnCount()):
-                        _item = self.tableRes.item(1, column)
-                        if _item:
-                            v_nom =  float(self.tableData.item(0, column).text())
-                            v_s = float(self.tableData.item(1, column).text())
-                            # verificando qual o limite dos erros na ISO 8655-3:2022
-                            if v_nom > 5:
-                                e_vnom = 0.2
-                            elif v_nom > 2:
-                                e_vnom = 0.3
-                            elif v_nom > 1:
-                                e_vnom = 0.5
-                            else:
-                                e_vnom = 0.6
-                            limite = v_nom / v_s * e_vnom
-                            if abs(float(_item.text().replace(",", "."))) > limite:
-                                _item.setToolTip("Não conforme com os limites da norma ISO 8655-3:2022.")
-                                _item.setIcon(QIcon(os.path.join(basedir, "alert.svg")))
-                            else:
-                                _item.setToolTip("Conforme com os limites da norma ISO 8655-3:2022.")
-                                _item.setIcon(QIcon(os.path.join(basedir, "ok.svg")))
-                    # comparando o erro aleatório com o limite da norma
-                    for column in range(self.tableRes.columnCount()):
-                        _item = self.tableRes.item(2, column)
-                        if _item:
-                            v_nom =  float(self.tableData.item(0, column).text())
-                            v_s = float(self.tableData.item(1, column).text())
-                            # verificando qual o limite dos erros na ISO 8655-3:2022
-                            if v_nom > 50:
-                                e_vnom = 0.03
-                            elif v_nom > 25:
-                                e_vnom = 0.05
-                            elif v_nom > 5:
-                                e_vnom = 0.07
-                            else:
-                                e_vnom = 0.1
-                            limite = v_nom / v_s * e_vnom
-                            if abs(float(_item.text().replace(",", "."))) > limite:
-                                _item.setToolTip("Não conforme com os limites da norma ISO 8655-3:2022.")
-                                _item.setIcon(QIcon(os.path.join(basedir, "alert.svg")))
-                            else:
-                                _item.setToolTip("Conforme com os limites da norma ISO 8655-3:2022.")
-                                _item.setIcon(QIcon(os.path.join(basedir, "ok.svg")))
-                case "bdm":
-                    # comparando o erro sistemático com o limite da norma
-                    for column in range(self.tableRes.columnCount()):
-                        _item = self.tableRes.item(1, column)
-                        if _item:
-                            v_nom =  float(self.tableData.item(0,column).text().replace(",", "."))
-                            v_s = float(self.tableData.item(1,column).text().replace(",", "."))
-                            # verificando qual o limite dos erros na ISO 8655-3:2022
-                            if v_nom > 10:
-                                e_vnom = 0.2
-                            elif v_nom > 2:
-                                e_vnom = 0.3
-                            elif v_nom > 1:
-                                e_vnom = 0.5
-                            else:
-                                e_vnom = 0.6
-                            limite = v_nom / v_s * e_vnom
-                            if abs(float(_item.text().replace(",", "."))) > limite:
-                                _item.setToolTip("Não conforme com os limites da norma ISO 8655-3:2022.")
-                                _item.setIcon(QIcon(os.path.join(basedir, "alert.svg")))
-                            else:
-                                _item.setToolTip("Conforme com os limites da norma ISO 8655-3:2022.")
-                                _item.setIcon(QIcon(os.path.join(basedir, "ok.svg")))
-                    # comparando o erro aleatório com o limite da norma
-                    for column in range(self.tableRes.columnCount()):
-                        _item = self.tableRes.item(2, column)
-                        if _item:
-                            v_nom =  float(self.tableData.item(0,column).text().replace(",", "."))
-                            v_s = float(self.tableData.item(1,column).text().replace(",", "."))
-                            # verificando qual o limite dos erros na ISO 8655-3:2022
-                            e_vnom = 0.1
-                            limite = v_nom / v_s * e_vnom
-                            if abs(float(_item.text().replace(",", "."))) > limite:
-                                _item.setToolTip("Não conforme com os limites da norma ISO 8655-3:2022.")
-                                _item.setIcon(QIcon(os.path.join(basedir, "alert.svg")))
-                            else:
-                                _item.setToolTip("Conforme com os limites da norma ISO 8655-3:2022.")
-                                _item.setIcon(QIcon(os.path.join(basedir, "ok.svg")))
-                case "d":
-                    # comparando o erro sistemático com o limite da norma
-                    for column in range(self.tableRes.columnCount()):                
-                        _item = self.tableRes.item(1, column)
-                        if _item:
-                            v_nom =  float(self.tableData.item(0,column).text().replace(",", "."))
-                            v_s = float(self.tableData.item(1,column).text().replace(",", "."))
-                            # verificando qual o limite dos erros na ISO 8655-5:2022
-                            if v_nom > 0.5:
-                                e_vnom = 0.6
-                            elif v_nom > 0.1:
-                                e_vnom = 1.0
-                            elif v_nom > 0.02:
-                                e_vnom = 1.5
-                            else:
-                                e_vnom = 2.0
-                            limite = v_nom / v_s * e_vnom
-                            if abs(float(_item.text().replace(",", "."))) > limite:
-                                _item.setToolTip("Não conforme com os limites da norma ISO 8655-5:2022.")
-                                _item.setIcon(QIcon(os.path.join(basedir, "alert.svg")))
-                            else:
-                                _item.setToolTip("Conforme com os limites da norma ISO 8655-5:2022.")
-                                _item.setIcon(QIcon(os.path.join(basedir, "ok.svg")))
-                    # comparando o erro aleatório com o limite da norma
-                    for column in range(self.tableRes.columnCount()):
-                        _item = self.tableRes.item(2, column)
-                        if _item:
-                            v_nom =  float(self.tableData.item(0,column).text().replace(",", "."))
-                            v_s = float(self.tableData.item(1,column).text().replace(",", "."))
-                            # verificando qual o limite dos erros na ISO 8655-5:2022
-                            if v_nom > 0.2:
-                                e_vnom = 0.2
-                            elif v_nom > 0.05:
-                                e_vnom = 0.3
-                            elif v_nom > 0.02:
-                                e_vnom = 0.4
-                            elif v_nom > 0.01:
-                                e_vnom = 0.5
-                            else:
-                                e_vnom = 1.0
-                            limite = v_nom / v_s * e_vnom
-                            if abs(float(_item.text().replace(",", "."))) > limite:
-                                _item.setToolTip("Não conforme com os limites da norma ISO 8655-5:2022.")
-                                _item.setIcon(QIcon(os.path.join(basedir, "alert.svg")))
-                            else:
-                                _item.setToolTip("Conforme com os limites da norma ISO 8655-5:2022.")
-                                _item.setIcon(QIcon(os.path.join(basedir, "ok.svg")))
+        dirty = sorted(self._dirty)
+        validas = []
+        refazer = []
+        for i in dirty:
+            # extraindo os dados de massa da coluna
+            col, erro, parcial = self.parse_coluna(i, auto)
+            self._colunas[i] = col
+            if parcial:
+                continue
+            refazer.append(i)
+            if erro:
+                erros.append(erro)
+                continue
+            if len(col) == 0:
+                validas.append(i)
+                continue
+            # verificando se foram informados o volume nominal, o volume
+            # ensaiado e a temperatura da água
+            erro = self.check_header(i)
+            if erro:
+                erros.append(erro)
+                continue
+            try:
+                check_column(col)
+            except ValueError as e:
+                if not auto:
+                    erros.append(str(e))
+                continue
+            validas.append(i)
+        # limpando os resultados das colunas que serão refeitas
+        for i in refazer:
+            self._results[i] = None
+            self._budgets[i] = None
+            self.resultados.clear_column(i)
+        # transformando massa em volume e calculando os resultados
+        self._results = recalculate(self._colunas, self._results, validas, kind,
+                                    coef_term, env, self.checkTara.isChecked())
+        # orçamento de incerteza do GUM, com a incerteza expandida na última linha
+        unc = self.incertezas()
+        for i in validas:
+            r = self._results[i]
+            if r is not None:
+                self._budgets[i] = gum_budget(self._colunas[i], r.volumes, kind, coef_term, env, unc)
+        self._dirty.difference_update(validas)
+        # atribuindo os resultados das colunas recalculadas à tabela de resultados
+        avisos += self.mostra_resultados(validas)
+        if any(r is not None for r in self._results):
+            self._timer_historico.start()
+        return erros, avisos
+
+    def mostra_resultados(self, colunas):
+        # resultados e conformidade das colunas na tabela de resultados;
+        # devolve os avisos
+        avisos = []
+        kind = self.instKind.currentData()[1]
+        texto, norma = NORMAS[kind]
+        for column in colunas:
+            r = self._results[column]
+            if r is None:
+                continue
+            self.resultados.set_column(column, [*r.results, self._budgets[column].U])
+            # marcando a conformidade com os limites da norma
+            for x, ok in ((1, r.ok_sis), (2, r.ok_ale)):
+                if ok is None:
+                    continue
+                elif ok:
+                    self.resultados.mark(x, column, icone("ok.svg"),
+                                         "Conforme com " + texto + ".")
+                else:
+                    self.resultados.mark(x, column, icone("alert.svg"),
+                                         "Não conforme com " + texto + ".")
+            if kind in ISO_4787 and r.ok_sis is None:
+                avisos.append("O volume nominal informado não está "
+                              "previsto na norma " + norma + " para "
+                              "esta vidraria. A conformidade dos "
+                              "resultados não será avaliada.")
+        if self.canais():
+            self.mostra_veredito(norma)
+        return avisos
+
+    def mostra_veredito(self, norma):
+        # conformidade de cada canal, considerando todos os volumes ensaiados
+        vereditos = channel_verdicts(self._results, self.canais())
+        self.veredito.setText(texto_veredito(vereditos, device_verdict(vereditos), norma))
+
+    def parse_coluna(self, i, auto=False):
+        # lê os números de uma coluna da tabela de dados, pulando as células
+        # vazias. Devolve os números, a mensagem de erro (ou None) e se há um
+        # número ainda sendo digitado, o que só é aceito no cálculo automático
+        col = []
+        erro = None
+        parcial = False
+        # remove os ícones, caso tenham sido adicionados pelo "erro"
+        self.dados.clear_marks(i)
+        valores, estados = self.coluna(i)
+        for j, estado in enumerate(estados):
+            if estado == NUMERO:
+                col.append(valores[j])
+            elif estado == PARCIAL and auto:
+                parcial = True
+            elif estado != VAZIO:
+                # se o valor não for um número, dá erro
+                erro = "O valor informado não é um número válido."
+                self.dados.mark(j, i, icone("critical.svg"), erro)
+        return col, erro, parcial
+
+    def coluna(self, i):
+        # valores e estados da coluna i; no modo multicanal, as três primeiras
+        # linhas em branco vêm do primeiro canal do mesmo volume
+        valores, estados = self.dados.column(i)
+        canais = self.canais()
+        if canais and i % canais and VAZIO in estados[:3] and any(estados[3:]):
+            v0, e0 = self.dados.column(i - i % canais)
+            for row in range(3):
+                if estados[row] == VAZIO:
+                    valores[row] = v0[row]
+                    estados[row] = e0[row]
+        return valores, estados
 
+    def check_header(self, medida):
+        # confere as três primeiras linhas da coluna; marca a célula com erro
+        # e devolve a mensagem, ou None se está tudo certo
+        estados = self.coluna(medida)[1]
+        for row, nome in enumerate(("do volume nominal", "do volume medido",
+                                    "da temperatura da água")):
+            if estados[row] != NUMERO:
+                erro = "O valor " + nome + " não é um número válido."
+                self.dados.mark(row, medida, icone("critical.svg"), erro)
+                return erro
+        return None
 
     def handlePrint(self):
         filename, _ = QFileDialog.getSaveFileName(self, 'Salvar arquivo', '', ".pdf (*.pdf)")
         if not filename[-4:] == ".pdf":
             filename = filename + ".pdf"
         if filename:
-            printer = QtPrintSupport.QPrinter(QtPrintSupport.QPrinter.HighResolution)
-            printer.setOutputFormat(QtPrintSupport.QPrinter.PdfFormat)
-            printer.setPageSize(QPageSize.A4)
-            printer.setPageOrientation(QPageLayout.Landscape)
-            printer.setPageMargins(QMargins(0, 0, 0, 0))
-            printer.setCreator("V.A.Ca. v. Angus")
-            printer.setOutputFileName(filename)
-            document = self.makeTableDocument()
-            document.print_(printer)
-    
-    def makeTableDocument(self):
-        # padding as tabelas pra facilitar o html
-        global table_data
-        for a in table_data:
-            a += ['-'] * (14 - len(a))
-        global vol_data
-        while len(vol_data) < 12:
-            vol_data.append([])
-        for a in vol_data:
-            a += ['-'] * (12 - len(a))
-        global res_data
-        while len(res_data) < 12:
-            res_data.append([])
-        for a in res_data:
-            a += ['-'] * (3 - len(a))
-        # unidade de medida pro volume
-        if self.instKind.currentData()[0] == 1000:
-            unid = 'µL'
+            # a impressão só é carregada quando é usada pela primeira vez
+            from export import write_pdf
+            write_pdf([self.report()], filename)
+
+    def relatorios_lote(self):
+        # relatórios de todos os ensaios (.json do modo em lote) de uma pasta,
+        # gravados em outros processos enquanto a interface segue livre
+        pasta = QFileDialog.getExistingDirectory(self, "Pasta dos ensaios")
+        if not pasta:
+            return
+        from batch import ERROS, list_runs, load_run, make_report
+        from export import PdfExport
+        reports = []
+        erros = []
+        for path in list_runs(pasta):
+            nome = os.path.splitext(os.path.basename(path))[0]
+            try:
+                reports.append((nome, make_report(load_run(path))))
+            except ERROS as e:
+                erros.append(nome + ": " + (str(e) or type(e).__name__))
+        if not reports:
+            QMessageBox.warning(self, "V.A.Ca.", "Nenhum ensaio válido na pasta.")
+            return
+        pergunta = QMessageBox(QMessageBox.Question, "V.A.Ca.",
+                               "%d ensaios. Gravar um PDF por instrumento ou um único PDF "
+                               "com todos os relatórios?" % len(reports), parent=self)
+        um_por = pergunta.addButton("Um por instrumento", QMessageBox.AcceptRole)
+        unico = pergunta.addButton("Um único PDF", QMessageBox.AcceptRole)
+        pergunta.addButton(QMessageBox.Cancel)
+        pergunta.exec()
+        if pergunta.clickedButton() is um_por:
+            destino = QFileDialog.getExistingDirectory(self, "Pasta dos relatórios")
+            if not destino:
+                return
+            arquivos = [((report,), os.path.join(destino, nome + ".pdf"))
+                        for nome, report in reports]
+        elif pergunta.clickedButton() is unico:
+            filename, _ = QFileDialog.getSaveFileName(self, 'Salvar arquivo', '', ".pdf (*.pdf)")
+            if not filename:
+                return
+            if not filename[-4:] == ".pdf":
+                filename = filename + ".pdf"
+            arquivos = [(tuple(report for _, report in reports), filename)]
         else:
-            unid = 'mL'                
-        document = QTextDocument()
-        document.setPageSize(QSizeF(842, 595))
-        document.setDocumentMargin(43)
-        document.setDefaultFont(QFont("Cantarell", 7))
-        html = """<html>
-        <head>
-        <title>Relatório de ensaio</title>
-        </head>
-        <body dir="ltr">
-        <p align="right"><small>Página 1 de 2</small></p>
-        <h1 align="center">Relatório de Ensaio</h1>
-        """
-        html += '<p><b>Identificação do equipamento: </b><big>' + self.instId.text() + '</big><br>'
-        html += '<b>Tipo:</b> ' + self.instKind.currentText() + ', ' + self.instMat.currentText() + '</p>'
-        html += '<p><b>Data de realização do ensaio:</b> ' + self.dateEdit.date().toString("dd/MM/yyyy") + '</p>'
-        html += '<table width="100%"><tr><td width="50%">'
-        html += '<p><b>Identificação dos instrumentos de medida utilizados:</b><br>'
-        html += 'Balança: ' + self.balId.text() + '<br>'
-        html += 'Termômetro (temp. ambiente): ' + self.termId.text() + '<br>'
-        html += 'Termômetro (temp. da água): ' + self.term2Id.text() + '<br>'
-        html += 'Barômetro: ' + self.barId.text() + '<br>'
-        html += 'Higrômetro: ' + self.higId.text() + '</p>'
-        html += '</td><td width="50%"></td>'
-        html += '<p><b>Parâmetros ambientais:</b><br>'
-        html += 'Temperatura ambiente: ' + str(self.tempAmb.value()) + '°C<br>'
-        html += 'Pressão atmosférica: ' + str(self.presAtm.value()) + ' hPa<br>'
-        html += 'Umidade relativa do ar: ' + str(self.umidRel.value()) + '%<br>'
-        html += 'Perda por evaporação: ' + str(self.mEvap.value()) + ' g<br>'
-        html += 'Densidade das massas de referência: ' + str(self.densPesos.value()) + ' g·mL⁻¹</p></td></tr></table>'
-        html += '<p><b>Dados das medidas de massa:</b></p>'
-        html += '<table border="1" cellpadding="2" width="100%" style="border-collapse: collapse"><thead>'
-        html += '<tr>'
-        for c in range(self.tableData.columnCount() + 1): # nº de colunas da tabela + uma do cabeçalho vertical
-            if c == 0:
-                html += '<th width="20%" bgcolor="#E5E4E2"></th>'
-            else:
-                html += '<th  width="16%" bgcolor="#E5E4E2">{}</th>'.format(c)
-        html += '</tr></thead>'
-        for r in range(self.tableData.rowCount()): # nº de linhas
-            html += '<tr>'
-            html += '<td bgcolor="#E5E4E2">{}</td>'.format(self.tableData.verticalHeaderItem(r).text())
-            for c in range(self.tableData.columnCount()):
-                item = table_data[c][r]
-                if isinstance(item, str):
-                    html += '<td align="right">{}</td>'.format(item)
-                else:
-                    html += '<td align="right">{}</td>'.format(str(item).replace(".", ","))
-            html += '</tr>'
-        html += '</table>'
-        html += '<div style="page-break-before:always"><p align="right"><small>Página 2 de 2</small></p>'
-        html += '<p><b>Dados das medidas convertidos para volume:</b></p>'
-        html += '<table border="1" cellpadding="2" width="100%" style="border-collapse: collapse"><thead>'
-        html += '<tr>'
-        for c in range(self.tableData.columnCount() + 1):
-            if c == 0:
-                html += '<th width="20%" bgcolor="#E5E4E2"></th>'
-            else:
-                html += '<th width="16%" bgcolor="#E5E4E2">{}</th>'.format(c)
-        html += '</tr></thead>'
-        for r in range(self.tableData.rowCount() - 2):
-            html += '<tr>'
-            if r == 0 or r == 1:
-                html += '<td bgcolor="#E5E4E2">{}</td>'.format(self.tableData.verticalHeaderItem(r).text())
-            else:
-                html += '<td bgcolor="#E5E4E2">{}</td>'.format(str(r-1) + 'ª medida, em ' + unid)
-            for c in range(self.tableData.columnCount()):
-                item = vol_data[c][r]
-                if isinstance(item, str):
-                    html += '<td align="right">{}</td>'.format(item)
-                else:
-                    item = "{:.3f}".format(item).replace(".", ",")
-                    html += '<td align="right">{}</td>'.format(item)
-            html += '</tr>'
-        html += '</table>'
-        html += '<p><b>Resultados:</b></p>'
-        html += '<table border="1" cellpadding="2" width="100%" style="border-collapse: collapse"><thead>'
-        html += '<tr>'
-        for c in range(self.tableRes.columnCount() + 1):
-            if c == 0:
-                html += '<th width="20%" bgcolor="#E5E4E2"></th>'
-            else:
-                html += '<th width="16%" bgcolor="#E5E4E2">{}</th>'.format(c)
-        html += '</tr></thead>'
-        html += '<tbody>'
-        for r in range(self.tableRes.rowCount()):
-            html += '<tr>'
-            html += '<td bgcolor="#E5E4E2">{}</td>'.format(self.tableRes.verticalHeaderItem(r).text())
-            for c in range(self.tableRes.columnCount()):
-                item = res_data[c][r]
-                if isinstance(item, str):
-                    html += '<td align="right">{}</td>'.format(item)
-                else:
-                    item = "{:.3f}".format(item).replace(".", ",")
-                    html += '<td align="right">{}</td>'.format(item)
-            html += '</tr>'
-        html += '</tbody></table>'
-        html += '<p>&nbsp;</p>'
-        html += '<hr align="center" width=20% noshade>'
-        html += '<p align="center">Responsável pelo ensaio</p>'
-        html += '<p>&nbsp;</p>'
-        html += '<p align="right"><small>Impresso por V.A.Ca (v. <i>Angus</i>) em {}.</small></p></body></html>'.format(datetime.now().strftime("%d/%m/%Y %H:%M:%S"))
-        document.setHtml(html)
-        return document
+            return
+        self._erros_lote = erros
+        self.exportacao = PdfExport(arquivos)
+        self.progresso = QProgressDialog("Gravando os relatórios...", "Cancelar", 0,
+                                         self.exportacao.total, self)
+        self.progresso.setWindowModality(Qt.WindowModality.WindowModal)
+        self.progresso.setMinimumDuration(0)
+        # chamado direto: a thread da exportação fica ocupada até o fim do lote
+        self.progresso.canceled.connect(self.exportacao.cancelar, Qt.ConnectionType.DirectConnection)
+        self.exportacao.andamento.connect(self.progresso.setValue)
+        self.exportacao.concluido.connect(self.fim_lote)
+        self.exportacao.start()
+
+    def fim_lote(self, feitos, erros):
+        cancelado = self.progresso.wasCanceled()
+        self.progresso.close()
+        self.exportacao.stop()
+        self.exportacao = None
+        texto = "%d relatórios gravados." % feitos
+        if cancelado:
+            texto += " Gravação cancelada."
+        erros = self._erros_lote + erros
+        if erros:
+            texto += "\n\n" + "\n".join(erros)
+        QMessageBox.information(self, "V.A.Ca.", texto)
+
+    def ensaio(self):
+        # o ensaio no formato dos .json do cálculo em lote (batch.py)
+        run = {"instId": self.instId.text(), "instKind": self.instKind.currentData()[1],
+               "instMat": self.instMat.currentText(),
+               "dateEdit": self.dateEdit.date().toString("yyyy-MM-dd"),
+               "balId": self.balId.text(), "termId": self.termId.text(),
+               "term2Id": self.term2Id.text(), "barId": self.barId.text(),
+               "higId": self.higId.text(), "tempAmb": self.tempAmb.value(),
+               "presAtm": self.presAtm.value(), "umidRel": self.umidRel.value(),
+               "mEvap": self.mEvap.value(), "densPesos": self.densPesos.value(),
+               "checkTara": self.checkTara.isChecked(),
+               "incertezas": self.incertezas()._asdict()}
+        if self.canais():
+            run["canais"] = self.canais()
+        return run
+
+    def calibracao(self, table=None, results=None):
+        # o ensaio calculado (engine.CalibrationRun), com as colunas e os
+        # resultados da última vez que foram calculados
+        n = self.dados.columnCount()
+        return calibrate(self._colunas[:n] if table is None else table,
+                         self.instKind.currentData()[1], self.instMat.currentData(),
+                         self.ambiente(), self.checkTara.isChecked(), self.canais(),
+                         self._results[:n] if results is None else results)
+
+    def salva_ensaio(self):
+        filename, _ = QFileDialog.getSaveFileName(self, "Salvar ensaio", "",
+                                                  "Ensaio do V.A.Ca. (*.vaca)")
+        if not filename:
+            return
+        if not filename.endswith(EXTENSAO):
+            filename += EXTENSAO
+        n = self.dados.columnCount()
+        # a tabela como está agora, mesmo que ainda não tenha sido calculada;
+        # só vão os resultados das colunas que não mudaram desde o cálculo
+        table = [[v for v, e in zip(*self.coluna(i)) if e == NUMERO] for i in range(n)]
+        results = [None if i in self._dirty else r for i, r in enumerate(self._results[:n])]
+        try:
+            salva(filename, Sessao(self.ensaio(), self.calibracao(table, results),
+                                   self._budgets[:n], Grade(*self.dados.contents()),
+                                   self._origem))
+        except OSError as e:
+            QMessageBox.critical(self, "V.A.Ca.", "Não foi possível gravar o ensaio: " + str(e))
+
+    def abre_ensaio(self):
+        filename, _ = QFileDialog.getOpenFileName(self, "Abrir ensaio", "",
+                                                  "Ensaio do V.A.Ca. (*.vaca)")
+        if not filename:
+            return
+        try:
+            sessao = abre(filename)
+            self.restaura(sessao)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            QMessageBox.critical(self, "V.A.Ca.", "Não foi possível abrir o ensaio: " + str(e))
+
+    def restaura(self, sessao):
+        # preenche o formulário com um ensaio gravado; os resultados gravados
+        # voltam para a tela sem recalcular
+        run = sessao.run
+        kind = run["instKind"]
+        canais = run.get("canais") or 0
+        if kind not in INSTRUMENTOS or run["instMat"] not in MATERIAIS:
+            raise ValueError("Tipo de instrumento ou material desconhecido.")
+        if canais and canais not in CANAIS:
+            raise ValueError("Número de canais desconhecido: %d." % canais)
+        self.clear_tables()
+        self.instKind.setCurrentIndex(list(INSTRUMENTOS).index(kind))
+        self.instMat.setCurrentIndex(list(MATERIAIS).index(run["instMat"]))
+        if canais:
+            self.mmCanais.setCurrentIndex(CANAIS.index(canais))
+        for campo in ("instId", "balId", "termId", "term2Id", "barId", "higId"):
+            getattr(self, campo).setText(run.get(campo, ""))
+        self.dateEdit.setDate(QDate.fromString(run["dateEdit"], "yyyy-MM-dd"))
+        for campo in ("tempAmb", "presAtm", "umidRel", "mEvap", "densPesos"):
+            getattr(self, campo).setValue(run[campo])
+        self.checkTara.setChecked(run.get("checkTara", False))
+        u = dict(run.get("incertezas", {}))
+        if "u_coef" in u:
+            u["u_coef"] = 100 * u["u_coef"] / MATERIAIS[run["instMat"]]
+        for campo, valor in u.items():
+            self.incert[campo].setValue(valor)
+        # o tamanho da tabela vem da grade gravada
+        grade = sessao.grade
+        self.nVolumes.setValue(grade.colunas // (canais or 1))
+        self.nMedidas.setValue(grade.linhas - 4)
+        self.dados.set_contents(grade.values, grade.state, grade.casas, grade.texts)
+        n = self.dados.columnCount()
+        self._colunas = [list(c) for c in sessao.calib.columns()[:n]]
+        self._colunas += [[] for _ in range(n - len(self._colunas))]
+        self._results = (list(sessao.calib.results) + [None] * n)[:n]
+        self._budgets = (list(sessao.budgets) + [None] * n)[:n]
+        self._dirty = {i for i, r in enumerate(self._results) if r is None}
+        self._ao_vivo = {}
+        self.mostra_resultados(range(n))
+        # recalcular o ensaio reaberto substitui o mesmo registro no histórico
+        self._origem = sessao.origem or self._origem
+        self._timer.stop()
+
+    def grava_historico(self):
+        # um erro no banco não atrapalha o ensaio: só é avisado na barra de status
+        self._timer_historico.stop()
+        import sqlite3
+        from history import Historico
+        n = self.dados.columnCount()
+        try:
+            if self.historico is None:
+                self.historico = Historico()
+            self.historico.grava([(self.ensaio(), self.calibracao(),
+                                   [None if b is None else b.U for b in self._budgets[:n]],
+                                   self._origem)])
+        except (sqlite3.Error, OSError) as e:
+            self.statusbar.showMessage("Não foi possível gravar o histórico: " + str(e))
+
+    def mostra_tendencias(self):
+        # deriva dos erros de cada ponto de calibração do instrumento do
+        # formulário, ou de todos os instrumentos do histórico, se o campo
+        # estiver vazio. Só as somas do histórico são lidas
+        import sqlite3
+        from history import Historico
+        from trends import tendencias
+        # o ensaio atual entra antes, se ainda não foi gravado
+        if self._timer_historico.isActive():
+            self.grava_historico()
+        inst_id = self.instId.text().strip()
+        try:
+            if self.historico is None:
+                self.historico = Historico()
+            linhas = self.historico.tendencias(inst_id or None)
+        except (sqlite3.Error, OSError) as e:
+            QMessageBox.critical(self, "V.A.Ca.", "Não foi possível ler o histórico: " + str(e))
+            return
+        dialogo = QDialog(self)
+        dialogo.setWindowTitle("Tendências - " + (inst_id or "todos os instrumentos"))
+        layout = QVBoxLayout(dialogo)
+        tabela = QTableView(dialogo)
+        tabela.setModel(TrendModel(tendencias(linhas), INSTRUMENTOS, tabela))
+        # a largura das colunas só considera as linhas visíveis: com a frota
+        # inteira, medir todas as linhas demoraria mais que ler o histórico
+        tabela.horizontalHeader().setResizeContentsPrecision(0)
+        tabela.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        layout.addWidget(QLabel("Erros sistemático (em mL na vidraria, em % nos instrumentos de "
+                                "pistão) e aleatório ajustados por uma reta contra a data dos "
+                                "ensaios. A não conformidade prevista é a data em que a reta "
+                                "alcança o limite da norma.", dialogo, wordWrap=True))
+        layout.addWidget(tabela)
+        botoes = QDialogButtonBox(QDialogButtonBox.StandardButton.Close, dialogo)
+        botoes.rejected.connect(dialogo.reject)
+        layout.addWidget(botoes)
+        dialogo.resize(1100, 500)
+        dialogo.exec()
+
+    def report(self):
+        # cópia do ensaio para o relatório, feita na hora da impressão
+        unid = 'µL' if self.instKind.currentData()[0] == 1000 else 'mL'
+        colunas = self.dados.columnCount()
+        calib = self.calibracao()
+        return Report(
+            self.instId.text(), self.instKind.currentText(), self.instMat.currentText(),
+            self.dateEdit.date().toString("dd/MM/yyyy"), self.balId.text(),
+            self.termId.text(), self.term2Id.text(), self.barId.text(), self.higId.text(),
+            str(self.tempAmb.value()), str(self.presAtm.value()), str(self.umidRel.value()),
+            str(self.mEvap.value()), str(self.densPesos.value()), unid, colunas,
+            tuple(self.dados.headers), tuple(self.resultados.headers),
+            tuple(tuple(c) for c in calib.columns()),
+            tuple(() if r is None else tuple(r.volumes) for r in calib.results),
+            tuple(() if r is None else (*r.results, b.U)
+                  for r, b in zip(calib.results, self._budgets)),
+            self.veredito.text(), datetime.now().strftime("%d/%m/%Y %H:%M:%S"),
+            tuple(self.dados.labels or ()))
 
         
-app = QApplication.instance()
-if not app:
-    app = QApplication(sys.argv)
-app.setWindowIcon(QIcon(os.path.join(basedir, "icon.svg")))
-# Load styles
-with open('vaca.qss', 'r') as f:
-    _style = f.read()
-    app.setStyleSheet(_style)
-# App
-window = MainWindow()
-window.show()
-
-app.exec()
+if __name__ == "__main__":
+    perfil = PerfilInicio() if "--profile-startup" in sys.argv else None
+    if perfil:
+        perfil.marca("importações")
+    # pastas do usuário (o cache da folha de estilo) próprias do V.A.Ca., e não
+    # as genéricas de qualquer programa PySide
+    QApplication.setOrganizationName("vaca")
+    QApplication.setApplicationName("vaca")
+    app = QApplication.instance()
+    if not app:
+        app = QApplication(sys.argv)
+    app.setWindowIcon(QIcon(os.path.join(basedir, "icon.svg")))
+    if perfil:
+        app.installEventFilter(perfil)
+        perfil.marca("QApplication")
+    # Load styles
+    app.setStyleSheet(folha_de_estilo())
+    if perfil:
+        perfil.marca("folha de estilo")
+    # App
+    window = MainWindow()
+    if perfil:
+        perfil.marca("janela")
+    window.show()
+    if perfil:
+        perfil.marca("show")
+
+    app.exec()